@@ -0,0 +1,119 @@
+"""Control loop responsiveness during an auto pickup
+Runs the player control loop against a fake robot whose actions take a configurable time, presses Y
+and then pushes the stick, and compares the blocking pickup with the background AutoPickup.
+
+Usage:
+    python -m benchmarks.auto_pickup [--action-time 1.0] [--rate 60]
+"""
+import argparse
+import time
+
+from cozmo.objects import LightCube
+
+from common.commands import CommandShaper
+from common.pickup import AutoPickup
+from common.scheduler import FixedRateScheduler
+
+
+class FakeAction:
+    def __init__(self, duration: float):
+        self.finish_at = time.monotonic() + duration
+        self.aborted = False
+
+    @property
+    def is_completed(self) -> bool:
+        return self.aborted or time.monotonic() >= self.finish_at
+
+    @property
+    def is_running(self) -> bool:
+        return not self.is_completed
+
+    def abort(self):
+        self.aborted = True
+
+    def wait_for_completed(self):
+        while not self.is_completed:
+            time.sleep(0.001)
+
+
+class FakeWorld:
+    def __init__(self):
+        self.cube = LightCube.__new__(LightCube)
+
+    @property
+    def visible_objects(self):
+        yield self.cube
+
+    def wait_for_observed_light_cube(self, timeout=None):
+        return self.cube
+
+
+class FakeRobot:
+    def __init__(self, action_time: float):
+        self.action_time = action_time
+        self.world = FakeWorld()
+
+    def drive_wheels(self, l_wheel_speed, r_wheel_speed):
+        pass
+
+    def go_to_object(self, cube, distance):
+        return FakeAction(self.action_time)
+
+    def pickup_object(self, cube, num_retries=0):
+        return FakeAction(self.action_time)
+
+
+def blocking_tick(robot: FakeRobot, pressed_y: bool):
+    if pressed_y:
+        cube = robot.world.wait_for_observed_light_cube(timeout=30)
+        robot.go_to_object(cube, None).wait_for_completed()
+        robot.pickup_object(cube, num_retries=0).wait_for_completed()
+
+
+def background_tick(pickup: AutoPickup, pressed_y: bool, stick_moved: bool):
+    if pickup.active:
+        if stick_moved:
+            pickup.cancel()
+        else:
+            pickup.update()
+    elif pressed_y:
+        pickup.start()
+
+
+def measure(name: str, tick, rate: float, action_time: float):
+    """ Press Y on the first tick and move the stick halfway through the first action """
+    scheduler = FixedRateScheduler(rate)
+    start = time.monotonic()
+    stick_at = start + action_time / 2
+    responded = []
+
+    def control_tick():
+        now = time.monotonic()
+        stick_moved = now >= stick_at
+        if stick_moved and not responded:
+            responded.append(now - stick_at)
+        tick(scheduler.ticks == 0, stick_moved)
+
+    scheduler.run(control_tick, lambda: time.monotonic() - start > action_time * 2.5)
+    print('%s: stick input handled after %.1f ms' % (name, responded[0] * 1e3 if responded else float('inf')))
+    print('  ' + scheduler.report().replace('\n', '\n  '))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare blocking and background auto pickup.')
+    parser.add_argument('--action-time', type=float, default=1.0, help='seconds each fake robot action takes')
+    parser.add_argument('--rate', type=float, default=60)
+    args = parser.parse_args()
+
+    robot = FakeRobot(args.action_time)
+    measure('blocking pickup', lambda pressed_y, stick_moved: blocking_tick(robot, pressed_y),
+            args.rate, args.action_time)
+
+    pickup = AutoPickup(CommandShaper(robot))
+    measure('background pickup', lambda pressed_y, stick_moved: background_tick(pickup, pressed_y, stick_moved),
+            args.rate, args.action_time)
+    print('  pickups cancelled by the player: %d' % pickup.cancelled)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Coordinate-based capture validation
+Measures the cost of deciding whether a streamed cube pose is a capture with the grid index of
+common.spatial against checking the pose against every base, as the number of teams and cubes
+grows, then plays simulated matches where the judges capture cubes only from the poses the players
+stream through a local hub.
+
+Usage:
+    python -m benchmarks.capture_index [--updates 200000] [--matches 5]
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from benchmarks.hub_load import start_hub
+from common.message_forwarder import start_connection
+from common.spatial import BASE_RADIUS, FIELD_SIZE, CaptureIndex, base_pose
+from simulation.match import Match
+
+
+def linear_capture(bases: List[Tuple[float, float, float]], team: int, x: float, y: float) -> bool:
+    """ the same decision as CaptureIndex.update_cube, checking every base in turn """
+    for number, (base_x, base_y, heading) in enumerate(bases, 1):
+        if (x - base_x) ** 2 + (y - base_y) ** 2 <= BASE_RADIUS ** 2:
+            return number == team
+    return False
+
+
+def time_updates(teams: int, cubes: int, updates: int) -> Tuple[float, float, int]:
+    """
+    :return: nanoseconds per update of the index and of the linear scan, and the captures the index found
+    """
+    rng = random.Random(teams)
+    # cube streams wander around the field, a fraction of them end up in a base
+    poses = [(rng.randint(1, teams), rng.randrange(cubes), rng.uniform(0, FIELD_SIZE), rng.uniform(0, FIELD_SIZE))
+             for _ in range(updates)]
+
+    index = CaptureIndex(teams)
+    start = time.perf_counter()
+    for team, cube_id, x, y in poses:
+        index.update_cube(team, cube_id, x, y)
+    indexed = time.perf_counter() - start
+
+    bases = [base_pose(team, teams) for team in range(1, teams + 1)]
+    captured = set()
+    start = time.perf_counter()
+    for team, cube_id, x, y in poses:
+        if linear_capture(bases, team, x, y):
+            captured.add((team, cube_id))
+    linear = time.perf_counter() - start
+
+    assert captured == index.captured, 'the index and the linear scan disagree'
+    return indexed / updates * 1e9, linear / updates * 1e9, len(index.captured)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure coordinate-based capture validation.')
+    parser.add_argument('--updates', type=int, default=200000)
+    parser.add_argument('--matches', type=int, default=5)
+    parser.add_argument('--teams', type=int, default=3)
+    parser.add_argument('--players', type=int, default=2, help='players per team')
+    args = parser.parse_args()
+
+    print('%6s %6s %12s %12s %9s' % ('teams', 'cubes', 'index ns', 'linear ns', 'captures'))
+    for teams in (2, 3, 8, 16, 32, 128):
+        for cubes in (3, 300):
+            indexed, linear, captures = time_updates(teams, cubes, args.updates)
+            print('%6d %6d %12.0f %12.0f %9d' % (teams, cubes, indexed, linear, captures))
+
+    hub, port = start_hub()
+    updates = captures = 0
+    simulated = wall = 0.0
+    finished = 0
+    for seed in range(args.matches):
+        match = Match(lambda: start_connection('127.0.0.1', port), args.teams, args.players, seed, poses=True)
+        try:
+            result = match.run()
+        finally:
+            match.close()
+        finished += bool(result.winner)
+        updates += sum(judge.scorekeeper.captures.updates for judge in match.judges) // len(match.judges)
+        captures += len(result.captures)
+        simulated += result.duration
+        wall += result.wall_time
+
+    print('matches: %d (%d finished) with capture by pose, %d teams, %d players per team' % (
+        args.matches, finished, args.teams, args.players))
+    print('pose updates per judge: %.0f per simulated second, %.0f per wall second, %d captures' % (
+        updates / simulated, updates / wall, captures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Clock synchronization over loopback with skewed clocks
+Connects simulated computers to a hub on this machine, each reading a clock that is off from the
+hub's by several seconds and runs fast or slow by up to a few hundred ppm, and lets their listeners
+synchronize with pings while they send each other stamped score messages. Reports how far every
+synchronized clock is from the hub's clock, the estimated skew against the real one, and the round
+trip and one-way latency histograms.
+
+Usage:
+    python -m benchmarks.clock_sync [--computers 4] [--duration 6]
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from benchmarks.hub_load import start_hub
+from common.clock_sync import ClockSync, local_us, reference_us
+from common.message_forwarder import MessageListener, send_message, start_connection
+from common.protocol import ScoreMessage
+
+
+def skewed_clock(offset_us: int, drift: float) -> Callable[[], int]:
+    """
+    :param offset_us: microseconds the clock is ahead of the hub's when both read 0
+    :param drift: fraction the clock runs fast by, negative when it runs slow
+    :return: a clock in microseconds
+    """
+    return lambda: int(local_us() * (1 + drift)) + offset_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synchronize skewed clocks with a hub over loopback.')
+    parser.add_argument('--computers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=6.0, help='seconds to synchronize for')
+    parser.add_argument('--message-rate', type=float, default=20.0, help='score messages per second per computer')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hub, port = start_hub()
+    drifts: List[float] = []
+    connections = []
+    listeners: List[MessageListener] = []
+    for _ in range(args.computers):
+        drift = rng.uniform(-300e-6, 300e-6)
+        clock = ClockSync(skewed_clock(rng.randint(-20_000_000, 20_000_000), drift))
+        connection = start_connection('127.0.0.1', port)
+        listener = MessageListener(connection, clock=clock)
+        listener.start()
+        drifts.append(drift)
+        connections.append(connection)
+        listeners.append(listener)
+
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        for number, (connection, listener) in enumerate(zip(connections, listeners), 1):
+            send_message(connection, ScoreMessage(number, 0), listener.clock)
+        time.sleep(1 / args.message_rate)
+
+    for number, (listener, drift) in enumerate(zip(listeners, drifts), 1):
+        clock = listener.clock
+        # read both clocks back to back, the difference is the error of the synchronized clock
+        local_before = clock.clock()
+        error = clock.now_us() - reference_us()
+        true_offset = (local_before - reference_us()) / 1e6
+        print('computer %d: clock %+.3f s off the hub and %+.0f ppm fast, synchronized to %+.0f us, '
+              'skew estimated %+.0f ppm' % (number, true_offset, drift * 1e6, error,
+                                            -clock.skew / (1 + clock.skew) * 1e6 if clock.synchronized else 0))
+        print('  ' + clock.report().replace('\n', '\n  '))
+
+    for listener in listeners:
+        listener.stop()
+    for connection in connections:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
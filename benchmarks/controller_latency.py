@@ -0,0 +1,95 @@
+"""Input to state latency for the Linux controller backends
+Writes the same controller input through both paths and times how long until the consumer's state
+reflects it: binary input_event structs read by EvdevJoystick, and 140 character xboxdrv lines passed
+through a separate process and pipe to xbox.Joystick (cat on a FIFO stands in for xboxdrv).
+
+Usage:
+    python -m benchmarks.controller_latency [--samples 2000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from typing import List
+
+import xbox
+from evdev_joystick import ABS_X, EV_ABS, EV_SYN, INPUT_EVENT, SYN_REPORT, EvdevJoystick
+
+XBOXDRV_LINE = ('X1:%6d Y1:     0  X2:     0 Y2:     0  du:0 dd:0 dl:0 dr:0  back:0 guide:0 start:0  '
+                'TL:0 TR:0  A:0 B:0 X:0 Y:0  LB:0 RB:0  LT:  0 RT:  0\n')
+
+
+def evdev_latencies(samples: int) -> List[float]:
+    read_end, write_end = os.pipe()
+    os.set_blocking(read_end, False)
+    joystick = EvdevJoystick(None, fd=read_end)
+
+    latencies = []
+    for sample in range(1, samples + 1):
+        frame = INPUT_EVENT.pack(0, 0, EV_ABS, ABS_X, sample) + INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+        start = time.perf_counter()
+        os.write(write_end, frame)
+        while joystick.get_state().l_thumb_x != sample:
+            pass
+        latencies.append(time.perf_counter() - start)
+    os.close(write_end)
+    joystick.close()
+    return latencies
+
+
+def xboxdrv_latencies(samples: int) -> List[float]:
+    directory = tempfile.mkdtemp()
+    fifo = os.path.join(directory, 'xboxdrv')
+    os.mkfifo(fifo)
+    joystick = None
+    write_ends = []
+
+    def open_writer():
+        # blocks until cat opens the FIFO for reading, then prints the xboxdrv banner
+        write_ends.append(os.open(fifo, os.O_WRONLY))
+        os.write(write_ends[0], b'Press Ctrl-c to quit\n')
+
+    try:
+        writer = threading.Thread(target=open_writer)
+        writer.start()
+        joystick = xbox.Joystick(refreshRate=1e9, command=['cat', fifo])
+        writer.join()
+        write_end = write_ends[0]
+
+        latencies = []
+        for sample in range(1, samples + 1):
+            line = (XBOXDRV_LINE % sample).encode()
+            start = time.perf_counter()
+            os.write(write_end, line)
+            while joystick.snapshot().leftX != sample:
+                pass
+            latencies.append(time.perf_counter() - start)
+        return latencies
+    finally:
+        for write_end in write_ends:
+            os.close(write_end)
+        if joystick is not None:
+            joystick.close()
+        os.unlink(fifo)
+        os.rmdir(directory)
+
+
+def summary(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    return 'p50 %6.1f us  p99 %6.1f us' % (statistics.median(latencies) * 1e6,
+                                            latencies[int(len(latencies) * 0.99) - 1] * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare evdev and xboxdrv input latency.')
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    print('evdev input_event structs:     %s' % summary(evdev_latencies(args.samples)))
+    print('xboxdrv text through a pipe:   %s' % summary(xboxdrv_latencies(args.samples)))
+
+
+if __name__ == '__main__':
+    main()
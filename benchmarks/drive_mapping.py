@@ -0,0 +1,97 @@
+"""Benchmark for the stick to wheel mapping
+Replays stick traces through the original normalize_stick + if/elif ladder and through the shared
+StickDrive lookup table, and through the batched NumPy path when NumPy is installed.
+
+Usage:
+    python -m benchmarks.drive_mapping [--samples 200000] [--seed 1]
+"""
+import argparse
+import random
+import time
+from math import sqrt
+from typing import List, Tuple
+
+from common.drive import StickDrive, compute_wheels, numpy
+
+GAMEPAD_LEFT_THUMB_DEADZONE = 7849
+GAMEPAD_THUMB_MAX = 32767
+
+
+def ladder_wheels(x: int, y: int) -> Tuple[float, float]:
+    """ The mapping player.py used before the shared drive module, returning instead of driving """
+    magnitude = sqrt(x * x + y * y) + 0.01
+    left_x, left_y = x / magnitude, y / magnitude
+    if magnitude <= GAMEPAD_LEFT_THUMB_DEADZONE:
+        return 0, 0
+    if left_y >= 0.75 and abs(left_x) < 0.25:
+        return 100, 100
+    elif left_y <= -0.75 and abs(left_x) < 0.25:
+        return -100, -100
+    elif abs(left_y) < 0.25 and left_x <= -0.75:
+        return -100, 100
+    elif abs(left_y) < 0.25 and left_x >= 0.75:
+        return 100, -100
+    elif left_y >= 0.50 and left_x <= -0.50:
+        return 50, 100
+    elif left_y >= 0.50 and left_x >= 0.50:
+        return 100, 50
+    elif left_y <= -0.50 and left_x <= -0.50:
+        return -50, -100
+    elif left_y <= -0.50 and left_x >= 0.50:
+        return -100, -50
+    return 0, 0
+
+
+def stick_trace(samples: int, rng: random.Random) -> Tuple[List[int], List[int]]:
+    """ Random walk that looks like a player sweeping the stick around, with time spent at rest """
+    xs, ys = [], []
+    x = y = 0
+    for _ in range(samples):
+        if rng.random() < 0.01:
+            x = y = 0
+        x = max(-32768, min(32767, x + rng.randint(-2500, 2500)))
+        y = max(-32768, min(32767, y + rng.randint(-2500, 2500)))
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+
+def time_mapping(name: str, mapping, xs: List[int], ys: List[int]):
+    start = time.perf_counter()
+    for x, y in zip(xs, ys):
+        mapping(x, y)
+    elapsed = time.perf_counter() - start
+    print('%-22s %8.0f ns per tick' % (name, elapsed / len(xs) * 1e9))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare stick to wheel mappings on stick traces.')
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    xs, ys = stick_trace(args.samples, random.Random(args.seed))
+
+    start = time.perf_counter()
+    stick_drive = StickDrive()
+    print('lookup table built in %.0f ms' % ((time.perf_counter() - start) * 1e3))
+
+    time_mapping('if/elif ladder', ladder_wheels, xs, ys)
+    time_mapping('exact mapping', compute_wheels, xs, ys)
+    time_mapping('lookup table', stick_drive.wheels, xs, ys)
+
+    error = max(max(abs(a - c), abs(b - d)) for (a, b), (c, d) in
+                ((stick_drive.wheels(x, y), compute_wheels(x, y)) for x, y in zip(xs, ys)))
+    print('largest lookup table error: %.2f mm/s' % error)
+
+    if numpy is None:
+        print('numpy is not installed, skipping the batched mapping')
+        return
+    x_array, y_array = numpy.array(xs, dtype=numpy.int16), numpy.array(ys, dtype=numpy.int16)
+    start = time.perf_counter()
+    stick_drive.wheels_batch(x_array, y_array)
+    print('%-22s %8.0f ns per tick' % ('numpy batch', (time.perf_counter() - start) / len(xs) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
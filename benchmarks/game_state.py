@@ -0,0 +1,156 @@
+"""Stress test of the hub's authoritative game state
+Simulated judges connected to a hub all release their capture claims at the same instant, every
+cube claimed twice, game after game. An observer connected like a player checks that every game
+has exactly one winner, that nobody's score passes the winning score and that no capture is
+accepted after the exit message, and reports how quickly the hub applies claims and how long the
+winner takes to be announced.
+
+Usage:
+    python -m benchmarks.game_state [--judges 8] [--cubes 250] [--games 20]
+"""
+import argparse
+import functools
+import socket
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.hub_load import start_hub
+from common.game_state import GameState
+from common.hub import Hub
+from common.protocol import (DEFAULT_ROOM, CaptureClaimMessage, CubeCapturedMessage, ExitMessage, FrameDecoder,
+                             ScoreMessage, StartMessage, encode)
+
+
+def connect(port: int) -> socket.socket:
+    peer = socket.create_connection(('127.0.0.1', port))
+    peer.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return peer
+
+
+def drain(peer: socket.socket, decoder: FrameDecoder) -> List[tuple]:
+    """ every message already waiting on a connection """
+    messages = []
+    peer.setblocking(False)
+    try:
+        while True:
+            messages.extend(decoder.recv_from(peer))
+    except BlockingIOError:
+        pass
+    finally:
+        peer.setblocking(True)
+    return messages
+
+
+def wait_processed(hub: Hub, count: int, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    service = hub.rooms[DEFAULT_ROOM].service
+    while service.processed < count:
+        if time.perf_counter() > deadline:
+            raise TimeoutError('the game state applied %d of %d events' % (service.processed, count))
+        time.sleep(0.0005)
+
+
+def send_when_released(release: threading.Barrier, judge: socket.socket, data: bytes):
+    release.wait()
+    judge.sendall(data)
+
+
+def check_game(messages: List[tuple], winning_score: int) -> int:
+    """
+    :return: the winner of the game the observer saw
+    :raises AssertionError: if the messages are not those of a single fairly won game
+    """
+    exits = [message.team for message in messages if isinstance(message, ExitMessage)]
+    assert len(exits) == 1, 'game declared %d winners' % len(exits)
+    scores: Dict[int, int] = {}
+    captures: Dict[int, int] = {}
+    over = False
+    for message in messages:
+        if isinstance(message, CubeCapturedMessage):
+            assert not over, 'capture accepted after the exit message'
+            captures[message.team] = captures.get(message.team, 0) + 1
+        elif isinstance(message, ScoreMessage):
+            assert message.score == scores.get(message.team, 0) + 1, 'score skipped or repeated'
+            scores[message.team] = message.score
+        elif isinstance(message, ExitMessage):
+            over = True
+    assert captures == scores, 'scores do not match the accepted captures'
+    assert max(scores.values()) == winning_score == scores[exits[0]], 'the winner did not reach the winning score'
+    return exits[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress the hub with simultaneous capture claims.')
+    parser.add_argument('--judges', type=int, default=8)
+    parser.add_argument('--cubes', type=int, default=250, help='cubes every judge claims per game, at most 255')
+    parser.add_argument('--games', type=int, default=20)
+    args = parser.parse_args()
+
+    # every team can reach the winning score, so the winner is decided by whose claims the hub applies first
+    winning_score = args.cubes // 2
+    hub, port = start_hub(Hub(functools.partial(GameState, winning_score)))
+    judges = [connect(port) for _ in range(args.judges)]
+    decoders = [FrameDecoder() for _ in judges]
+    observer = connect(port)
+    observer_decoder = FrameDecoder()
+    while len(hub.peers) < len(judges) + 1:
+        time.sleep(0.01)
+
+    # each judge's claims for a game, every cube twice as if the judge saw it in two camera frames
+    claims = [b''.join(encode(CaptureClaimMessage(team, cube_id)) for cube_id in range(1, args.cubes + 1)) * 2
+              for team in range(1, args.judges + 1)]
+    events = 0
+    wins: Dict[int, int] = {}
+    apply_times: List[float] = []
+    announce_times: List[float] = []
+    for game in range(args.games):
+        judges[0].sendall(encode(StartMessage(0)))
+        events += 1
+        wait_processed(hub, events)
+
+        release = threading.Barrier(args.judges + 1)
+        threads = [threading.Thread(target=send_when_released, args=(release, judge, data))
+                   for judge, data in zip(judges, claims)]
+        for thread in threads:
+            thread.start()
+        release.wait()
+        released = time.perf_counter()
+
+        # the observer sees the exit message as soon as it is broadcast, the rest of the claims keep being applied
+        messages = []
+        while not any(isinstance(message, ExitMessage) for message in messages):
+            messages.extend(observer_decoder.recv_from(observer))
+        announce_times.append(time.perf_counter() - released)
+        for thread in threads:
+            thread.join()
+        events += args.judges * args.cubes * 2
+        wait_processed(hub, events)
+        apply_times.append(time.perf_counter() - released)
+
+        time.sleep(0.01)
+        messages.extend(drain(observer, observer_decoder))
+        winner = check_game([message for message in messages if not isinstance(message, StartMessage)],
+                            winning_score)
+        wins[winner] = wins.get(winner, 0) + 1
+        for judge, decoder in zip(judges, decoders):
+            drain(judge, decoder)
+
+    claims_per_game = args.judges * args.cubes * 2
+    state = hub.rooms[DEFAULT_ROOM].service.state
+    print('%d games, %d judges, %d claims per game released together, winning score %d' % (
+        args.games, args.judges, claims_per_game, winning_score))
+    print('every game had exactly one winner: %s' % ', '.join(
+        'team %d won %d' % (team, won) for team, won in sorted(wins.items())))
+    print('claims accepted %d, rejected %d as repeated or after the win' % (state.accepted, state.rejected))
+    print('winner announced p50 %.1f ms, max %.1f ms after the claims were released' % (
+        statistics.median(announce_times) * 1e3, max(announce_times) * 1e3))
+    print('all claims applied p50 %.1f ms, %.0f claims/s' % (
+        statistics.median(apply_times) * 1e3, claims_per_game / statistics.median(apply_times)))
+    for peer in judges + [observer]:
+        peer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Load test for the message hub
+Connects simulated judges and players to a hub running on its own thread and measures how long an
+Exit broadcast takes to reach every other peer.
+
+Usage:
+    python -m benchmarks.hub_load [--judges 3] [--players 60] [--rounds 200]
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from typing import List
+
+from common.hub import Hub
+from common.protocol import ExitMessage, encode
+
+
+def start_hub(hub: Hub = None) -> (Hub, int):
+    """
+    Run a hub on a background event loop bound to an ephemeral localhost port.
+
+    :param hub: hub to run, a new one if not given
+    :return: the hub and the port it is listening on
+    """
+    hub = hub if hub is not None else Hub()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(hub.serve('127.0.0.1', 0))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return hub, server.sockets[0].getsockname()[1]
+
+
+def run(judges: int, players: int, rounds: int) -> List[float]:
+    hub, port = start_hub()
+
+    peers: List[socket.socket] = []
+    for _ in range(judges + players):
+        peer = socket.create_connection(('127.0.0.1', port))
+        peer.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        peers.append(peer)
+    while len(hub.peers) < len(peers):
+        time.sleep(0.01)
+
+    latencies: List[float] = []
+    for game in range(rounds):
+        team = game % judges
+        message = encode(ExitMessage(team + 1))
+
+        start = time.perf_counter()
+        peers[team].sendall(message)
+        for index, peer in enumerate(peers):
+            if index != team:
+                peer.recv(len(message), socket.MSG_WAITALL)
+        latencies.append(time.perf_counter() - start)
+
+    for peer in peers:
+        peer.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay simulated judges and players against the hub.')
+    parser.add_argument('--judges', type=int, default=3)
+    parser.add_argument('--players', type=int, default=60)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    latencies = sorted(run(args.judges, args.players, args.rounds))
+    print('peers: %d, broadcasts: %d' % (args.judges + args.players, len(latencies)))
+    print('fan-out to all peers  p50 %.3f ms  p99 %.3f ms  max %.3f ms' % (
+        statistics.median(latencies) * 1e3, latencies[int(len(latencies) * 0.99) - 1] * 1e3, latencies[-1] * 1e3))
+
+
+if __name__ == '__main__':
+    main()
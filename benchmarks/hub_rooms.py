@@ -0,0 +1,145 @@
+"""Load test of a hub hosting many matches at once
+Starts a hub in its own process and fills more and more rooms with simulated computers. In every
+room one computer broadcasts a score message at a game's message rate and the time until every other
+computer of the room has it is measured, while all the other rooms do the same. Every message is
+checked to come from the receiver's own room. The fan-out latency should stay flat as rooms are
+added, and is compared against putting the same number of computers in one room.
+
+Usage:
+    python -m benchmarks.hub_rooms [--rooms 1 8 32 64] [--peers 9] [--rounds 100]
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from common.protocol import JoinMessage, ScoreMessage, encode
+
+FRAME_SIZE = len(encode(ScoreMessage(0, 0)))
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_hub(port: int) -> subprocess.Popen:
+    """ run a hub in its own process so the simulated computers do not share its interpreter """
+    hub = subprocess.Popen([sys.executable, '-m', 'common.hub', '--host', '127.0.0.1', '--port', str(port)],
+                           stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return hub
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                hub.kill()
+                raise
+            time.sleep(0.05)
+
+
+async def join(port: int, room: int) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    writer.write(encode(JoinMessage(room)))
+    return reader, writer
+
+
+async def receive(reader: asyncio.StreamReader, expected: bytes):
+    frame = await reader.readexactly(FRAME_SIZE)
+    if frame != expected:
+        raise AssertionError('a message from another room or out of order: %r instead of %r' % (frame, expected))
+
+
+async def play_room(room: int, peers: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]], rounds: int,
+                    interval: float, offset: float) -> List[float]:
+    """
+    :param room: match id, also the team of the score messages so leaks between rooms are caught
+    :param peers: connections of the room, the first one sends
+    :param rounds: broadcasts to time
+    :param interval: seconds between broadcasts
+    :param offset: seconds to wait before the first broadcast so rooms do not send in lockstep
+    :return: seconds each broadcast took to reach every other peer of the room
+    """
+    loop = asyncio.get_running_loop()
+    sender = peers[0][1]
+    latencies: List[float] = []
+    next_send = loop.time() + offset
+    for sequence in range(rounds):
+        await asyncio.sleep(max(next_send - loop.time(), 0))
+        next_send += interval
+        frame = encode(ScoreMessage(room & 0xFF, sequence & 0xFF))
+        start = time.perf_counter()
+        sender.write(frame)
+        await asyncio.gather(*(receive(reader, frame) for reader, _ in peers[1:]))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def quiet(reader: asyncio.StreamReader) -> bool:
+    """ whether nothing more arrives on a connection """
+    try:
+        await asyncio.wait_for(reader.read(1), 0.05)
+    except asyncio.TimeoutError:
+        return True
+    return False
+
+
+async def run(port: int, rooms: int, peers: int, rounds: int, rate: float) -> List[float]:
+    """
+    :return: fan-out latencies of every room's broadcasts
+    """
+    members = [[await join(port, room) for _ in range(peers)] for room in range(1, rooms + 1)]
+    # joins are applied in order per connection, give the hub a moment to apply everyone's
+    await asyncio.sleep(0.2 + 0.002 * rooms * peers)
+
+    interval = 1 / rate
+    results = await asyncio.gather(*(play_room(room, connections, rounds, interval, interval * index / rooms)
+                                     for index, (room, connections) in enumerate(zip(range(1, rooms + 1), members))))
+    silent = await asyncio.gather(*(quiet(reader) for connections in members for reader, _ in connections))
+    leaked = silent.count(False)
+    if leaked:
+        raise AssertionError('%d computers got messages meant for other rooms' % leaked)
+    for connections in members:
+        for _, writer in connections:
+            writer.close()
+    return [latency for latencies in results for latency in latencies]
+
+
+def summary(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    return 'p50 %.3f ms  p99 %.3f ms  max %.3f ms' % (
+        statistics.median(latencies) * 1e3, latencies[int(len(latencies) * 0.99) - 1] * 1e3, latencies[-1] * 1e3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure fan-out latency as a hub hosts more matches.')
+    parser.add_argument('--rooms', type=int, nargs='+', default=[1, 8, 32, 64], help='matches to host at once')
+    parser.add_argument('--peers', type=int, default=9, help='computers per match, judges and players')
+    parser.add_argument('--rounds', type=int, default=100, help='broadcasts per match')
+    parser.add_argument('--rate', type=float, default=20.0, help='broadcasts per second per match')
+    args = parser.parse_args()
+
+    port = free_port()
+    hub = start_hub(port)
+    try:
+        for rooms in args.rooms:
+            latencies = asyncio.run(run(port, rooms, args.peers, args.rounds, args.rate))
+            print('%3d rooms of %d computers, fan-out in a room  %s' % (rooms, args.peers, summary(latencies)))
+        # the same computers in one room, every broadcast goes to all of them
+        total = max(args.rooms) * args.peers
+        latencies = asyncio.run(run(port, 1, total, args.rounds, args.rate))
+        print('  1 room  of %d computers, fan-out in a room  %s' % (total, summary(latencies)))
+    finally:
+        hub.terminate()
+        hub.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Capture latency of the judge against a simulated camera
+A fake world emits object observed events for every cube in view on each camera frame, like the SDK
+does. Compares the original judge loop, which waits for one observed cube at a time with a 0.5 s
+timeout, with the event-driven Scorekeeper fed from the shared message queue. Reports how long a
+shown cube takes to be scored, how many of several cubes shown together are counted, and how long
+the judge takes to notice the exit message from another team.
+
+Usage:
+    python -m benchmarks.judge_latency [--trials 20] [--fps 15]
+"""
+import argparse
+import concurrent.futures
+import queue
+import random
+import statistics
+import threading
+import time
+from typing import List
+
+from cozmo.objects import LightCube
+
+from common.game_state import GameState
+from common.protocol import ExitMessage, FrameDecoder
+from judge import Scorekeeper, watch_cubes
+
+
+class FakeCube(LightCube):
+    def __init__(self, cube_id: int):
+        self._cube_id = cube_id
+        self.scored_at = None
+
+    def set_lights(self, light):
+        self.scored_at = time.perf_counter()
+
+    def __repr__(self):
+        return 'FakeCube(%d)' % self._cube_id
+
+
+class ServiceConnection:
+    """ Hands the judge's claims straight to a game state and queues its answers, like the hub does """
+
+    def __init__(self, messages: queue.Queue, state: GameState):
+        self.messages = messages
+        self.state = state
+        self.decoder = FrameDecoder()
+
+    def sendall(self, data: bytes):
+        for message in self.decoder.feed(data):
+            for update in self.state.handle(message):
+                self.messages.put(update)
+
+
+class FakeHandler:
+    def __init__(self, handlers: list, f):
+        self.handlers = handlers
+        self.f = f
+
+    def disable(self):
+        self.handlers.remove(self.f)
+
+
+class CameraWorld:
+    """ Emits an observed event for every cube in view once per camera frame on its own thread """
+
+    def __init__(self, fps: float):
+        self.period = 1.0 / fps
+        self.in_view: List[FakeCube] = []
+        self.handlers = []
+        self._waiters: List[concurrent.futures.Future] = []
+        self._lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._camera, daemon=True)
+        self._thread.start()
+
+    def add_event_handler(self, event, f) -> FakeHandler:
+        self.handlers.append(f)
+        return FakeHandler(self.handlers, f)
+
+    def wait_for_observed_light_cube(self, timeout=None) -> LightCube:
+        # like the SDK, only events emitted after the call can complete the wait
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._waiters.append(future)
+        return future.result(timeout)
+
+    def show(self, cubes: List[FakeCube]) -> float:
+        shown_at = time.perf_counter()
+        self.in_view = list(cubes)
+        return shown_at
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+    def _camera(self):
+        next_frame = time.monotonic()
+        while self._running:
+            next_frame += self.period
+            time.sleep(max(0.0, next_frame - time.monotonic()))
+            for cube in self.in_view:
+                for handler in list(self.handlers):
+                    handler(None, obj=cube)
+                with self._lock:
+                    waiters, self._waiters = self._waiters, []
+                for waiter in waiters:
+                    waiter.set_result(cube)
+
+
+class PollingJudge:
+    """ The judge loop as it was: one observed cube per wake-up, checking the network between waits """
+
+    def __init__(self, world: CameraWorld, cubes: List[FakeCube], game_over: threading.Event):
+        self.world = world
+        self.cubes = cubes
+        self.game_over = game_over
+
+    def run(self):
+        while not self.game_over.is_set():
+            captured_cube = None
+            try:
+                captured_cube = self.world.wait_for_observed_light_cube(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                pass
+            if captured_cube in self.cubes:
+                captured_cube.set_lights(None)
+                self.cubes.remove(captured_cube)
+
+
+def run_polling(fps: float, shown: int, exit_after: float) -> (List[float], int, float):
+    world = CameraWorld(fps)
+    cubes = [FakeCube(cube_id) for cube_id in range(1, 4)]
+    game_over = threading.Event()
+    judge = PollingJudge(world, list(cubes), game_over)
+    thread = threading.Thread(target=judge.run)
+    thread.start()
+    return finish(world, cubes, shown, exit_after, game_over.set, thread)
+
+
+def run_events(fps: float, shown: int, exit_after: float) -> (List[float], int, float):
+    world = CameraWorld(fps)
+    cubes = [FakeCube(cube_id) for cube_id in range(1, 4)]
+    messages = queue.Queue()
+    connection = ServiceConnection(messages, GameState(winning_score=len(cubes) + 1))
+    scorekeeper = Scorekeeper(connection, 1, None, list(cubes))
+    watch_cubes(world, messages)
+    thread = threading.Thread(target=scorekeeper.run, args=(messages,))
+    thread.start()
+    return finish(world, cubes, shown, exit_after, lambda: messages.put(ExitMessage(2)), thread)
+
+
+def finish(world: CameraWorld, cubes: List[FakeCube], shown: int, exit_after: float, send_exit,
+           thread: threading.Thread) -> (List[float], int, float):
+    """ show cubes at a random point in the frame, then send the exit message while nothing is in view """
+    time.sleep(world.period * (0.5 + random.random()))
+    shown_at = world.show(cubes[:shown])
+    time.sleep(exit_after)
+    world.show([])
+    time.sleep(world.period * 2 + random.random() * 0.5)
+
+    exit_at = time.perf_counter()
+    send_exit()
+    thread.join()
+    exit_latency = time.perf_counter() - exit_at
+    world.stop()
+
+    scored = [cube.scored_at - shown_at for cube in cubes[:shown] if cube.scored_at is not None]
+    return scored, len(scored), exit_latency
+
+
+def report(name: str, trials: List[tuple], shown: int):
+    latencies = [latency for scored, count, exit_latency in trials for latency in scored]
+    counted = sum(count for scored, count, exit_latency in trials)
+    exits = [exit_latency for scored, count, exit_latency in trials]
+    print('%s capture p50 %6.1f ms  max %6.1f ms | %d/%d cubes counted | exit noticed p50 %6.1f ms  max %6.1f ms' % (
+        name, statistics.median(latencies) * 1e3 if latencies else float('nan'),
+        max(latencies) * 1e3 if latencies else float('nan'), counted, shown * len(trials),
+        statistics.median(exits) * 1e3, max(exits) * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare polling and event-driven cube capture in the judge.')
+    parser.add_argument('--trials', type=int, default=20)
+    parser.add_argument('--fps', type=float, default=15, help='camera frames per second')
+    parser.add_argument('--shown', type=int, default=3, help='cubes held up to the judge at once')
+    args = parser.parse_args()
+    random.seed(1)
+
+    # keep the cubes in view for a few frames, long enough for a person to hold them up
+    exit_after = 5 / args.fps
+    report('wait_for_observed_light_cube:', [run_polling(args.fps, args.shown, exit_after)
+                                             for _ in range(args.trials)], args.shown)
+    report('object observed events:      ', [run_events(args.fps, args.shown, exit_after)
+                                             for _ in range(args.trials)], args.shown)
+
+
+if __name__ == '__main__':
+    main()
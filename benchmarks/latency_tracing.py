@@ -0,0 +1,90 @@
+"""Cost of the control tick latency tracing
+Measures what bracketing one stage with now() and record() costs with tracing disabled and enabled,
+then runs a seat's control loop unpaced against a simulated robot with tracing off and on and prints
+the per stage latencies it recorded, including the network stage of a listener fed over a socket pair.
+
+Usage:
+    python -m benchmarks.latency_tracing [--iterations 1000000] [--ticks 100000]
+"""
+import argparse
+import socket
+import time
+
+from common.drive import StickDrive
+from common.gamepad import GamepadState
+from common.message_forwarder import MessageListener
+from common.protocol import ScoreMessage, encode
+from common.seats import Seat
+from common.tracing import READ, LatencyTracer
+from player import check_controller_state
+from simulation.world import Arena
+
+
+class SweepingPad:
+    def __init__(self):
+        self.packet_number = 0
+
+    def get_state(self) -> GamepadState:
+        self.packet_number += 1
+        x = (self.packet_number * 37) % 65536 - 32768
+        return GamepadState(self.packet_number, 0, 0, 0, x, 30000, 0, 0)
+
+
+def stage_cost(tracer: LatencyTracer, iterations: int) -> float:
+    """ nanoseconds added by bracketing an empty stage """
+    now = tracer.now
+    record = tracer.record
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        pass
+    empty = time.perf_counter_ns() - start
+
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        record(READ, now())
+    return (time.perf_counter_ns() - start - empty) / iterations
+
+
+def run_seat(ticks: int, enabled: bool) -> (Seat, float):
+    seat = Seat(Arena().add_robot(1, 1000.0, 1000.0, 0.0), SweepingPad(), 1e9, LatencyTracer(enabled=enabled))
+    # run the ticks back to back
+    seat.scheduler.sleep = lambda seconds: None
+    start = time.perf_counter()
+    seat.run(check_controller_state, StickDrive(), lambda: seat.scheduler.ticks >= ticks)
+    return seat, (time.perf_counter() - start) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the overhead of latency tracing.')
+    parser.add_argument('--iterations', type=int, default=1000000)
+    parser.add_argument('--ticks', type=int, default=100000)
+    args = parser.parse_args()
+
+    print('one traced stage, tracing off: %6.1f ns' % stage_cost(LatencyTracer(), args.iterations))
+    print('one traced stage, tracing on:  %6.1f ns' % stage_cost(LatencyTracer(enabled=True), args.iterations))
+
+    seat, disabled = run_seat(args.ticks, False)
+    seat, enabled = run_seat(args.ticks, True)
+    print('seat tick, tracing off: %6.2f us' % (disabled * 1e6))
+    print('seat tick, tracing on:  %6.2f us' % (enabled * 1e6))
+    print(seat.tracer.report())
+
+    # the listener records the network stage on its own thread
+    sender, receiver = socket.socketpair()
+    listener = MessageListener(receiver, tracer=LatencyTracer(enabled=True))
+    listener.start()
+    frame = encode(ScoreMessage(1, 1))
+    for _ in range(2000):
+        sender.sendall(frame)
+        time.sleep(0.0002)
+    while listener.messages.qsize() < 2000:
+        time.sleep(0.01)
+    listener.stop()
+    listener.join()
+    print(listener.tracer.report().splitlines()[0])
+    sender.close()
+    receiver.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Several robots and controllers in one player process
+Drives a number of fake robots from fake controllers whose stick sweeps continuously, with one robot
+that takes a long time to accept every command. Compares a single loop that serves every seat in turn
+with one control loop thread per seat, reporting how many commands each fast robot received.
+
+Usage:
+    python -m benchmarks.multi_seat [--seats 4] [--slow-command 0.03] [--duration 3] [--rate 60]
+"""
+import argparse
+import threading
+import time
+from typing import List
+
+from common.drive import StickDrive
+from common.gamepad import GamepadState
+from common.scheduler import FixedRateScheduler
+from common.seats import Seat, run_seats
+from player import check_controller_state
+
+
+class FakeRobot:
+    def __init__(self, command_time: float):
+        self.command_time = command_time
+        self.commands = 0
+
+    def drive_wheels(self, l_wheel_speed, r_wheel_speed, l_wheel_acc=None, r_wheel_acc=None):
+        if self.command_time:
+            time.sleep(self.command_time)
+        self.commands += 1
+
+    def move_lift(self, speed):
+        pass
+
+
+class SweepingPad:
+    """ Controller whose left stick turns a full circle every second, so every poll is new input """
+
+    def __init__(self):
+        self.packet_number = 0
+
+    def get_state(self) -> GamepadState:
+        self.packet_number += 1
+        x = int((time.monotonic() % 1.0) * 60000) - 30000
+        return GamepadState(self.packet_number, 0, 0, 0, x, 30000, 0, 0)
+
+
+def make_seats(count: int, slow_command: float, rate: float) -> List[Seat]:
+    # the first seat's robot is the slow one
+    return [Seat(FakeRobot(slow_command if number == 0 else 0.0), SweepingPad(), rate) for number in range(count)]
+
+
+def run_shared_loop(seats: List[Seat], rate: float, duration: float) -> FixedRateScheduler:
+    """ one loop serving every seat in turn, so each robot waits for the ones before it """
+    stick_drive = StickDrive()
+    scheduler = FixedRateScheduler(rate)
+    deadline = time.monotonic() + duration
+
+    def tick():
+        for seat in seats:
+            check_controller_state(seat.shaper, seat.joystick.get_state(), seat.pickup, stick_drive)
+
+    scheduler.run(tick, lambda: time.monotonic() >= deadline)
+    return scheduler
+
+
+def run_seat_threads(seats: List[Seat], duration: float):
+    """ one control loop thread per seat """
+    stop = threading.Event()
+    timer = threading.Timer(duration, stop.set)
+    timer.start()
+    run_seats(seats, check_controller_state, StickDrive(), stop.is_set)
+
+
+def fast_commands(seats: List[Seat], duration: float) -> str:
+    rates = [seat.robot.commands / duration for seat in seats[1:]]
+    return 'fast robots %.0f-%.0f commands/s, slow robot %.0f commands/s' % (
+        min(rates), max(rates), seats[0].robot.commands / duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a shared control loop with one loop per seat.')
+    parser.add_argument('--seats', type=int, default=4)
+    parser.add_argument('--slow-command', type=float, default=0.03, help='seconds the slow robot takes per command')
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--rate', type=float, default=60)
+    args = parser.parse_args()
+
+    seats = make_seats(args.seats, args.slow_command, args.rate)
+    scheduler = run_shared_loop(seats, args.rate, args.duration)
+    print('one loop for every seat:   %s' % fast_commands(seats, args.duration))
+    print('  %s' % scheduler.report())
+
+    seats = make_seats(args.seats, args.slow_command, args.rate)
+    run_seat_threads(seats, args.duration)
+    print('one loop thread per seat:  %s' % fast_commands(seats, args.duration))
+    for number, seat in enumerate(seats, 1):
+        print('  seat %d: %s' % (number, seat.report().replace('\n', '\n  ')))
+
+
+if __name__ == '__main__':
+    main()
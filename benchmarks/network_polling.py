@@ -0,0 +1,53 @@
+"""Microbenchmark for checking the network from the control loop
+Compares polling the socket with a non-blocking receive every iteration against checking the
+game over flag set by the background MessageListener.
+
+Usage:
+    python -m benchmarks.network_polling [--seconds 1.0]
+"""
+import argparse
+import socket
+import time
+
+from common.message_forwarder import MessageListener, receive_message
+from common.protocol import FrameDecoder
+
+
+def polling_loop(connection: socket.socket, seconds: float) -> float:
+    decoder = FrameDecoder()
+    iterations = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        receive_message(connection, decoder)
+        iterations += 1
+    return iterations / seconds
+
+
+def listener_loop(connection: socket.socket, seconds: float) -> float:
+    listener = MessageListener(connection)
+    listener.start()
+    iterations = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline and not listener.game_over.is_set():
+        iterations += 1
+    listener.stop()
+    listener.join()
+    return iterations / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare control loop rates with and without socket polling.')
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    _, connection = socket.socketpair()
+    connection.setblocking(False)
+
+    before = polling_loop(connection, args.seconds)
+    after = listener_loop(connection, args.seconds)
+    print('non-blocking recv per iteration: %12.0f iterations/s' % before)
+    print('listener flag per iteration:     %12.0f iterations/s (%.1fx)' % (after, after / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark for the framed message protocol
+Streams a mix of messages through a socket pair with random segment sizes, so frames are both
+coalesced and split, then checks every message is decoded intact and reports the throughput.
+
+Usage:
+    python -m benchmarks.protocol_coalescing [--messages 200000] [--seed 1]
+"""
+import argparse
+import random
+import socket
+import threading
+import time
+from typing import List
+
+from common.protocol import CubeCapturedMessage, ExitMessage, FrameDecoder, ScoreMessage, encode
+
+
+def make_messages(count: int, rng: random.Random) -> List[tuple]:
+    kinds = [lambda: ExitMessage(rng.randint(1, 3)),
+             lambda: ScoreMessage(rng.randint(1, 3), rng.randint(0, 3)),
+             lambda: CubeCapturedMessage(rng.randint(1, 3), rng.randint(1, 3))]
+    return [rng.choice(kinds)() for _ in range(count)]
+
+
+def send_segments(connection: socket.socket, stream: bytes, rng: random.Random):
+    """ Write the stream in random sized pieces, from a single byte up to many frames at once """
+    offset = 0
+    while offset < len(stream):
+        size = rng.choice((1, 2, 3, 7, 64, 1500))
+        connection.sendall(stream[offset:offset + size])
+        offset += size
+    connection.shutdown(socket.SHUT_WR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and time frame decoding under packet coalescing.')
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = make_messages(args.messages, rng)
+    stream = b''.join(encode(message) for message in messages)
+
+    # decoding bytes already in memory
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    decoded = decoder.feed(stream)
+    elapsed = time.perf_counter() - start
+    assert decoded == messages, 'in-memory decode mismatch'
+    print('feed:      %9.0f messages/s' % (len(messages) / elapsed))
+
+    # decoding straight off a socket that receives coalesced and split segments
+    sender, receiver = socket.socketpair()
+    writer = threading.Thread(target=send_segments, args=(sender, stream, rng))
+    decoder = FrameDecoder()
+    decoded = []
+    start = time.perf_counter()
+    writer.start()
+    try:
+        while True:
+            decoded.extend(decoder.recv_from(receiver))
+    except ConnectionError:
+        pass
+    elapsed = time.perf_counter() - start
+    writer.join()
+    assert decoded == messages, 'socket decode mismatch'
+    print('recv_from: %9.0f messages/s over %d bytes, all %d messages intact' % (
+        len(messages) / elapsed, len(stream), len(decoded)))
+
+    # the old space split parser on the same coalesced stream
+    legacy = b''.join(b'Exit %d' % message.team for message in messages if isinstance(message, ExitMessage))
+    print('legacy split parser sees %d tokens for %d exit messages sent in one segment' % (
+        len(legacy[:1500].decode('utf-8').split(' ')), legacy[:1500].count(b'Exit')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Jitter measurement for the fixed rate control loop scheduler
+Runs a stand-in control tick with a variable amount of work and reports tick latency, start
+jitter, overruns and how much CPU the loop used compared with the unpaced spin it replaces.
+
+Usage:
+    python -m benchmarks.scheduler_jitter [--rate 60] [--seconds 3] [--work-ms 2]
+"""
+import argparse
+import random
+import time
+
+from common.scheduler import FixedRateScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure scheduler jitter and CPU use.')
+    parser.add_argument('--rate', type=float, default=60)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--work-ms', type=float, default=2, help='upper bound of simulated work per tick')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+
+    def tick():
+        # busy work standing in for reading the controller and sending robot commands
+        end = time.perf_counter() + rng.uniform(0, args.work_ms / 1e3)
+        while time.perf_counter() < end:
+            pass
+
+    scheduler = FixedRateScheduler(args.rate)
+    deadline = time.monotonic() + args.seconds
+    cpu_start = time.process_time()
+    scheduler.run(tick, lambda: time.monotonic() >= deadline)
+    cpu_paced = time.process_time() - cpu_start
+
+    print(scheduler.report())
+    print('  expected ticks: %d, CPU used: %.0f%% of one core' % (
+        args.rate * args.seconds, cpu_paced / args.seconds * 100))
+
+    spins = 0
+    cpu_start = time.process_time()
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        tick()
+        spins += 1
+    print('unpaced loop: %d ticks, CPU used: %.0f%% of one core' % (
+        spins, (time.process_time() - cpu_start) / args.seconds * 100))
+
+
+if __name__ == '__main__':
+    main()
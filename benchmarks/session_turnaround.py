@@ -0,0 +1,89 @@
+"""Turnaround between consecutive games
+Plays several short games between a coordinating judge and simulated judges and players connected
+to a hub running on its own thread, and measures the time from the winning Exit to the start of the
+next game. In a session every computer keeps its connection and listener and only resets the game
+state, and the coordinator counts the later games down from ROUND_COUNTDOWN; without one every
+computer reconnects to the hub for each game and the countdown is DEFAULT_COUNTDOWN, as in a fresh
+run of judge.py or player.py. Reconnecting to the robot, finding the controllers and answering the
+prompts come on top of that in a fresh run and are not simulated.
+
+Usage:
+    python -m benchmarks.session_turnaround [--computers 6] [--games 5]
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import threading
+import time
+from typing import List
+
+from benchmarks.hub_load import start_hub
+from common.barrier import DEFAULT_COUNTDOWN, JUDGE, PLAYER, ROUND_COUNTDOWN, StartBarrier
+from common.message_forwarder import MessageListener, send_message, start_connection
+from common.protocol import ExitMessage
+
+# seconds every game lasts
+GAME_LENGTH = 0.2
+
+
+def play_games(port: int, computers: int, games: int, countdown: float, session: bool) -> List[float]:
+    """
+    :return: seconds from each Exit to the start of the following game on the last computer to start
+    """
+    exits: List[float] = [0.0] * games
+    starts: List[List[float]] = [[0.0] * computers for _ in range(games)]
+
+    def computer(index: int):
+        coordinator = index == 0
+        connection = start_connection('127.0.0.1', port)
+        listener = MessageListener(connection)
+        listener.start()
+        for game in range(games):
+            StartBarrier(connection, listener, 1 if index < 2 else 2, JUDGE if index < 2 else PLAYER,
+                         computers - 1 if coordinator else 0, countdown).wait()
+            starts[game][index] = time.monotonic()
+            if coordinator:
+                time.sleep(GAME_LENGTH)
+                exits[game] = time.monotonic()
+                send_message(connection, ExitMessage(1))
+            else:
+                listener.game_over.wait()
+            if session:
+                listener.new_round()
+            elif game < games - 1:
+                listener.stop()
+                connection.close()
+                connection = start_connection('127.0.0.1', port)
+                listener = MessageListener(connection)
+                listener.start()
+        listener.stop()
+        connection.close()
+
+    threads = [threading.Thread(target=computer, args=(index,)) for index in range(computers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [max(starts[game + 1]) - exits[game] for game in range(games - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the turnaround between consecutive games.')
+    parser.add_argument('--computers', type=int, default=6, help='judges and players, including the coordinator')
+    parser.add_argument('--games', type=int, default=5)
+    args = parser.parse_args()
+
+    hub, port = start_hub()
+    print('%d computers, %d games' % (args.computers, args.games))
+    for name, session, countdown in (('reconnect every game', False, DEFAULT_COUNTDOWN),
+                                     ('session', True, ROUND_COUNTDOWN)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            turnarounds = play_games(port, args.computers, args.games, countdown, session)
+        print('%-22s Exit to next start p50 %.3f s  max %.3f s  (%.1f ms over the %.0f s countdown)' % (
+            name, statistics.median(turnarounds), max(turnarounds),
+            (statistics.median(turnarounds) - countdown) * 1e3, countdown))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Simulated matches through a real hub
+Plays whole capture the flag matches with simulated robots and scripted players against a hub
+running on its own thread, and reports how much faster than real time they run, the cost of a
+control tick across every robot and the network traffic of a match.
+
+Usage:
+    python -m benchmarks.simulated_match [--matches 20] [--teams 3] [--players 2]
+"""
+import argparse
+import statistics
+
+from benchmarks.hub_load import start_hub
+from common.message_forwarder import start_connection
+from simulation.match import Match
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play simulated matches through a local hub.')
+    parser.add_argument('--matches', type=int, default=20)
+    parser.add_argument('--teams', type=int, default=3)
+    parser.add_argument('--players', type=int, default=2, help='players per team')
+    args = parser.parse_args()
+
+    hub, port = start_hub()
+    results = []
+    for seed in range(args.matches):
+        match = Match(lambda: start_connection('127.0.0.1', port), args.teams, args.players, seed)
+        try:
+            results.append(match.run())
+        finally:
+            match.close()
+
+    finished = [result for result in results if result.winner]
+    simulated = sum(result.duration for result in results)
+    wall = sum(result.wall_time for result in results)
+    ticks = sum(result.ticks for result in results)
+    robots = args.teams * (args.players + 1)
+    print('matches: %d (%d finished), %d teams, %d robots' % (len(results), len(finished), args.teams, robots))
+    print('simulated %.0f s in %.2f s of wall time (%.0fx real time)' % (simulated, wall, simulated / wall))
+    print('control tick for every robot: %.1f us' % (wall / ticks * 1e6))
+    print('match length p50 %.1f s, messages sent per match %.1f, received %.1f, relayed by the hub %d' % (
+        statistics.median(result.duration for result in finished),
+        statistics.mean(result.messages_sent for result in results),
+        statistics.mean(result.messages_received for result in results), hub.messages_relayed))
+    for team in range(1, args.teams + 1):
+        print('team %d won %d' % (team, sum(1 for result in finished if result.winner == team)))
+
+
+if __name__ == '__main__':
+    main()
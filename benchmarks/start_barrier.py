@@ -0,0 +1,84 @@
+"""Start of game latency with the ready barrier
+Connects a coordinating judge and simulated judges and players to a hub running on its own thread.
+Every computer becomes ready after a random setup time; the report shows how long after the last
+one was ready the game started, how far apart the computers started and how much waiting is saved
+compared with the fixed 10 second sleep.
+
+Usage:
+    python -m benchmarks.start_barrier [--computers 6] [--rounds 10] [--countdown 0.5]
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import threading
+import time
+from typing import List
+
+from benchmarks.hub_load import start_hub
+from common.barrier import JUDGE, PLAYER, StartBarrier
+from common.message_forwarder import MessageListener, start_connection
+
+FIXED_WAIT = 10.0
+
+
+def play_round(port: int, computers: int, countdown: float, rng: random.Random) -> (float, float, float):
+    """
+    :return: seconds from the last computer being ready to the start, spread of the start times and
+             the time of the last ready relative to the round
+    """
+    connections = [start_connection('127.0.0.1', port) for _ in range(computers)]
+    listeners = [MessageListener(connection) for connection in connections]
+    for listener in listeners:
+        listener.start()
+
+    setup_times = [rng.uniform(0.1, 1.5) for _ in range(computers)]
+    started: List[float] = [0.0] * computers
+    origin = time.monotonic()
+
+    def computer(index: int):
+        time.sleep(setup_times[index])
+        barrier = StartBarrier(connections[index], listeners[index], 1 if index == 0 else 2,
+                               JUDGE if index < 2 else PLAYER, computers - 1 if index == 0 else 0, countdown)
+        barrier.wait()
+        started[index] = time.monotonic() - origin
+
+    threads = [threading.Thread(target=computer, args=(index,)) for index in range(computers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for listener, connection in zip(listeners, connections):
+        listener.stop()
+        connection.close()
+
+    last_ready = max(setup_times)
+    return min(started) - last_ready - countdown, max(started) - min(started), last_ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure how quickly the ready barrier starts a game.')
+    parser.add_argument('--computers', type=int, default=6, help='judges and players, including the coordinator')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--countdown', type=float, default=0.5)
+    args = parser.parse_args()
+
+    hub, port = start_hub()
+    rng = random.Random(1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [play_round(port, args.computers, args.countdown, rng) for _ in range(args.rounds)]
+
+    overheads = [result[0] for result in results]
+    spreads = [result[1] for result in results]
+    saved = [FIXED_WAIT - (result[2] + args.countdown) for result in results]
+    print('%d computers, %d rounds, %.1f s countdown' % (args.computers, args.rounds, args.countdown))
+    print('last ready to start message: p50 %.2f ms  max %.2f ms' % (
+        statistics.median(overheads) * 1e3, max(overheads) * 1e3))
+    print('spread of start times:       p50 %.2f ms  max %.2f ms' % (
+        statistics.median(spreads) * 1e3, max(spreads) * 1e3))
+    print('waiting saved against the fixed %.0f s sleep: %.1f s per round' % (FIXED_WAIT, statistics.mean(saved)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Startup time of the player and judge
+Starts a fresh interpreter for each entry point with -X importtime, reports the median wall time
+above a bare interpreter and the slowest imports it makes, and checks that neither the player's nor
+the judge's command line loads the cozmo SDK or numpy and that no entry point loads a controller
+backend it does not use.
+Exits with status 1 if a check fails, so it can be run as a test.
+
+Usage:
+    python -m benchmarks.startup [--runs 10] [--budget-ms 150]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name, interpreter arguments and the heavy modules the entry point must not import
+ENTRY_POINTS: List[Tuple[str, List[str], List[str]]] = [
+    ('python -c pass', ['-c', 'pass'], []),
+    ('player.py --help', ['player.py', '--help'], ['cozmo', 'numpy', 'asyncio', 'ctypes', 'evdev_joystick']),
+    ('import player', ['-c', 'import player'], ['cozmo', 'numpy', 'asyncio', 'ctypes', 'evdev_joystick']),
+    ('import evdev_joystick', ['-c', 'import evdev_joystick'], ['ctypes', 'xinput']),
+    ('import xinput', ['-c', 'import xinput'], ['evdev_joystick']),
+    ('judge.py --help', ['judge.py', '--help'], ['cozmo', 'numpy', 'ctypes', 'xinput', 'evdev_joystick']),
+    ('import judge', ['-c', 'import judge'], ['cozmo', 'numpy', 'ctypes', 'xinput', 'evdev_joystick']),
+    ('import simulation.match', ['-c', 'import simulation.match'], ['xinput', 'evdev_joystick']),
+    ('scoreboard.py --help', ['scoreboard.py', '--help'], ['cozmo', 'numpy']),
+    ('import scoreboard', ['-c', 'import scoreboard'], ['cozmo', 'numpy']),
+    ('import common.telemetry', ['-c', 'import common.telemetry'], ['cozmo']),
+    ('import common.commands', ['-c', 'import common.commands'], ['cozmo']),
+]
+
+
+def run(arguments: List[str]) -> (float, Dict[str, int], List[Tuple[int, str]]):
+    """
+    :param arguments: interpreter arguments
+    :return: wall time in seconds, cumulative import time of every module in microseconds and the
+             imports made by the entry point itself with their cumulative times
+    """
+    # a script's own imports are at the top level, those of a module imported with -c one level below it
+    depth = 1 if arguments[0] == '-c' else 0
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+
+    modules: Dict[str, int] = {}
+    direct: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+        # nested imports are indented by two spaces per level after the separator
+        if (len(name) - len(name.lstrip()) - 1) // 2 == depth:
+            direct.append((int(cumulative), name.strip()))
+    return elapsed, modules, direct
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the player and judge.')
+    parser.add_argument('--runs', type=int, default=10, help='interpreters started per entry point')
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help='most time player.py --help may take above a bare interpreter')
+    parser.add_argument('--top', type=int, default=3, help='slowest imports shown per entry point')
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    bare = None
+    for name, arguments, forbidden in ENTRY_POINTS:
+        times = []
+        for _ in range(args.runs):
+            elapsed, modules, direct = run(arguments)
+            times.append(elapsed)
+        median = statistics.median(times)
+        if bare is None:
+            bare = median
+            print('%-24s %7.1f ms' % (name, median * 1e3))
+            continue
+
+        print('%-24s %7.1f ms  (+%.1f ms)' % (name, median * 1e3, (median - bare) * 1e3))
+        for cumulative, module in sorted(direct, reverse=True)[:args.top]:
+            print('    %-28s %7.1f ms' % (module, cumulative / 1e3))
+
+        loaded = [module for module in forbidden if module in modules]
+        if loaded:
+            failures.append('%s imports %s' % (name, ', '.join(loaded)))
+        if name == 'player.py --help' and (median - bare) * 1e3 > args.budget_ms:
+            failures.append('%s takes %.1f ms, over the %.0f ms budget' % (name, (median - bare) * 1e3,
+                                                                           args.budget_ms))
+
+    for failure in failures:
+        print('FAIL: %s' % failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""UDP pose telemetry
+Runs a seat's control loop on a simulated robot with and without a telemetry thread publishing its
+state to a receiver on loopback and compares the whole tick latency, then feeds a receiver datagrams from many robots
+in a shuffled order to measure its cost per datagram and check that only the newest state of every
+robot is kept.
+
+Usage:
+    python -m benchmarks.telemetry [--duration 3] [--rate 60] [--robots 16] [--datagrams 200000]
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from typing import List
+
+from common.drive import StickDrive
+from common.gamepad import GamepadState
+from common.seats import Seat
+from common.telemetry import MAGIC, PACKET, TelemetryReceiver, TelemetrySender, tenths_of_degree
+from common.tracing import TICK, LatencyTracer
+from player import check_controller_state
+from simulation.world import Arena
+
+
+class SweepingPad:
+    """ Controller whose left stick turns a full circle every second, so every poll is new input """
+
+    def __init__(self):
+        self.packet_number = 0
+
+    def get_state(self) -> GamepadState:
+        self.packet_number += 1
+        x = int((time.monotonic() % 1.0) * 60000) - 30000
+        return GamepadState(self.packet_number, 0, 0, 0, x, 30000, 0, 0)
+
+
+def run_seat(rate: float, duration: float, receiver: TelemetryReceiver = None) -> List[int]:
+    """
+    :param receiver: receiver to publish telemetry to, none is published if not given
+    :return: whole tick durations in nanoseconds
+    """
+    arena = Arena()
+    robot = arena.add_robot(1, 1000.0, 1000.0, 0.0)
+    seat = Seat(robot, SweepingPad(), rate, LatencyTracer(enabled=True))
+    sender = None
+    if receiver is not None:
+        sender = TelemetrySender(robot, 1, 1, lambda x, y, heading: (x, y, heading), ('127.0.0.1', receiver.port))
+        sender.start()
+    stop = threading.Event()
+    timer = threading.Timer(duration, stop.set)
+    timer.start()
+    seat.run(check_controller_state, StickDrive(), stop.is_set)
+    if sender is not None:
+        sender.stop()
+        sender.join()
+    return seat.tracer.samples(TICK)
+
+
+def tick_report(samples: List[int]) -> str:
+    ordered = sorted(samples)
+    return 'p50 %.1f us, p99 %.1f us, max %.1f us over %d ticks' % (
+        ordered[len(ordered) // 2] / 1000, ordered[int(len(ordered) * 0.99)] / 1000, ordered[-1] / 1000, len(ordered))
+
+
+def shuffled_datagrams(robots: int, count: int, window: int, seed: int = 0) -> List[bytes]:
+    """
+    :return: datagrams from every robot in turn, shuffled within windows to reorder and delay some of them
+    """
+    datagrams = []
+    for index in range(count):
+        number = index % robots
+        sequence = index // robots + 1
+        datagrams.append(PACKET.pack(MAGIC, sequence, 0, number % 8 + 1, number // 8 + 1, index % 2000, 1000,
+                                     tenths_of_degree(0.001 * index), 0, 0))
+    rng = random.Random(seed)
+    for start in range(0, count, window):
+        block = datagrams[start:start + window]
+        rng.shuffle(block)
+        datagrams[start:start + window] = block
+    return datagrams
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure UDP pose telemetry.')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds of control loop per run')
+    parser.add_argument('--rate', type=float, default=60.0, help='control loop rate')
+    parser.add_argument('--robots', type=int, default=16)
+    parser.add_argument('--datagrams', type=int, default=200000)
+    args = parser.parse_args()
+
+    # the scoreboard runs on another computer, so the datagrams are only read once the seat has stopped
+    # instead of on a receiver thread competing with the control loop for the interpreter
+    receiver = TelemetryReceiver(('127.0.0.1', 0))
+    without = run_seat(args.rate, args.duration)
+    with_telemetry = run_seat(args.rate, args.duration, receiver)
+    receiver.poll()
+    receiver.close()
+    print('control tick without telemetry: %s' % tick_report(without))
+    print('control tick with telemetry:    %s' % tick_report(with_telemetry))
+    print('difference of the means: %+.1f us per tick, %d datagrams received at %.1f Hz' % (
+        (statistics.mean(with_telemetry) - statistics.mean(without)) / 1000, receiver.received,
+        receiver.received / args.duration))
+
+    datagrams = shuffled_datagrams(args.robots, args.datagrams, window=args.robots * 4)
+    receiver = TelemetryReceiver(None, capacity=args.robots)
+    start = time.perf_counter()
+    for datagram in datagrams:
+        receiver.feed(datagram)
+    elapsed = time.perf_counter() - start
+    newest = args.datagrams // args.robots
+    assert all(state.sequence == newest for state in receiver.states()), 'a stale state was kept'
+    print('receiver: %.0f ns per datagram, %d applied, %d stale or reordered dropped, %d robots tracked' % (
+        elapsed / len(datagrams) * 1e9, receiver.received, receiver.stale, len(receiver.states())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Scaling of the tournament runner with worker processes
+Plays the same tournament with 1, 2, 4 ... workers up to the number of cores, reports matches per
+second and the speedup over one worker, and checks every run produced the same results.
+
+Usage:
+    python -m benchmarks.tournament_scaling [--matches 400] [--teams 2] [--players 1]
+"""
+import argparse
+import os
+import time
+
+from simulation.tournament import run_tournament
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure how the tournament runner scales with cores.')
+    parser.add_argument('--matches', type=int, default=400)
+    parser.add_argument('--teams', type=int, default=2)
+    parser.add_argument('--players', type=int, default=1, help='players per team')
+    args = parser.parse_args()
+
+    counts = []
+    workers = 1
+    while workers < os.cpu_count():
+        counts.append(workers)
+        workers *= 2
+    counts.append(os.cpu_count())
+
+    baseline = None
+    reference = None
+    for workers in counts:
+        start = time.perf_counter()
+        results = run_tournament(args.matches, args.teams, args.players, workers=workers)
+        rate = len(results) / (time.perf_counter() - start)
+        baseline = baseline or rate
+
+        outcome = (results.winner.tobytes(), results.capture_time.tobytes())
+        reference = reference or outcome
+        print('%3d workers: %7.1f matches/s  %5.2fx  (%3.0f%% of linear)%s' % (
+            workers, rate, rate / baseline, 100.0 * rate / baseline / workers,
+            '' if outcome == reference else '  RESULTS DIFFER'))
+
+
+if __name__ == '__main__':
+    main()
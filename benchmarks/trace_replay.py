@@ -0,0 +1,126 @@
+"""Record, replay and analyse controller traces
+Records a synthetic play session of controller polls, then measures how fast records are appended,
+how fast they replay through check_controller_state at maximum speed, how closely real time replay
+follows the recorded timing and how long a bulk analysis of the trace takes with numpy compared with
+a Python loop over the records. The trace size is compared with logging the state dicts as JSON lines.
+
+Usage:
+    python -m benchmarks.trace_replay [--records 100000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from common.commands import CommandShaper
+from common.drive import StickDrive
+from common.gamepad import GamepadState, GAMEPAD_A, GAMEPAD_B, GAMEPAD_Y
+from common.input_trace import ReplayJoystick, TraceReader, TraceRecorder
+from common.pickup import AutoPickup
+from player import check_controller_state
+from simulation.world import Arena
+
+POLL_NS = 1000000000 // 60
+
+
+def session(records: int):
+    """ polls of a player who changes input every few frames """
+    rng = random.Random(1)
+    state = GamepadState()
+    for packet in range(records):
+        if rng.random() < 0.3:
+            state = GamepadState(packet, rng.choice([0, 0, 0, GAMEPAD_A, GAMEPAD_B, GAMEPAD_Y]), 0, 0,
+                                 rng.randint(-32768, 32767), rng.randint(-32768, 32767), 0, 0)
+        yield state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark controller trace recording and replay.')
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'session.trace')
+    states = list(session(args.records))
+
+    timestamps = iter(range(0, len(states) * POLL_NS, POLL_NS))
+    recorder = TraceRecorder(path, clock=lambda: next(timestamps))
+    start = time.perf_counter()
+    for state in states:
+        recorder.record(state)
+    recorder.close()
+    recording = time.perf_counter() - start
+
+    with open(os.path.join(directory, 'session.jsonl'), 'w') as log:
+        for state in states:
+            log.write(json.dumps({name: state[name] for name in GamepadState.__slots__}) + '\n')
+    json_size = os.path.getsize(log.name)
+    print('%d records: %d bytes (%.1fx smaller than JSON lines), recorded at %.0f ns/record' % (
+        len(states), os.path.getsize(path), json_size / os.path.getsize(path), recording / len(states) * 1e9))
+
+    reader = TraceReader(path)
+    assert reader[len(states) - 1][1] == states[-1]
+
+    # maximum speed replay through the control path
+    robot = Arena().add_robot(1, 0.0, 0.0, 0.0)
+    shaper = CommandShaper(robot)
+    pickup = AutoPickup(shaper)
+    stick_drive = StickDrive()
+    joystick = ReplayJoystick(reader)
+    start = time.perf_counter()
+    while not joystick.finished:
+        check_controller_state(shaper, joystick.get_state(), pickup, stick_drive)
+    replay = time.perf_counter() - start
+    print('replay through check_controller_state: %.0f records/s (%.0fx real time), %d commands sent' % (
+        len(reader) / replay, len(reader) * POLL_NS / 1e9 / replay, robot.commands))
+
+    # real time replay of the first second
+    joystick = ReplayJoystick(reader, realtime=True)
+    errors = []
+    start = time.monotonic_ns()
+    while joystick.position < 60:
+        position = joystick.position
+        joystick.get_state()
+        if joystick.position != position:
+            errors.append(abs(time.monotonic_ns() - start - (joystick.position - 1) * POLL_NS))
+    print('real time replay: records delivered within %.2f ms of their recorded time' % (max(errors) / 1e6))
+
+    # bulk analysis: share of polls with the stick outside the dead zone and number of Y presses
+    start = time.perf_counter()
+    pushed = presses = 0
+    held = False
+    for timestamp, state in reader:
+        pushed += state.l_thumb_x * state.l_thumb_x + state.l_thumb_y * state.l_thumb_y > 7849 * 7849
+        down = bool(state.buttons & GAMEPAD_Y)
+        presses += down and not held
+        held = down
+    loop = time.perf_counter() - start
+    print('python loop over records: %7.2f ms (%d pushed, %d Y presses)' % (loop * 1e3, pushed, presses))
+
+    try:
+        import numpy
+    except ImportError:
+        print('numpy is not installed, skipping the array analysis')
+    else:
+        start = time.perf_counter()
+        records = reader.array()
+        x = records['l_thumb_x'].astype(numpy.int64)
+        y = records['l_thumb_y'].astype(numpy.int64)
+        pushed = int(numpy.count_nonzero(x * x + y * y > 7849 * 7849))
+        down = (records['buttons'] & GAMEPAD_Y) != 0
+        presses = int(numpy.count_nonzero(down & ~numpy.concatenate(([False], down[:-1]))))
+        vectorised = time.perf_counter() - start
+        print('numpy over the mapped file: %7.2f ms (%d pushed, %d Y presses, %.0fx faster)' % (
+            vectorised * 1e3, pushed, presses, loop / vectorised))
+        del records, x, y, down
+
+    reader.close()
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Staleness of xbox.Joystick input after the consumer stops reading
+Launches a fake xboxdrv that prints scripted lines stamped with the time they were written, blocks
+the consumer the way a wait_for_completed() animation does, and reports how old the first reading
+after the block is in polled and threaded mode.
+
+Usage:
+    python -m benchmarks.xbox_reader [--block 2.0] [--rate 1000]
+"""
+import argparse
+import sys
+import time
+
+import xbox
+
+# prints the xboxdrv banner, then one line per event with the low bits of the millisecond clock in X1
+FAKE_XBOXDRV = r'''
+import sys, time
+out = sys.stdout.buffer
+out.write(b'Press Ctrl-c to quit, use --silent to suppress the event output\n')
+out.flush()
+period = 1.0 / float(sys.argv[1])
+line = ('X1:%6d Y1:     0  X2:     0 Y2:     0  du:0 dd:0 dl:0 dr:0  back:0 guide:0 start:0  '
+        'TL:0 TR:0  A:0 B:0 X:0 Y:0  LB:0 RB:0  LT:  0 RT:  0\n')
+while True:
+    out.write((line % (int(time.monotonic() * 1000) % 32768)).encode())
+    out.flush()
+    time.sleep(period)
+'''
+
+
+def staleness(threaded: bool, block: float, rate: float):
+    """
+    :return: age in ms of the first reading after the block, and how long that read took
+    """
+    joy = xbox.Joystick(refreshRate=1000, threaded=threaded,
+                        command=[sys.executable, '-c', FAKE_XBOXDRV, str(rate)])
+    try:
+        time.sleep(0.2)
+        joy.snapshot()
+        time.sleep(block)  # the consumer is busy, e.g. waiting on an animation
+
+        start = time.perf_counter()
+        state = joy.snapshot()
+        read_time = time.perf_counter() - start
+        age = (int(time.monotonic() * 1000) - state.leftX) % 32768
+        return age, read_time
+    finally:
+        joy.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure input staleness after a blocked consumer.')
+    parser.add_argument('--block', type=float, default=2.0, help='seconds the consumer stops reading')
+    parser.add_argument('--rate', type=float, default=1000, help='lines per second printed by the fake xboxdrv')
+    args = parser.parse_args()
+
+    for threaded in (False, True):
+        age, read_time = staleness(threaded, args.block, args.rate)
+        print('%-8s first reading after a %.1f s block is %5d ms old, read took %.2f ms' % (
+            'threaded' if threaded else 'polled', args.block, age, read_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
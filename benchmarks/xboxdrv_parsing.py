@@ -0,0 +1,74 @@
+"""Benchmark for decoding xboxdrv output
+Compares reading every input the way cozmo_interface used to (one slice and int() per accessor)
+against decoding the line once into a JoystickState, using canned xboxdrv lines.
+
+Usage:
+    python -m benchmarks.xboxdrv_parsing [--lines 100000] [--seed 1]
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from xbox import FIELDS, JoystickState
+
+XBOXDRV_LINE = ('X1:%6d Y1:%6d  X2:%6d Y2:%6d  du:%d dd:%d dl:%d dr:%d  back:%d guide:%d start:%d  '
+                'TL:%d TR:%d  A:%d B:%d X:%d Y:%d  LB:%d RB:%d  LT:%3d RT:%3d\n')
+
+
+def canned_lines(count: int, rng: random.Random) -> List[bytes]:
+    """ Lines formatted exactly like xboxdrv --no-uinput output """
+    lines = []
+    for _ in range(count):
+        axes = [rng.randint(-32768, 32767) for _ in range(4)]
+        buttons = [rng.randint(0, 1) for _ in range(15)]
+        triggers = [rng.randint(0, 255) for _ in range(2)]
+        lines.append((XBOXDRV_LINE % tuple(axes + buttons + triggers)).encode())
+    return lines
+
+
+def sliced_reads(reading: bytes) -> list:
+    """ Every accessor sliced and parsed its own field out of the raw line """
+    return [int(reading[start:end]) for name, start, end in FIELDS]
+
+
+def snapshot_reads(reading: bytes) -> list:
+    state = JoystickState(reading)
+    return [getattr(state, name) for name, start, end in FIELDS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare xboxdrv line decoding strategies.')
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    lines = canned_lines(args.lines, random.Random(args.seed))
+    assert all(len(line) == 140 for line in lines)
+    assert all(sliced_reads(line) == snapshot_reads(line) for line in lines[:1000])
+
+    start = time.perf_counter()
+    for line in lines:
+        sliced_reads(line)
+    sliced = (time.perf_counter() - start) / len(lines)
+
+    start = time.perf_counter()
+    for line in lines:
+        JoystickState(line)
+    decoded = (time.perf_counter() - start) / len(lines)
+
+    state = JoystickState(lines[0])
+    start = time.perf_counter()
+    for _ in lines:
+        (state.leftX, state.leftY, state.rightX, state.rightY, state.A, state.B, state.X, state.Y,
+         state.dpadUp, state.dpadDown, state.dpadLeft, state.dpadRight, state.Back, state.Guide, state.Start,
+         state.leftBumper, state.rightBumper, state.leftTrigger, state.rightTrigger, state.leftThumbstick)
+    reads = (time.perf_counter() - start) / len(lines)
+
+    print('slice and int() for %d fields:    %6.2f us per refresh' % (len(FIELDS), sliced * 1e6))
+    print('decode once into JoystickState:  %6.2f us per refresh' % (decoded * 1e6))
+    print('20 attribute reads on the state: %6.2f us per loop' % (reads * 1e6))
+
+
+if __name__ == '__main__':
+    main()
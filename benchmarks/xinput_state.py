@@ -0,0 +1,72 @@
+"""Benchmark for XInputJoystick.get_state on any platform
+Installs a stub XInput backend that fills in the XINPUT_STATE struct like the DLL does, bumping the
+packet number every few polls, and compares the original allocate-and-build-a-dict polling with the
+reused struct and packet number change detection.
+
+Usage:
+    python -m benchmarks.xinput_state [--polls 200000] [--change-every 10]
+"""
+import argparse
+import ctypes
+import time
+
+import xinput
+from xinput import ERROR_DEVICE_NOT_CONNECTED, ERROR_SUCCESS, XINPUT_STATE, XInputJoystick, struct_dict
+
+
+class StubXInput:
+    """ Stands in for xinput1_4.dll with a single connected pad whose input changes periodically """
+
+    def __init__(self, change_every: int):
+        self.change_every = change_every
+        self.polls = 0
+
+    def XInputGetState(self, device_number, state_ref):
+        if device_number != 0:
+            return ERROR_DEVICE_NOT_CONNECTED
+        self.polls += 1
+        state = state_ref._obj
+        state.packet_number = self.polls // self.change_every
+        state.gamepad.l_thumb_x = (state.packet_number * 97) % 32767
+        state.gamepad.buttons = state.packet_number & 0xF000
+        return ERROR_SUCCESS
+
+
+def legacy_get_state(device_number: int):
+    """ get_state as it was before: a new struct and a new dict on every poll """
+    state = XINPUT_STATE()
+    res = xinput.xinput.XInputGetState(device_number, ctypes.byref(state))
+    if res == ERROR_SUCCESS:
+        return struct_dict(state.gamepad)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare XInput polling strategies with a stub backend.')
+    parser.add_argument('--polls', type=int, default=200000)
+    parser.add_argument('--change-every', type=int, default=10, help='polls between input changes')
+    args = parser.parse_args()
+
+    xinput.set_backend(StubXInput(args.change_every))
+    joysticks = XInputJoystick.enumerate_devices()
+    assert len(joysticks) == 1
+    joystick = joysticks[0]
+
+    start = time.perf_counter()
+    for _ in range(args.polls):
+        legacy_get_state(0)
+    legacy = (time.perf_counter() - start) / args.polls
+
+    start = time.perf_counter()
+    for _ in range(args.polls):
+        joystick.get_state()
+    reused = (time.perf_counter() - start) / args.polls
+
+    state = joystick.get_state()
+    assert all(state[name] == value for name, value in struct_dict(joystick._state.gamepad).items())
+
+    print('new struct + dict per poll:         %6.0f ns' % (legacy * 1e9))
+    print('reused struct + packet number check: %6.0f ns (%.1fx)' % (reused * 1e9, legacy / reused))
+
+
+if __name__ == '__main__':
+    main()
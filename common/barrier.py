@@ -0,0 +1,103 @@
+"""Start of game barrier coordinated over the message hub
+
+Every judge and player reports ready once its robot is in position and its cubes are lit. The judge
+of team 1 coordinates: once it has heard from every other computer it broadcasts a start message
+with a countdown, and everyone starts playing when the countdown ends, so the game starts as soon
+as the slowest computer is ready instead of after a fixed wait. Ready and start messages carry the
+game of the session they are for, so a ready message still in flight when a game starts is not
+counted for the next one.
+"""
+import random
+import socket
+import time
+from typing import Callable
+
+from common.message_forwarder import MessageListener, send_message
+from common.protocol import ReadyMessage, StartMessage
+
+JUDGE = 1
+PLAYER = 2
+
+# the judge of this team coordinates the start
+COORDINATOR_TEAM = 1
+
+# seconds between the start message and the start of the game
+DEFAULT_COUNTDOWN = 3.0
+
+# countdown of the later games of a session, when everyone is already at the table
+ROUND_COUNTDOWN = 1.0
+
+# seconds between ready messages, in case the coordinator connected after the last one
+RESEND_INTERVAL = 1.0
+
+
+class StartBarrier:
+    """ Blocks a judge or player until the coordinator starts the game """
+
+    def __init__(self, connection: socket.socket, listener: MessageListener, team: int, role: int,
+                 expected: int = 0, countdown: float = DEFAULT_COUNTDOWN,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        :param connection: network connection to send on
+        :param listener: running listener of the connection, it collects ready and start messages
+        :param team: team of this computer
+        :param role: JUDGE or PLAYER
+        :param expected: computers the coordinator waits for besides itself, 0 if this computer is not the coordinator
+        :param countdown: seconds from the start message to the start of the game, used by the coordinator
+        :param clock: monotonic clock returning seconds
+        :param sleep: function used to wait for the countdown
+        """
+        self.connection = connection
+        self.listener = listener
+        self.team = team
+        self.role = role
+        self.expected = expected
+        self.countdown = countdown
+        self.clock = clock
+        self.sleep = sleep
+        self.participant = random.getrandbits(32)
+
+        # seconds from reporting ready to the start message, and from then to the start of the game
+        self.waited: float = 0.0
+        self.counted_down: float = 0.0
+
+    @property
+    def coordinator(self) -> bool:
+        return self.expected > 0
+
+    def wait(self):
+        """ Report ready, then block until the countdown to the start of the game has finished """
+        ready_at = self.clock()
+        if self.coordinator:
+            start_at = self._coordinate()
+        else:
+            message = ReadyMessage(self.team, self.role, self.participant, self.listener.round)
+            send_message(self.connection, message)
+            while not self.listener.started.wait(RESEND_INTERVAL):
+                send_message(self.connection, message)
+            start_at = self.listener.start_at
+        self.waited = self.clock() - ready_at
+
+        started_counting = self.clock()
+        remaining = start_at - started_counting
+        while remaining > 0:
+            print('Starting in %d' % -(-remaining // 1))
+            self.sleep(remaining % 1 or 1)
+            remaining = start_at - self.clock()
+        self.counted_down = self.clock() - started_counting
+
+    def _coordinate(self) -> float:
+        listener = self.listener
+        reported = None
+        while True:
+            # clear before checking so a message arriving in between still wakes the wait
+            listener.participant_ready.clear()
+            ready = len(listener.ready)
+            if ready >= self.expected:
+                break
+            if ready != reported:
+                print('Waiting for %d of %d computers to be ready' % (self.expected - ready, self.expected))
+                reported = ready
+            listener.participant_ready.wait()
+        send_message(self.connection, StartMessage(int(self.countdown * 1000), listener.round))
+        return self.clock() + self.countdown
@@ -0,0 +1,187 @@
+"""Clock synchronization with the hub over the game's TCP connection
+
+The hub's monotonic clock is the reference clock of a game. Every computer's MessageListener pings
+the hub every PING_INTERVAL seconds and the hub answers straight away with the times it received
+the ping and sent its pong, like NTP:
+
+    rtt    = (t3 - t0) - (t2 - t1)
+    offset = ((t1 - t0) + (t2 - t3)) / 2
+
+where t0 and t3 are the local send and receive times and t1 and t2 the hub's. Queueing delays make
+single samples noisy in one direction only, so of the last FILTER_WINDOW samples only the one with
+the lowest round trip is used. The skew between the clocks is the slope of a least squares fit of
+those filtered offsets over local time, so the synchronized clock stays accurate between pings.
+
+Round trip times and the one-way latency of each direction are kept in histograms, as is the
+one-way latency of every game message received, measured from the sent_us stamped on it. Messages
+are only stamped once the sender's clock is synchronized, an unstamped start message falls back to
+its countdown.
+"""
+import time
+from collections import deque
+from typing import Callable, Deque, Tuple
+
+from common.protocol import STAMPED, PingMessage, PongMessage, encode
+from common.scheduler import Histogram
+
+# seconds between pings once synchronized, and while still collecting the first samples
+PING_INTERVAL = 1.0
+FAST_PING_INTERVAL = 0.1
+
+# samples the lowest round trip is chosen from
+FILTER_WINDOW = 8
+
+# filtered samples the skew is fitted over
+SKEW_HISTORY = 32
+
+# filtered samples needed before the clock counts as synchronized
+MIN_SAMPLES = 4
+
+
+def local_us() -> int:
+    """
+    :return: this computer's monotonic clock in microseconds
+    """
+    return time.monotonic_ns() // 1000
+
+
+def reference_us() -> int:
+    """
+    :return: the reference clock in microseconds, only meaningful on the hub
+    """
+    return time.monotonic_ns() // 1000
+
+
+def pong(ping: PingMessage, received_us: int, clock: Callable[[], int] = reference_us) -> bytes:
+    """
+    :param ping: ping received by the hub
+    :param received_us: reference time the ping arrived
+    :param clock: reference clock
+    :return: the frame answering the ping
+    """
+    return encode(PongMessage(ping.sequence, ping.sent_us, received_us, clock()))
+
+
+def stamp(message: tuple, now_us: int) -> tuple:
+    """
+    :param message: any message
+    :param now_us: synchronized time
+    :return: the message with sent_us set if it is a game message that was not stamped yet
+    """
+    if type(message) in STAMPED and not message.sent_us:
+        return message._replace(sent_us=now_us)
+    return message
+
+
+class ClockSync:
+    """ Estimated offset and skew of this computer's clock from the hub's """
+
+    def __init__(self, clock: Callable[[], int] = local_us):
+        """
+        :param clock: local monotonic clock in microseconds
+        """
+        self.clock = clock
+        self.sequence: int = 0
+        self.samples: Deque[Tuple[int, float, int]] = deque(maxlen=FILTER_WINDOW)  # rtt, offset, local time
+        self.filtered: Deque[Tuple[int, float]] = deque(maxlen=SKEW_HISTORY)  # local time, offset
+        # offset at the anchor local time and its change per microsecond of local time
+        self.offset: float = 0.0
+        self.skew: float = 0.0
+        self.anchor: int = 0
+        self.rtt = Histogram()
+        self.upstream = Histogram()  # to the hub
+        self.downstream = Histogram()  # from the hub
+        self.one_way = Histogram()  # game messages from other computers, through the hub
+
+    @property
+    def synchronized(self) -> bool:
+        return len(self.filtered) >= MIN_SAMPLES
+
+    @property
+    def ping_interval(self) -> float:
+        return PING_INTERVAL if self.synchronized else FAST_PING_INTERVAL
+
+    def offset_at(self, local: int) -> float:
+        """
+        :param local: local time in microseconds
+        :return: microseconds to add to the local time to get the hub's time
+        """
+        return self.offset + self.skew * (local - self.anchor)
+
+    def now_us(self) -> int:
+        """
+        :return: the synchronized time in microseconds, the local time until the first pong arrives
+        """
+        local = self.clock()
+        return int(local + self.offset_at(local))
+
+    def to_local(self, synchronized: int) -> int:
+        """
+        :param synchronized: synchronized time in microseconds
+        :return: the local time in microseconds at that moment
+        """
+        # the skew is tiny, one correction of the offset is exact to well under a microsecond
+        return int(synchronized - self.offset_at(int(synchronized - self.offset)))
+
+    def ping(self) -> PingMessage:
+        """
+        :return: the next ping to send to the hub
+        """
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        return PingMessage(self.sequence, self.clock())
+
+    def on_pong(self, message: PongMessage):
+        """
+        Add the sample of a pong from the hub.
+
+        :param message: the hub's answer to one of this clock's pings
+        """
+        t3 = self.clock()
+        t0, t1, t2 = message.ping_sent_us, message.received_us, message.sent_us
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.samples.append((rtt, offset, t3))
+        self.rtt.record(max(rtt, 0) / 1e6)
+
+        # the lowest round trip of the window has waited least in queues, use it once, the newest of equal ones
+        best_rtt, best_offset, best_local = min(self.samples, key=lambda sample: (sample[0], -sample[2]))
+        if not self.filtered or best_local > self.filtered[-1][0]:
+            self.filtered.append((best_local, best_offset))
+            self._fit()
+
+        offset = self.offset_at(t3)
+        self.upstream.record(max(t1 - (t0 + offset), 0) / 1e6)
+        self.downstream.record(max(t3 + offset - t2, 0) / 1e6)
+
+    def _fit(self):
+        """ least squares line through the filtered offsets """
+        count = len(self.filtered)
+        mean_local = sum(local for local, offset in self.filtered) / count
+        mean_offset = sum(offset for local, offset in self.filtered) / count
+        spread = sum((local - mean_local) ** 2 for local, offset in self.filtered)
+        self.anchor = int(mean_local)
+        self.offset = mean_offset
+        self.skew = sum((local - mean_local) * (offset - mean_offset)
+                        for local, offset in self.filtered) / spread if count > 1 and spread else 0.0
+
+    def received(self, message: tuple):
+        """
+        Record the one-way latency of a game message stamped by another computer.
+
+        :param message: decoded message
+        """
+        if type(message) in STAMPED and message.sent_us and self.synchronized:
+            self.one_way.record(max(self.now_us() - message.sent_us, 0) / 1e6)
+
+    def report(self) -> str:
+        """
+        :return: the estimated offset and skew and the latency histograms
+        """
+        return ('offset %+.3f ms, skew %+.1f ppm, %d samples\n  round trip: %s\n  to hub:     %s\n'
+                '  from hub:   %s\n  messages:   %s' % (
+                    self.offset_at(self.clock()) / 1e3, self.skew * 1e6, len(self.filtered),
+                    self.rtt, self.upstream, self.downstream, self.one_way))
+
+
+# the clock of this process's connection to the hub, used to stamp the game messages it sends
+CLOCK = ClockSync()
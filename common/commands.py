@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+# only needed for annotations, so the control logic loads without the SDK
+if TYPE_CHECKING:
+    import cozmo
+
+
+class CommandShaper:
+    """
+    Sits between the controller state and the robot so wheel and lift commands are only sent to
+    the SDK when they change. Unchanged commands are resent after the keepalive period so a
+    dropped command can never leave the robot stuck. Every other attribute is passed through to
+    the wrapped robot, so the shaper can be used anywhere a robot is expected.
+    """
+
+    def __init__(self, robot: cozmo.robot.Robot, wheel_tolerance: float = 1.0, lift_tolerance: float = 0.01,
+                 keepalive: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        """
+        :param robot: robot to send commands to
+        :param wheel_tolerance: wheel speed change in mm/s that is considered a new command
+        :param lift_tolerance: lift speed change in radians/s that is considered a new command
+        :param keepalive: seconds after which an unchanged command is sent again
+        :param clock: monotonic clock returning seconds
+        """
+        self.robot = robot
+        self.wheel_tolerance = wheel_tolerance
+        self.lift_tolerance = lift_tolerance
+        self.keepalive = keepalive
+        self.clock = clock
+
+        self._wheels: Optional[Tuple[float, float]] = None
+        self._wheels_sent_at: float = 0.0
+        self._lift: Optional[float] = None
+        self._lift_sent_at: float = 0.0
+
+        self.sent: int = 0
+        self.suppressed: int = 0
+
+    def __getattr__(self, name):
+        return getattr(self.robot, name)
+
+    def drive_wheels(self, l_wheel_speed: float, r_wheel_speed: float):
+        """
+        Send a wheel command if either speed changed or the keepalive has expired.
+
+        :param l_wheel_speed: left wheel speed in mm/s
+        :param r_wheel_speed: right wheel speed in mm/s
+        """
+        now = self.clock()
+        last = self._wheels
+        if (last is not None and now - self._wheels_sent_at < self.keepalive
+                and not _changed(last[0], l_wheel_speed, self.wheel_tolerance)
+                and not _changed(last[1], r_wheel_speed, self.wheel_tolerance)):
+            self.suppressed += 1
+            return
+
+        self.robot.drive_wheels(l_wheel_speed, r_wheel_speed)
+        self._wheels = (l_wheel_speed, r_wheel_speed)
+        self._wheels_sent_at = now
+        self.sent += 1
+
+    def move_lift(self, speed: float):
+        """
+        Send a lift command if the speed changed or the keepalive has expired.
+
+        :param speed: lift speed in radians/s
+        """
+        now = self.clock()
+        if (self._lift is not None and now - self._lift_sent_at < self.keepalive
+                and not _changed(self._lift, speed, self.lift_tolerance)):
+            self.suppressed += 1
+            return
+
+        self.robot.move_lift(speed)
+        self._lift = speed
+        self._lift_sent_at = now
+        self.sent += 1
+
+    def invalidate(self):
+        """ Forget the last commands so the next ones are always sent, e.g. after an action moved the robot """
+        self._wheels = None
+        self._lift = None
+
+    def report(self) -> str:
+        """
+        :return: human readable summary of the commands sent and suppressed
+        """
+        total = self.sent + self.suppressed
+        saved = 100.0 * self.suppressed / total if total else 0.0
+        return '%d commands sent, %d suppressed (%.0f%% saved)' % (self.sent, self.suppressed, saved)
+
+
+def _changed(last: float, new: float, tolerance: float) -> bool:
+    # stopping is always sent, even when the previous speed was within the tolerance of zero
+    return abs(new - last) > tolerance or (new == 0) != (last == 0)
@@ -0,0 +1,51 @@
+import importlib
+import sys
+from typing import Dict, List, Tuple
+
+# controller backends by name, as the module and class to import. A backend is only imported when it
+# is used, so a platform never loads another platform's libraries. Every backend's class has an
+# enumerate_devices() static method and instances whose get_state() returns a common.gamepad.GamepadState.
+BACKENDS: Dict[str, Tuple[str, str]] = {
+    'xinput': ('xinput', 'XInputJoystick'),
+    'evdev': ('evdev_joystick', 'EvdevJoystick'),
+}
+
+
+def register_backend(name: str, module: str, class_name: str):
+    """
+    Add a controller backend, or replace one, without importing it.
+
+    :param name: name the backend is selected by
+    :param module: module defining the backend
+    :param class_name: controller class in the module
+    """
+    BACKENDS[name] = (module, class_name)
+
+
+def default_backend() -> str:
+    """
+    :return: the native backend for this platform: evdev on Linux and XInput everywhere else
+    """
+    return 'evdev' if sys.platform.startswith('linux') else 'xinput'
+
+
+def load_backend(name: str = None):
+    """
+    Import a controller backend.
+
+    :param name: name of a registered backend, the platform's default if not given
+    :return: the backend's controller class
+    """
+    module, class_name = BACKENDS[name or default_backend()]
+    return getattr(importlib.import_module(module), class_name)
+
+
+def enumerate_controllers(backend: str = None) -> List:
+    """
+    Find the connected Xbox controllers. Every backend's get_state() returns a
+    common.gamepad.GamepadState, so the control code runs unchanged on every platform.
+
+    :param backend: name of a registered backend, the platform's default if not given
+    :return: connected controllers, empty if none were found
+    """
+    return load_backend(backend).enumerate_devices()
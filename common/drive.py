@@ -0,0 +1,118 @@
+"""Shared mapping from the left thumb stick to Cozmo's wheel speeds
+
+The stick direction is interpolated between eight compass headings, keeping the feel of the original
+quantized drive, and the wheel speeds scale with how far the stick is pushed past the dead zone.
+Lookups are served from a table precomputed over the quantized int16 stick space, so every tick costs
+the same whatever the stick position. The table is a list of rows indexed by the signed stick cells,
+Python's negative indexes wrap to the cells left of and below the center, so a lookup is two shifts
+and two indexes returning a prebuilt tuple.
+"""
+from array import array
+from math import atan2, degrees, sqrt
+from typing import List, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAX_WHEEL_SPEED = 100.0
+THUMB_DEADZONE = 7849  # same as GAMEPAD_LEFT_THUMB_DEADZONE
+THUMB_MAX = 32767
+
+# (left, right) wheel fractions at 0, 45, ... 315 degrees counterclockwise from pushing the stick right
+HEADINGS: List[Tuple[float, float]] = [
+    (1.0, -1.0),  # right
+    (1.0, 0.5),  # up + right
+    (1.0, 1.0),  # up
+    (0.5, 1.0),  # up + left
+    (-1.0, 1.0),  # left
+    (-0.5, -1.0),  # down + left
+    (-1.0, -1.0),  # down
+    (-1.0, -0.5),  # down + right
+]
+
+# number of bits of each stick axis kept by the lookup table
+TABLE_BITS = 8
+TABLE_SHIFT = 16 - TABLE_BITS
+
+
+def compute_wheels(x: float, y: float, max_speed: float = MAX_WHEEL_SPEED, deadzone: float = THUMB_DEADZONE,
+                   thumb_max: float = THUMB_MAX) -> Tuple[float, float]:
+    """
+    Exact stick to wheel mapping, used to build the lookup table.
+
+    :param x: x value generated by the controller
+    :param y: y value generated by the controller
+    :param max_speed: wheel speed in mm/s with the stick pushed all the way
+    :param deadzone: radius around the center where the stick is ignored
+    :param thumb_max: largest value the controller reports
+    :return: left and right wheel speeds in mm/s
+    """
+    magnitude = sqrt(x * x + y * y)
+    if magnitude <= deadzone:
+        return 0.0, 0.0
+    scale = max_speed * (min(magnitude, thumb_max) - deadzone) / (thumb_max - deadzone)
+
+    heading = (degrees(atan2(y, x)) % 360.0) / 45.0
+    index = int(heading) % 8
+    fraction = heading - int(heading)
+    left_start, right_start = HEADINGS[index]
+    left_end, right_end = HEADINGS[(index + 1) % 8]
+    return (scale * (left_start + (left_end - left_start) * fraction),
+            scale * (right_start + (right_end - right_start) * fraction))
+
+
+class StickDrive:
+    """ Constant time stick to wheel mapping backed by a precomputed lookup table """
+
+    def __init__(self, max_speed: float = MAX_WHEEL_SPEED, deadzone: float = THUMB_DEADZONE,
+                 thumb_max: float = THUMB_MAX):
+        """
+        :param max_speed: wheel speed in mm/s with the stick pushed all the way
+        :param deadzone: radius around the center where the stick is ignored
+        :param thumb_max: largest value the controller reports
+        """
+        size = 1 << TABLE_BITS
+        center = size // 2
+
+        # cells are sampled so the middle cell is exactly zero and the outer cells reach the full range
+        axis = [(cell - center) * (32768.0 / center if cell < center else 32767.0 / (center - 1))
+                for cell in range(size)]
+
+        self.left = array('f', bytes(4 * size * size))
+        self.right = array('f', bytes(4 * size * size))
+        for column, x in enumerate(axis):
+            for row, y in enumerate(axis):
+                index = (column << TABLE_BITS) | row
+                self.left[index], self.right[index] = compute_wheels(x, y, max_speed, deadzone, thumb_max)
+
+        # rows[x >> TABLE_SHIFT][y >> TABLE_SHIFT], cell c of the arrays is at (c - center) % size
+        pairs = list(zip(self.left.tolist(), self.right.tolist()))
+        columns = [pairs[column << TABLE_BITS:(column + 1) << TABLE_BITS] for column in range(size)]
+        columns = columns[center:] + columns[:center]
+        self.rows: List[List[Tuple[float, float]]] = [column[center:] + column[:center] for column in columns]
+
+    def wheels(self, x: int, y: int) -> Tuple[float, float]:
+        """
+        :param x: raw int16 x value of the stick
+        :param y: raw int16 y value of the stick
+        :return: left and right wheel speeds in mm/s
+        """
+        return self.rows[x >> TABLE_SHIFT][y >> TABLE_SHIFT]
+
+    def wheels_batch(self, x, y):
+        """
+        Map a whole recorded trace at once, requires numpy.
+
+        :param x: array of raw int16 x values
+        :param y: array of raw int16 y values
+        :return: arrays of left and right wheel speeds in mm/s
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required for batched stick mapping')
+        x = numpy.asarray(x, dtype=numpy.int32)
+        y = numpy.asarray(y, dtype=numpy.int32)
+        index = (((x + 32768) >> TABLE_SHIFT) << TABLE_BITS) | ((y + 32768) >> TABLE_SHIFT)
+        return (numpy.frombuffer(self.left, dtype=numpy.float32)[index],
+                numpy.frombuffer(self.right, dtype=numpy.float32)[index])
@@ -0,0 +1,127 @@
+"""Authoritative game state kept by the hub
+
+Judges no longer score their own captures. A judge that is shown a cube sends a timestamped
+CaptureClaimMessage, and the hub feeds every claim and start message of every connection into one
+ordered event queue. A single consumer applies the events one at a time: the first claim of a cube
+in a game captures it, and the claim that brings a team to the winning score ends the game, so
+however close together two judges' claims arrive, exactly one team wins. The accepted captures,
+the scores and the one exit message are broadcast to everyone, judges included. Claims count in
+the order they reach the hub; the synchronized time stamped on them only dates them.
+"""
+import asyncio
+from typing import Callable, Dict, List, Set, Tuple
+
+from common.clock_sync import reference_us, stamp
+from common.protocol import (CAPTURE_CLAIM, START, CaptureClaimMessage, CubeCapturedMessage, ExitMessage,
+                             FrameDecoder, ScoreMessage, StartMessage, encode)
+
+# points needed to win the game
+WINNING_SCORE = 3
+
+# frame types the hub hands to the game state, claims are only ever seen by the game state
+SERVICE_TYPES = frozenset((CAPTURE_CLAIM, START))
+
+# events waiting to be applied before the hub stops reading from connections that send more
+MAX_PENDING_EVENTS = 1 << 16
+
+
+class GameState:
+    """ Scores of one game, changed only by applying events in order """
+
+    def __init__(self, winning_score: int = WINNING_SCORE):
+        """
+        :param winning_score: points needed to win the game
+        """
+        self.winning_score = winning_score
+        self.scores: Dict[int, int] = {}
+        self.captured: Set[Tuple[int, int]] = set()
+        self.winner: int = 0
+        self.accepted: int = 0
+        self.rejected: int = 0
+
+    def reset(self):
+        """ Start a new game """
+        self.scores.clear()
+        self.captured.clear()
+        self.winner = 0
+
+    def handle(self, message: tuple) -> List[tuple]:
+        """
+        Apply one event.
+
+        :param message: CaptureClaimMessage or StartMessage, anything else is ignored
+        :return: messages to broadcast to everyone, empty if the event changed nothing
+        """
+        if isinstance(message, StartMessage):
+            self.reset()
+            return []
+        if not isinstance(message, CaptureClaimMessage):
+            return []
+        # cube ids are only unique within a team, every judge claims the cubes paired with its own team,
+        # so a cube is its team and id. A second claim of it, e.g. a resend or the cube seen again, and
+        # claims arriving after the game was won lose
+        cube = (message.team, message.cube_id)
+        if self.winner or cube in self.captured:
+            self.rejected += 1
+            return []
+        self.captured.add(cube)
+        self.accepted += 1
+        score = self.scores.get(message.team, 0) + 1
+        self.scores[message.team] = score
+        updates = [CubeCapturedMessage(message.team, message.cube_id), ScoreMessage(message.team, score)]
+        if score >= self.winning_score:
+            self.winner = message.team
+            updates.append(ExitMessage(message.team))
+        return updates
+
+
+class GameStateService:
+    """
+    Runs a GameState on the hub's event loop. Peers' frames are queued in the order the hub reads
+    them and applied by a single task, which broadcasts the results.
+    """
+
+    def __init__(self, state: GameState = None, max_pending: int = MAX_PENDING_EVENTS):
+        """
+        :param state: game state to apply events to, a new one with the default winning score if not given
+        :param max_pending: events queued before submitting peers wait for the queue to drain
+        """
+        self.state = state if state is not None else GameState()
+        self.events: asyncio.Queue = None
+        self.max_pending = max_pending
+        self.decoder = FrameDecoder()
+        self.processed: int = 0
+
+    async def submit(self, frame: bytes):
+        """
+        Queue one frame of a SERVICE_TYPES message, waiting only if the queue is full.
+
+        :param frame: header and payload of the message
+        """
+        await self.events.put(frame)
+
+    async def run(self, broadcast: Callable[[bytes], None]):
+        """
+        Apply queued events forever.
+
+        :param broadcast: sends frames to every peer
+        """
+        while True:
+            frame = await self.events.get()
+            for message in self.decoder.feed(frame):
+                updates = self.state.handle(message)
+                if updates:
+                    # one write per peer for all of an event's updates, stamped with the hub's clock
+                    now_us = reference_us()
+                    broadcast(b''.join(encode(stamp(update, now_us)) for update in updates))
+            self.processed += 1
+
+    def start(self, broadcast: Callable[[bytes], None]) -> asyncio.Task:
+        """
+        Create the event queue and the task applying it on the running event loop.
+
+        :param broadcast: sends frames to every peer
+        :return: the running task
+        """
+        self.events = asyncio.Queue(self.max_pending)
+        return asyncio.ensure_future(self.run(broadcast))
@@ -0,0 +1,51 @@
+"""Controller state shared by every controller backend
+
+GamepadState and the XInput button bits have no platform dependencies, so control code, traces and
+simulated pads can use them without loading a controller backend.
+"""
+
+# bitmasks of the buttons in GamepadState.buttons, as defined by XInput
+GAMEPAD_DPAD_UP = 0x0001
+GAMEPAD_DPAD_DOWN = 0x0002
+GAMEPAD_DPAD_LEFT = 0x0004
+GAMEPAD_DPAD_RIGHT = 0x0008
+GAMEPAD_START = 0x0010
+GAMEPAD_BACK = 0x0020
+GAMEPAD_LEFT_THUMB = 0x0040
+GAMEPAD_RIGHT_THUMB = 0x0080
+GAMEPAD_LEFT_SHOULDER = 0x0100
+GAMEPAD_RIGHT_SHOULDER = 0x0200
+GAMEPAD_A = 0x1000
+GAMEPAD_B = 0x2000
+GAMEPAD_X = 0x4000
+GAMEPAD_Y = 0x8000
+
+
+class GamepadState:
+    """
+    Snapshot of a gamepad taken from an XINPUT_GAMEPAD struct. Fields can be read as attributes
+    or, like the dicts returned by xinput.struct_dict, with state['buttons'].
+    """
+    __slots__ = ('packet_number', 'buttons', 'left_trigger', 'right_trigger',
+                 'l_thumb_x', 'l_thumb_y', 'r_thumb_x', 'r_thumb_y')
+
+    def __init__(self, packet_number=0, buttons=0, left_trigger=0, right_trigger=0,
+                 l_thumb_x=0, l_thumb_y=0, r_thumb_x=0, r_thumb_y=0):
+        self.packet_number = packet_number
+        self.buttons = buttons
+        self.left_trigger = left_trigger
+        self.right_trigger = right_trigger
+        self.l_thumb_x = l_thumb_x
+        self.l_thumb_y = l_thumb_y
+        self.r_thumb_x = r_thumb_x
+        self.r_thumb_y = r_thumb_y
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __eq__(self, other):
+        return isinstance(other, GamepadState) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'GamepadState(%s)' % ', '.join('%s=%s' % (name, getattr(self, name)) for name in self.__slots__)
@@ -0,0 +1,176 @@
+"""Message hub for the capture the flag game
+Relays every framed message sent by a judge or player to all of the other computers in the same
+room, so one hub can host many matches at once. Every room keeps the authoritative score of its
+game, see common.game_state, and the hub answers the pings every computer synchronizes its clock
+with, see common.clock_sync.
+
+Usage:
+    python -m common.hub [--host 0.0.0.0] [--port 5000] [--winning-score 3]
+"""
+import argparse
+import asyncio
+import functools
+import socket
+from typing import Callable, Dict, Set
+
+from common.clock_sync import pong, reference_us
+from common.game_state import MAX_PENDING_EVENTS, SERVICE_TYPES, WINNING_SCORE, GameState, GameStateService
+from common.protocol import CAPTURE_CLAIM, DEFAULT_ROOM, HEADER, JOIN, PING, decode
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+
+# peers that fall this far behind on reading are disconnected instead of buffering forever
+MAX_PEER_BACKLOG = 1 << 20
+
+
+class Room:
+    """ The peers of one match and the game state they play on """
+
+    def __init__(self, room_id: int, service: GameStateService):
+        self.room_id = room_id
+        self.peers: Set[asyncio.StreamWriter] = set()
+        self.service = service
+        self.task: asyncio.Task = None
+
+
+class Hub:
+    """
+    Single event loop relay that fans out messages to the other peers of the sender's room. Every
+    room has its own game state with its own bounded event queue, so matches sharing the hub never
+    see each other's messages and a busy match only ever waits for its own events.
+    """
+
+    def __init__(self, state_factory: Callable[[], GameState] = GameState, max_pending: int = MAX_PENDING_EVENTS):
+        """
+        :param state_factory: builds the game state of a new room
+        :param max_pending: events a room queues for its game state before its peers wait
+        """
+        self.state_factory = state_factory
+        self.max_pending = max_pending
+        self.rooms: Dict[int, Room] = {}
+        self.peers: Set[asyncio.StreamWriter] = set()
+        self.messages_relayed: int = 0
+
+    def join(self, writer: asyncio.StreamWriter, room_id: int, current: Room = None) -> Room:
+        """
+        Move a peer into a room, opening the room if it is the first one in it.
+
+        :param writer: the peer
+        :param room_id: match id of the room
+        :param current: room the peer is leaving
+        :return: the room the peer is now in
+        """
+        if current is not None:
+            if current.room_id == room_id:
+                return current
+            self.leave(writer, current)
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = Room(room_id, GameStateService(self.state_factory(), self.max_pending))
+            room.task = room.service.start(functools.partial(self.broadcast, room))
+        room.peers.add(writer)
+        return room
+
+    def leave(self, writer: asyncio.StreamWriter, room: Room):
+        """ Take a peer out of a room, closing the room once it is empty """
+        room.peers.discard(writer)
+        if not room.peers and self.rooms.get(room.room_id) is room:
+            room.task.cancel()
+            del self.rooms[room.room_id]
+
+    async def handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Relay every frame a peer sends until it disconnects. Frames are forwarded whole so messages
+        from different peers are never interleaved mid-frame.
+
+        :param reader: stream to read the peer's messages from
+        :param writer: stream used to send messages to the peer
+        """
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # peers are in the default room until they join one, so clients that never join still play together
+        self.peers.add(writer)
+        room = self.join(writer, DEFAULT_ROOM)
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                length, message_type = HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                if message_type == PING:
+                    # answered straight away and only to the sender, the time spent here is part of its round trip
+                    received_us = reference_us()
+                    writer.write(pong(decode(PING, payload), received_us))
+                    continue
+                if message_type == JOIN:
+                    room = self.join(writer, decode(JOIN, payload).room, room)
+                    continue
+                frame = header + payload
+                if message_type in SERVICE_TYPES:
+                    await room.service.submit(frame)
+                    # claims are answered by the game state, nobody else needs them
+                    if message_type == CAPTURE_CLAIM:
+                        continue
+                self.broadcast(room, frame, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.peers.discard(writer)
+            self.leave(writer, room)
+            writer.close()
+
+    def broadcast(self, room: Room, data: bytes, sender: asyncio.StreamWriter = None):
+        """
+        Queue data to every peer of a room except the sender. Writes are buffered by the transports so
+        a slow peer never blocks the loop; peers whose backlog grows too large are dropped.
+
+        :param room: room the data is for
+        :param data: one or more complete frames
+        :param sender: peer the message came from, it does not get its own message back
+        """
+        self.messages_relayed += 1
+        for peer in list(room.peers):
+            if peer is sender:
+                continue
+            if peer.transport.get_write_buffer_size() > MAX_PEER_BACKLOG:
+                room.peers.discard(peer)
+                peer.close()
+                continue
+            peer.write(data)
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        """
+        Start accepting judge and player connections.
+
+        :param host: interface to listen on
+        :param port: port number to listen on
+        :return: the listening server
+        """
+        return await asyncio.start_server(self.handle_peer, host, port)
+
+
+async def run_hub(host: str, port: int, winning_score: int = WINNING_SCORE):
+    hub = Hub(functools.partial(GameState, winning_score))
+    server = await hub.serve(host, port)
+    print('Hub listening on %s:%d' % (host, port))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relay messages between judges and players.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--winning-score', type=int, default=WINNING_SCORE, help='points needed to win a game')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_hub(args.host, args.port, args.winning_score))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
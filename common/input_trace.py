@@ -0,0 +1,341 @@
+"""Binary record and replay of controller input
+
+A trace file is an 8 byte header followed by fixed-width 24 byte records, one per controller poll:
+
+    int64 timestamp in nanoseconds, uint32 packet number, uint16 buttons, uint8 left trigger,
+    uint8 right trigger, int16 left stick x and y, int16 right stick x and y
+
+all little-endian. Records are only ever appended, so a trace can be recorded across several
+sessions and read while it is still being written. The reader memory-maps the file, so replaying
+or analysing a trace never copies it, and with numpy the whole file can be viewed as one structured
+array with RECORD_DTYPE.
+
+Usage:
+    python -m common.input_trace record player.trace
+    python -m common.input_trace info player.trace
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Callable, Iterator, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from common.gamepad import (GamepadState, GAMEPAD_A, GAMEPAD_B, GAMEPAD_BACK, GAMEPAD_DPAD_DOWN, GAMEPAD_DPAD_LEFT,
+                            GAMEPAD_DPAD_RIGHT, GAMEPAD_DPAD_UP, GAMEPAD_LEFT_SHOULDER, GAMEPAD_LEFT_THUMB,
+                            GAMEPAD_RIGHT_SHOULDER, GAMEPAD_RIGHT_THUMB, GAMEPAD_START, GAMEPAD_X, GAMEPAD_Y)
+
+MAGIC = b'CZTR'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')  # magic, version, record size
+RECORD = struct.Struct('<qIHBBhhhh')
+
+if numpy is not None:
+    RECORD_DTYPE = numpy.dtype([('timestamp', '<i8'), ('packet_number', '<u4'), ('buttons', '<u2'),
+                                ('left_trigger', 'u1'), ('right_trigger', 'u1'),
+                                ('l_thumb_x', '<i2'), ('l_thumb_y', '<i2'),
+                                ('r_thumb_x', '<i2'), ('r_thumb_y', '<i2')])
+    assert RECORD_DTYPE.itemsize == RECORD.size
+
+# xboxdrv reports the guide button, which XInputGetState does not, so it gets the otherwise unused bit
+GAMEPAD_GUIDE = 0x0400
+
+# records buffered in memory before they are appended to the file
+FLUSH_RECORDS = 256
+
+# xbox.JoystickState button names and the XInput bits they are recorded as
+XBOX_BUTTONS = [('dpadUp', GAMEPAD_DPAD_UP), ('dpadDown', GAMEPAD_DPAD_DOWN), ('dpadLeft', GAMEPAD_DPAD_LEFT),
+                ('dpadRight', GAMEPAD_DPAD_RIGHT), ('Start', GAMEPAD_START), ('Back', GAMEPAD_BACK),
+                ('Guide', GAMEPAD_GUIDE), ('leftThumbstick', GAMEPAD_LEFT_THUMB),
+                ('rightThumbstick', GAMEPAD_RIGHT_THUMB), ('leftBumper', GAMEPAD_LEFT_SHOULDER),
+                ('rightBumper', GAMEPAD_RIGHT_SHOULDER), ('A', GAMEPAD_A), ('B', GAMEPAD_B), ('X', GAMEPAD_X),
+                ('Y', GAMEPAD_Y)]
+
+
+def from_xbox(state, packet_number: int = 0) -> GamepadState:
+    """
+    Convert an xbox.JoystickState snapshot so xboxdrv input can be recorded in the same format.
+
+    :param state: snapshot from xbox.Joystick.snapshot()
+    :param packet_number: packet number to give the converted state
+    :return: the equivalent GamepadState
+    """
+    buttons = 0
+    for name, bit in XBOX_BUTTONS:
+        if getattr(state, name):
+            buttons |= bit
+    return GamepadState(packet_number, buttons, state.leftTrigger, state.rightTrigger,
+                        state.leftX, state.leftY, state.rightX, state.rightY)
+
+
+class TraceRecorder:
+    """ Appends controller states to a trace file """
+
+    def __init__(self, path: str, clock: Callable[[], int] = time.monotonic_ns):
+        """
+        :param path: trace file, created if missing and appended to otherwise
+        :param clock: timestamp source in nanoseconds
+        """
+        self.path = path
+        self.clock = clock
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            # a reader opened before the first records are flushed still finds a valid trace
+            self.file.flush()
+        else:
+            _check_header(path)
+        self._buffer = bytearray(RECORD.size * FLUSH_RECORDS)
+        self._pending = 0
+        self.records: int = 0
+
+    def record(self, state: GamepadState):
+        """
+        :param state: controller state to append, None (a disconnected controller) is skipped
+        """
+        if state is None:
+            return
+        RECORD.pack_into(self._buffer, self._pending * RECORD.size, self.clock(), state.packet_number,
+                         state.buttons, state.left_trigger, state.right_trigger,
+                         state.l_thumb_x, state.l_thumb_y, state.r_thumb_x, state.r_thumb_y)
+        self._pending += 1
+        self.records += 1
+        if self._pending == FLUSH_RECORDS:
+            self.flush()
+
+    def flush(self):
+        """ Append the buffered records to the file """
+        if self._pending:
+            self.file.write(memoryview(self._buffer)[:self._pending * RECORD.size])
+            self._pending = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class RecordingJoystick:
+    """
+    Wraps a controller and records every state it returns. Works with XInputJoystick and
+    EvdevJoystick through get_state() and with xbox.Joystick through snapshot(), whose states are
+    recorded as GamepadState. Every other attribute is passed through to the controller.
+    """
+
+    def __init__(self, joystick, recorder: TraceRecorder):
+        """
+        :param joystick: controller to record
+        :param recorder: trace the states are appended to
+        """
+        self.joystick = joystick
+        self.recorder = recorder
+        self._xbox_packets = 0
+
+    def __getattr__(self, name):
+        return getattr(self.joystick, name)
+
+    def get_state(self) -> GamepadState:
+        state = self.joystick.get_state()
+        self.recorder.record(state)
+        return state
+
+    def snapshot(self):
+        state = self.joystick.snapshot()
+        self._xbox_packets += 1
+        self.recorder.record(from_xbox(state, self._xbox_packets))
+        return state
+
+    def close(self):
+        self.recorder.close()
+        if hasattr(self.joystick, 'close'):
+            self.joystick.close()
+
+
+def _check_header(path: str):
+    with open(path, 'rb') as trace:
+        header = trace.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError('%s is not a controller trace' % path)
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError('%s is not a version %d controller trace' % (path, VERSION))
+
+
+class TraceReader:
+    """ Memory-mapped, read only view of a trace file """
+
+    def __init__(self, path: str):
+        """
+        :param path: trace file to read, records appended after opening are not seen
+        """
+        _check_header(path)
+        self.path = path
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size > HEADER.size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # a trace without records has nothing to map, its header alone is kept
+            self.map = self.file.read(HEADER.size)
+        # a record still being written when the file was opened is ignored
+        self.count = (len(self.map) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index: int) -> Tuple:
+        """
+        :param index: record number
+        :return: the raw record fields, timestamp first
+        """
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return RECORD.unpack_from(self.map, HEADER.size + index * RECORD.size)
+
+    def __getitem__(self, index: int) -> Tuple[int, GamepadState]:
+        """
+        :return: timestamp in nanoseconds and the recorded state
+        """
+        fields = self.record(index)
+        return fields[0], GamepadState(*fields[1:])
+
+    def __iter__(self) -> Iterator[Tuple[int, GamepadState]]:
+        for fields in RECORD.iter_unpack(memoryview(self.map)[HEADER.size:HEADER.size + self.count * RECORD.size]):
+            yield fields[0], GamepadState(*fields[1:])
+
+    def array(self):
+        """
+        View every record as a numpy structured array with RECORD_DTYPE, without copying, requires numpy.
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required to view a trace as an array')
+        return numpy.frombuffer(self.map, dtype=RECORD_DTYPE, count=self.count, offset=HEADER.size)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+class ReplayJoystick:
+    """
+    Controller that plays a trace back through get_state(), so it can stand in for a real controller
+    in the control loop. At real time every record is held until as much time has passed since the
+    first record as when it was recorded; otherwise one record is returned per call as fast as possible.
+    """
+
+    def __init__(self, reader: TraceReader, realtime: bool = False, clock: Callable[[], int] = time.monotonic_ns):
+        """
+        :param reader: trace to replay
+        :param realtime: pace the records by their timestamps
+        :param clock: time source in nanoseconds used for real time pacing
+        """
+        self.reader = reader
+        self.realtime = realtime
+        self.clock = clock
+        self.position = 0
+        self._offset = None  # replay clock minus recording clock
+        self._state = GamepadState()
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.reader)
+
+    def get_state(self) -> GamepadState:
+        """
+        :return: the current recorded state, the last one once the trace has finished
+        """
+        if not self.realtime:
+            if self.position < len(self.reader):
+                self._state = self.reader[self.position][1]
+                self.position += 1
+            return self._state
+
+        now = self.clock()
+        reader = self.reader
+        # skip to the newest record that is due, as a real controller only reports its latest state
+        while self.position < len(reader):
+            timestamp = reader.record(self.position)[0]
+            if self._offset is None:
+                self._offset = now - timestamp
+            if timestamp + self._offset > now:
+                break
+            self.position += 1
+        if self.position:
+            self._state = reader[self.position - 1][1]
+        return self._state
+
+    def is_connected(self) -> bool:
+        return True
+
+
+def record(path: str):
+    """ Record the first connected controller until interrupted """
+    from common.controllers import enumerate_controllers
+
+    joysticks = enumerate_controllers()
+    if not joysticks:
+        print('No controller connected')
+        sys.exit(1)
+    recorder = TraceRecorder(path)
+    joystick = RecordingJoystick(joysticks[0], recorder)
+    print('Recording to %s, press Ctrl-C to stop' % path)
+    try:
+        while True:
+            joystick.get_state()
+            time.sleep(1 / 60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    print('%d records' % recorder.records)
+
+
+def info(path: str):
+    """ Print a summary of a trace """
+    reader = TraceReader(path)
+    try:
+        print('%s: %d records, %d bytes' % (path, len(reader), os.path.getsize(path)))
+        if not len(reader):
+            return
+        if numpy is None:
+            first, last = reader.record(0)[0], reader.record(len(reader) - 1)[0]
+            print('%.1f s' % ((last - first) / 1e9))
+            return
+        records = reader.array()
+        duration = (records['timestamp'][-1] - records['timestamp'][0]) / 1e9
+        intervals = numpy.diff(records['timestamp']) / 1e6
+        changes = numpy.count_nonzero(numpy.diff(records['packet_number'].astype(numpy.int64)))
+        magnitude = numpy.hypot(records['l_thumb_x'].astype(numpy.float64), records['l_thumb_y'])
+        print('%.1f s, %d input changes' % (duration, changes))
+        if len(intervals):
+            print('poll interval p50 %.2f ms  p99 %.2f ms  max %.2f ms' % (
+                numpy.percentile(intervals, 50), numpy.percentile(intervals, 99), intervals.max()))
+        print('left stick pushed %.0f%% of the time' % (100.0 * numpy.mean(magnitude > 7849)))
+        for name, bit in XBOX_BUTTONS:
+            presses = numpy.count_nonzero(numpy.diff((records['buttons'] & bit) != 0, prepend=False) &
+                                          ((records['buttons'] & bit) != 0))
+            if presses:
+                print('  %s pressed %d times' % (name, presses))
+    finally:
+        reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record controller input or summarise a recorded trace.')
+    parser.add_argument('command', choices=['record', 'info'])
+    parser.add_argument('path', help='trace file')
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.path)
+    else:
+        info(args.path)
+
+
+if __name__ == '__main__':
+    main()
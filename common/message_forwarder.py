@@ -1,14 +1,36 @@
+import queue
+import select
+import selectors
 import socket
+import threading
+import time
+import weakref
 from socket import error as socket_error
-from typing import List
+from typing import Dict, List, Set
 
+from common.clock_sync import CLOCK, ClockSync, stamp
+from common.protocol import (DEFAULT_ROOM, ExitMessage, FrameDecoder, JoinMessage, PongMessage, ReadyMessage,
+                             ScoreMessage, StartMessage, encode)
+from common.tracing import NETWORK, NO_TRACE, LatencyTracer
 
-def start_connection(ip: str, port: int) -> socket.socket:
+# seconds a synchronized start may be later than the countdown says before it is ignored
+START_SLACK = 0.5
+
+# seconds a send may wait for a full socket buffer to drain before it gives up
+SEND_TIMEOUT = 2.0
+
+# seat threads, the listener and the main thread share a connection, each send holds its lock
+_send_locks = weakref.WeakKeyDictionary()
+_send_locks_guard = threading.Lock()
+
+
+def start_connection(ip: str, port: int, room: int = DEFAULT_ROOM) -> socket.socket:
     """
     Start a connection to a TCP network.
 
     :param ip ip address of the network
     :param port port number to forward messages over
+    :param room match id to join on the hub, only computers in the same room get each other's messages
     :return: socket opened with the ip address and port number
     """
 
@@ -22,26 +44,206 @@ def start_connection(ip: str, port: int) -> socket.socket:
     except socket_error:
         print('Socket failed to bind')
 
+    # messages are tiny, send them immediately instead of waiting to coalesce them
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if room != DEFAULT_ROOM:
+        s.sendall(encode(JoinMessage(room)))
     s.setblocking(False)
     return s
 
 
-def receive_message(connection: socket.socket) -> List[str]:
+def send_message(connection: socket.socket, message: tuple, clock: ClockSync = CLOCK):
+    """
+    Send a single framed message over the network.
+
+    :param connection the network connection used to send data
+    :param message any message defined in common.protocol, game messages are stamped with the time they are sent
+    :param clock the synchronized clock to stamp game messages with, they are left unstamped until it is synchronized
+    """
+
+    if clock.synchronized:
+        message = stamp(message, clock.now_us())
+    data = encode(message)
+    with _send_locks_guard:
+        lock = _send_locks.get(connection)
+        if lock is None:
+            lock = _send_locks[connection] = threading.Lock()
+    # frames from different threads are never interleaved, each is written whole
+    with lock:
+        if isinstance(connection, socket.socket):
+            _send_all(connection, data)
+        else:
+            connection.sendall(data)
+
+
+def _send_all(connection: socket.socket, data: bytes):
+    """ sendall for a non-blocking socket, waiting up to SEND_TIMEOUT for room in its buffer """
+    view = memoryview(data)
+    deadline = time.monotonic() + SEND_TIMEOUT
+    while view:
+        try:
+            view = view[connection.send(view):]
+        except BlockingIOError:
+            pass
+        if not view:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout('sending to the network timed out')
+        select.select([], [connection], [], remaining)
+
+
+def receive_message(connection: socket.socket, decoder: FrameDecoder) -> List[tuple]:
     """
-    Receive a cube message from the network and parse it into sections so we can
-    check the coordinates of a robot's cubes against a base.
+    Receive every complete message that is waiting on the network. Messages that were
+    split across or merged into TCP segments are reassembled by the connection's decoder.
 
     :param connection the network connection used to receive data
-    :return: parameterized coordinate data
+    :param decoder the frame decoder that belongs to this connection
+    :return: decoded messages, empty if nothing complete has arrived
     """
 
     try:
-        bytedata = connection.recv(4048)
-        data = bytedata.decode('utf-8')
-
-        if not data:
-            print('No message to receive')
-        else:
-            return data.split(' ')
-    except socket.error:
+        return decoder.recv_from(connection)
+    except BlockingIOError:
+        return []
+    except ConnectionError:
+        print('No message to receive')
         return []
+
+
+class MessageListener(threading.Thread):
+    """
+    Waits for messages on a background thread so the control loops never poll the socket.
+    Decoded messages are pushed onto a queue and the exit message sets the game_over event,
+    which leaves the hot loop with a single flag check per iteration. Consumers that only need the
+    flags, scores and start barrier turn the queue off so unread messages do not pile up.
+    """
+
+    def __init__(self, connection: socket.socket, messages: queue.Queue = None, tracer: LatencyTracer = NO_TRACE,
+                 clock: ClockSync = CLOCK, queue_messages: bool = True):
+        """
+        :param connection: the network connection to listen on, may be None when messages are dispatched directly
+        :param messages: queue to push decoded messages onto, a new one is created if not given
+        :param tracer: records how long receiving and dispatching each batch of messages takes
+        :param clock: synchronized with the hub by pings sent from the listener thread, see common.clock_sync
+        :param queue_messages: push decoded messages onto the queue, off when nothing reads it
+        """
+        super().__init__(daemon=True)
+        self.connection = connection
+        self.decoder = FrameDecoder()
+        self.messages: queue.Queue = messages if messages is not None else queue.Queue()
+        self.queue_messages = queue_messages
+        self.game_over = threading.Event()
+        self.tracer = tracer
+        self.clock = clock
+        self.winner: int = 0
+        self.scores: Dict[int, int] = {}
+        # start of game barrier, see common.barrier, ready participants of this game and of the next one
+        self.round: int = 0
+        self.ready: Set[int] = set()
+        self.next_ready: Set[int] = set()
+        self._ready_lock = threading.Lock()
+        self.participant_ready = threading.Event()
+        self.started = threading.Event()
+        self.start_at: float = 0.0
+        self._running = True
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.connection, selectors.EVENT_READ)
+        next_ping = time.monotonic()
+        try:
+            while self._running:
+                now = time.monotonic()
+                if now >= next_ping:
+                    self.ping()
+                    next_ping = now + self.clock.ping_interval
+                # the timeout only bounds how long stop() takes to be noticed
+                if not selector.select(timeout=min(0.25, next_ping - now)):
+                    continue
+                start = self.tracer.now()
+                try:
+                    messages = self.decoder.recv_from(self.connection)
+                except BlockingIOError:
+                    continue
+                except ConnectionError:
+                    print('Connection to the network was closed')
+                    break
+                for message in messages:
+                    self.dispatch(message)
+                self.tracer.record(NETWORK, start)
+        finally:
+            selector.close()
+
+    def dispatch(self, message: tuple):
+        """
+        Record a message and hand it to the consumer.
+
+        :param message: decoded message
+        """
+        if isinstance(message, PongMessage):
+            # answers to this listener's pings are only for the clock
+            self.clock.on_pong(message)
+            return
+        self.clock.received(message)
+        if isinstance(message, ScoreMessage):
+            self.scores[message.team] = message.score
+        elif isinstance(message, ExitMessage):
+            self.winner = message.team
+            self.game_over.set()
+        elif isinstance(message, ReadyMessage):
+            # ready messages still in flight from the game that just started are not counted for the next one
+            with self._ready_lock:
+                if message.round == self.round:
+                    self.ready.add(message.participant)
+                    self.participant_ready.set()
+                elif message.round == (self.round + 1) & 0xFFFF:
+                    self.next_ready.add(message.participant)
+        elif isinstance(message, StartMessage):
+            if message.round != self.round:
+                return
+            now = time.monotonic()
+            countdown = message.countdown_ms / 1000
+            self.start_at = now + countdown
+            if message.sent_us and self.clock.synchronized:
+                # everyone starts at the same moment however long the message took to arrive
+                start_us = self.clock.to_local(message.sent_us + message.countdown_ms * 1000)
+                start_at = now + (start_us - self.clock.clock()) / 1e6
+                # a stamp from a clock that was far off is not trusted, the countdown alone is
+                if now <= start_at <= now + countdown + START_SLACK:
+                    self.start_at = start_at
+            self.started.set()
+        if self.queue_messages:
+            self.messages.put(message)
+
+    def ping(self):
+        """ Send the hub a ping, a failed send is only a missed sample """
+        try:
+            send_message(self.connection, self.clock.ping())
+        except OSError:
+            pass
+
+    def new_round(self):
+        """
+        Forget the last game so the listener can be reused for the next one in a session. Queued
+        messages all belong to the game that just ended and are dropped. Computers that reported
+        ready for the next game before this is called are still counted.
+        """
+        with self._ready_lock:
+            self.round = (self.round + 1) & 0xFFFF
+            self.ready, self.next_ready = self.next_ready, set()
+        self.game_over.clear()
+        self.winner = 0
+        self.scores.clear()
+        self.started.clear()
+        self.start_at = 0.0
+        while True:
+            try:
+                self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+    def stop(self):
+        """ Stop listening, the thread exits within a quarter of a second """
+        self._running = False
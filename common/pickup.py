@@ -0,0 +1,88 @@
+import time
+from typing import Callable
+
+from cozmo.objects import LightCube
+from cozmo.util import distance_mm
+
+from common.commands import CommandShaper
+
+IDLE = 'idle'
+SEARCHING = 'searching'
+APPROACHING = 'approaching'
+PICKING_UP = 'picking up'
+
+
+class AutoPickup:
+    """
+    Drives to and picks up the first visible cube as a background action. Call update() once per
+    control tick to advance the state machine; nothing here ever waits on the robot, so the
+    control loop keeps reading the controller and the network while the pickup runs. The robot
+    stands still while it looks for a cube, and the shaper's last commands are forgotten once the
+    pickup ends, since the SDK's actions moved the wheels and lift behind its back.
+    """
+
+    def __init__(self, robot: CommandShaper, search_timeout: float = 30,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param robot: command shaper of the robot that performs the pickup
+        :param search_timeout: seconds to look for a cube before giving up
+        :param clock: monotonic clock returning seconds
+        """
+        self.robot = robot
+        self.search_timeout = search_timeout
+        self.clock = clock
+
+        self.state: str = IDLE
+        self.cube: LightCube = None
+        self.action = None
+        self._search_deadline: float = 0.0
+
+        self.completed: int = 0
+        self.cancelled: int = 0
+
+    @property
+    def active(self) -> bool:
+        return self.state != IDLE
+
+    def start(self):
+        """ Begin looking for a cube, ignored if a pickup is already running """
+        if self.state == IDLE:
+            self.robot.drive_wheels(0, 0)
+            self.state = SEARCHING
+            self._search_deadline = self.clock() + self.search_timeout
+
+    def update(self):
+        """ Advance the pickup by at most one step without blocking """
+        if self.state == SEARCHING:
+            cube = next((obj for obj in self.robot.world.visible_objects if isinstance(obj, LightCube)), None)
+            if cube is not None:
+                self.cube = cube
+                self.action = self.robot.go_to_object(cube, distance_mm(200.0))
+                self.state = APPROACHING
+            elif self.clock() > self._search_deadline:
+                self._finish()
+
+        elif self.state == APPROACHING:
+            if self.action.is_completed:
+                self.action = self.robot.pickup_object(self.cube, num_retries=0)
+                self.state = PICKING_UP
+
+        elif self.state == PICKING_UP:
+            if self.action.is_completed:
+                self.completed += 1
+                self._finish()
+
+    def cancel(self):
+        """ Abort the running pickup and hand control back to the player """
+        if self.state == IDLE:
+            return
+        if self.action is not None and self.action.is_running:
+            self.action.abort()
+        self.cancelled += 1
+        self._finish()
+
+    def _finish(self):
+        self.robot.invalidate()
+        self.state = IDLE
+        self.cube = None
+        self.action = None
@@ -0,0 +1,106 @@
+"""Streaming of robot and cube poses from the players to the judges
+
+The SDK reports poses relative to wherever the robot was when it connected. Every player calibrates
+once its robot stands at a known spot of the field, usually its base, and from then on sends its
+robot's pose and the poses of the cubes its robot is paired with, its team's cubes, in the field
+frame of common.spatial, so the judges can check cube captures by coordinates with a CaptureIndex.
+"""
+from __future__ import annotations
+
+import math
+import socket
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+from common.message_forwarder import send_message
+from common.protocol import CubePoseMessage, RobotPoseMessage
+
+# only needed for annotations, the poses are read from robots the caller already connected
+if TYPE_CHECKING:
+    import cozmo
+    from cozmo.objects import LightCube
+
+# robot poses sent per second
+POSE_RATE_HZ = 10.0
+
+# mm a cube has to move before its pose is sent again
+CUBE_MIN_MOVE = 10.0
+
+
+class PoseStreamer:
+    """ Sends one player robot's pose and the poses of the cubes it is paired with """
+
+    def __init__(self, connection: socket.socket, robot: cozmo.robot.Robot, team: int, number: int,
+                 home: Tuple[float, float, float], rate_hz: float = POSE_RATE_HZ,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param connection: network connection to send on
+        :param robot: robot whose pose is streamed, its paired cubes are the team's cubes
+        :param team: team the robot plays for
+        :param number: number of the robot within its team
+        :param home: field x, y and heading the robot is put at before every game, see common.spatial.base_pose
+        :param rate_hz: robot poses sent per second
+        :param clock: monotonic clock returning seconds
+        """
+        self.connection = connection
+        self.robot = robot
+        self.team = team
+        self.number = number
+        self.home = home
+        self.period = 1.0 / rate_hz
+        self.clock = clock
+        self._next: float = 0.0
+        # SDK pose of the robot when it was at home
+        self._reference: Tuple[float, float, float] = home
+        self._cubes: Dict[int, Tuple[float, float]] = {}
+        self.sent: int = 0
+
+    def calibrate(self):
+        """ Tie the robot's current SDK pose to its home, call while the robot is at home """
+        pose = self.robot.pose
+        self._reference = (pose.position.x, pose.position.y, pose.rotation.angle_z.radians)
+        self._cubes.clear()
+        self._next = 0.0
+
+    def to_field(self, x: float, y: float, heading: float = 0.0) -> Tuple[float, float, float]:
+        """
+        :return: the field pose of an SDK pose
+        """
+        reference_x, reference_y, reference_heading = self._reference
+        field_x, field_y, field_heading = self.home
+        turn = field_heading - reference_heading
+        cos, sin = math.cos(turn), math.sin(turn)
+        dx, dy = x - reference_x, y - reference_y
+        return field_x + dx * cos - dy * sin, field_y + dx * sin + dy * cos, heading + turn
+
+    def update(self):
+        """ Send the poses if a period has passed since the last ones, call once per control tick """
+        now = self.clock()
+        if now < self._next:
+            return
+        self._next = now + self.period
+
+        robot = self.robot
+        pose = robot.pose
+        x, y, heading = self.to_field(pose.position.x, pose.position.y, pose.rotation.angle_z.radians)
+        tenths = int(round(math.degrees(heading) * 10)) % 3600
+        send_message(self.connection, RobotPoseMessage(self.team, self.number, int(x), int(y),
+                                                       tenths - 3600 if tenths >= 1800 else tenths))
+        self.sent += 1
+
+        # the SDK keeps the last pose a cube was seen or carried at, only cubes that moved are sent
+        for cube in robot.world.light_cubes.values():
+            self._send_cube(cube, pose)
+
+    def _send_cube(self, cube: LightCube, robot_pose: cozmo.util.Pose):
+        pose = cube.pose
+        # poses from before the robot last lost track of where it is cannot be placed on the field
+        if pose is None or not pose.is_comparable(robot_pose):
+            return
+        x, y, heading = self.to_field(pose.position.x, pose.position.y)
+        last = self._cubes.get(cube.cube_id)
+        if last is not None and (x - last[0]) ** 2 + (y - last[1]) ** 2 < CUBE_MIN_MOVE ** 2:
+            return
+        self._cubes[cube.cube_id] = (x, y)
+        send_message(self.connection, CubePoseMessage(self.team, cube.cube_id, int(x), int(y)))
+        self.sent += 1
@@ -0,0 +1,242 @@
+"""Framed binary messages exchanged between judges and players
+
+Every frame is a fixed header (payload length, message type) followed by a struct packed payload.
+Game messages end with sent_us, the time they were sent on the hub's clock in microseconds, which
+send_message fills in from the synchronized clock of common.clock_sync when it is left at 0, once
+that clock is synchronized. Messages sent before then keep 0.
+"""
+import socket
+import struct
+from typing import Dict, FrozenSet, List, NamedTuple, Tuple, Type
+
+# payload length, message type
+HEADER = struct.Struct('!HB')
+
+EXIT = 1
+SCORE = 2
+CUBE_CAPTURED = 3
+READY = 4
+START = 5
+ROBOT_POSE = 6
+CUBE_POSE = 7
+CAPTURE_CLAIM = 8
+PING = 9
+PONG = 10
+JOIN = 11
+
+# room of computers that never send a join message
+DEFAULT_ROOM = 0
+
+
+class ExitMessage(NamedTuple):
+    """ Sent by the game state service once a team has won, exactly once per game """
+    team: int
+    sent_us: int = 0
+
+
+class ScoreMessage(NamedTuple):
+    """ Sent by the game state service every time a team's score changes """
+    team: int
+    score: int
+    sent_us: int = 0
+
+
+class CubeCapturedMessage(NamedTuple):
+    """ Sent by the game state service when it accepts a judge's claim, see common.game_state """
+    team: int
+    cube_id: int
+    sent_us: int = 0
+
+
+class ReadyMessage(NamedTuple):
+    """ Sent by every judge and player once its robot and cubes are in position, repeated until the game starts """
+    team: int
+    role: int  # common.barrier.JUDGE or common.barrier.PLAYER
+    participant: int  # random id, so repeated messages are only counted once
+    round: int  # game of the session the computer is ready for, counted from 0 and wrapping at 16 bits
+
+
+class StartMessage(NamedTuple):
+    """
+    Sent by the coordinating judge once everyone is ready, the game starts countdown_ms after it was sent,
+    or after it arrives on computers whose clock is not synchronized yet
+    """
+    countdown_ms: int
+    round: int = 0  # game of the session that starts
+    sent_us: int = 0
+
+
+class RobotPoseMessage(NamedTuple):
+    """ Streamed by every player, position in mm in the field frame of common.spatial """
+    team: int
+    robot: int  # number of the robot within its team
+    x: int
+    y: int
+    heading: int  # tenths of a degree counterclockwise from the x axis
+
+
+class CubePoseMessage(NamedTuple):
+    """ Streamed by a player whenever one of its team's cubes is seen or carried somewhere new """
+    team: int  # team the cube is paired with
+    cube_id: int
+    x: int
+    y: int
+
+
+class CaptureClaimMessage(NamedTuple):
+    """ Sent by a judge when it is shown one of its team's cubes, only to the game state service """
+    team: int
+    cube_id: int
+    sent_us: int = 0
+
+
+class PingMessage(NamedTuple):
+    """ Sent by every computer to the hub to synchronize its clock, see common.clock_sync """
+    sequence: int
+    sent_us: int  # sender's local clock
+
+
+class PongMessage(NamedTuple):
+    """ The hub's answer to a ping, sent only to the computer that sent the ping """
+    sequence: int
+    ping_sent_us: int  # sender's local clock, copied from the ping
+    received_us: int  # hub's clock when the ping arrived
+    sent_us: int  # hub's clock when the pong was sent
+
+
+class JoinMessage(NamedTuple):
+    """ Sent to the hub right after connecting, only computers in the same room get each other's messages """
+    room: int  # match id
+
+
+# game messages that carry the synchronized time they were sent
+STAMPED: FrozenSet[Type[tuple]] = frozenset((ExitMessage, ScoreMessage, CubeCapturedMessage, StartMessage,
+                                             CaptureClaimMessage))
+
+# message type -> (message class, payload layout)
+_payloads: Dict[int, Tuple[Type[tuple], struct.Struct]] = {}
+_types: Dict[Type[tuple], int] = {}
+
+
+def register(message_type: int, message_class: Type[tuple], payload_format: str):
+    """
+    Register a message class with the protocol so it can be encoded and decoded.
+
+    :param message_type: unique type id written in the frame header
+    :param message_class: NamedTuple class holding the message fields
+    :param payload_format: struct format of the payload, fields in the order of the class
+    """
+    _payloads[message_type] = (message_class, struct.Struct('!' + payload_format))
+    _types[message_class] = message_type
+
+
+register(EXIT, ExitMessage, 'Bq')
+register(SCORE, ScoreMessage, 'BBq')
+register(CUBE_CAPTURED, CubeCapturedMessage, 'BBq')
+register(READY, ReadyMessage, 'BBIH')
+register(START, StartMessage, 'HHq')
+register(ROBOT_POSE, RobotPoseMessage, 'BBhhh')
+register(CUBE_POSE, CubePoseMessage, 'BBhh')
+register(CAPTURE_CLAIM, CaptureClaimMessage, 'BBq')
+register(PING, PingMessage, 'Iq')
+register(PONG, PongMessage, 'Iqqq')
+register(JOIN, JoinMessage, 'H')
+
+
+def encode(message: tuple) -> bytes:
+    """
+    Pack a message into a single frame.
+
+    :param message: any registered message
+    :return: header and payload bytes ready to send
+    """
+    message_type = _types[type(message)]
+    payload = _payloads[message_type][1]
+    return HEADER.pack(payload.size, message_type) + payload.pack(*message)
+
+
+def decode(message_type: int, payload: bytes) -> tuple:
+    """
+    Unpack the payload of a single frame.
+
+    :param message_type: type id from the frame header
+    :param payload: the frame's payload bytes
+    :return: the message
+    """
+    message_class, layout = _payloads[message_type]
+    return message_class(*layout.unpack(payload))
+
+
+class FrameDecoder:
+    """
+    Streaming decoder that reassembles frames from arbitrarily split or coalesced segments.
+    Bytes are received straight into one preallocated buffer that is reused for the lifetime of the decoder.
+    """
+
+    def __init__(self, buffer_size: int = 4096):
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # offset of the first undecoded byte
+        self.end = 0  # offset one past the last received byte
+
+    def recv_from(self, connection: socket.socket) -> List[tuple]:
+        """
+        Receive whatever is available on the connection and decode every complete frame.
+
+        :param connection: socket to read from, BlockingIOError propagates for non-blocking sockets
+        :return: decoded messages, empty if no frame is complete yet
+        :raises ConnectionError: when the peer has closed the connection
+        """
+        self._make_room()
+        received = connection.recv_into(self.view[self.end:])
+        if not received:
+            raise ConnectionResetError('Connection closed by peer')
+        self.end += received
+        return self._decode()
+
+    def feed(self, data: bytes) -> List[tuple]:
+        """
+        Decode frames from bytes that were received elsewhere.
+
+        :param data: raw bytes from the stream
+        :return: decoded messages, empty if no frame is complete yet
+        """
+        messages: List[tuple] = []
+        data = memoryview(data)
+        while data:
+            self._make_room()
+            count = min(len(data), len(self.buffer) - self.end)
+            self.view[self.end:self.end + count] = data[:count]
+            self.end += count
+            data = data[count:]
+            messages.extend(self._decode())
+        return messages
+
+    def _make_room(self):
+        """ Move the undecoded tail to the front of the buffer, growing it only if a frame cannot fit """
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buffer):
+            pending = self.end - self.start
+            if self.start == 0:
+                self.view.release()
+                self.buffer.extend(bytes(len(self.buffer)))
+                self.view = memoryview(self.buffer)
+            else:
+                self.view[:pending] = self.view[self.start:self.end]
+                self.start, self.end = 0, pending
+
+    def _decode(self) -> List[tuple]:
+        messages: List[tuple] = []
+        buffer = self.buffer
+        while self.end - self.start >= HEADER.size:
+            length, message_type = HEADER.unpack_from(buffer, self.start)
+            frame_end = self.start + HEADER.size + length
+            if frame_end > self.end:
+                break
+            payload = _payloads.get(message_type)
+            # unknown message types are skipped so older clients keep working with newer peers
+            if payload is not None and payload[1].size == length:
+                messages.append(payload[0](*payload[1].unpack_from(buffer, self.start + HEADER.size)))
+            self.start = frame_end
+        return messages
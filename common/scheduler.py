@@ -0,0 +1,104 @@
+import time
+from bisect import bisect_left
+from typing import Callable, List
+
+# upper bounds of the histogram buckets in seconds, the last bucket catches everything slower
+BUCKET_BOUNDS: List[float] = [50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3, 100e-3]
+
+
+class Histogram:
+    """ Fixed bucket histogram of durations that never allocates while recording """
+
+    def __init__(self, bounds: List[float] = BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.total: int = 0
+        self.maximum: float = 0.0
+
+    def record(self, seconds: float):
+        """
+        Add a single sample to the histogram.
+
+        :param seconds: duration to record
+        """
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimate a percentile as the upper bound of the bucket it falls in.
+
+        :param fraction: percentile between 0.0 and 1.0
+        :return: upper bound in seconds, the maximum sample for the overflow bucket
+        """
+        if not self.total:
+            return 0.0
+        target = fraction * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(self.bounds[index], self.maximum) if index < len(self.bounds) else self.maximum
+        return self.maximum
+
+    def __str__(self):
+        return 'p50 <= %.3f ms, p99 <= %.3f ms, max %.3f ms' % (
+            self.percentile(0.5) * 1e3, self.percentile(0.99) * 1e3, self.maximum * 1e3)
+
+
+class FixedRateScheduler:
+    """
+    Runs a function at a fixed rate using absolute monotonic deadlines, so time spent in the
+    function and oversleeping do not accumulate into drift. Ticks that overrun their period are
+    counted and the schedule skips ahead instead of bursting to catch up.
+    """
+
+    def __init__(self, rate_hz: float = 60, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        :param rate_hz: number of ticks per second
+        :param clock: monotonic clock returning seconds
+        :param sleep: function used to wait until the next deadline
+        """
+        self.period: float = 1.0 / rate_hz
+        self.clock = clock
+        self.sleep = sleep
+        self.latency = Histogram()  # time spent inside each tick
+        self.jitter = Histogram()  # how late each tick started compared to its deadline
+        self.ticks: int = 0
+        self.overruns: int = 0
+
+    def run(self, tick: Callable[[], None], should_stop: Callable[[], bool]):
+        """
+        Call tick once per period until should_stop returns True.
+
+        :param tick: the work to do every period
+        :param should_stop: checked before every tick
+        """
+        clock = self.clock
+        period = self.period
+        deadline = clock()
+
+        while not should_stop():
+            start = clock()
+            self.jitter.record(max(start - deadline, 0.0))
+            tick()
+            end = clock()
+            self.latency.record(end - start)
+            self.ticks += 1
+
+            deadline += period
+            if end > deadline:
+                # skip the ticks that were missed rather than running them back to back
+                self.overruns += 1
+                deadline += (int((end - deadline) / period) + 1) * period
+            self.sleep(deadline - end)
+
+    def report(self) -> str:
+        """
+        :return: human readable summary of the tick latency, jitter and overruns
+        """
+        return ('%d ticks at %.0f Hz, %d overruns\n  latency: %s\n  jitter:  %s' % (
+            self.ticks, 1.0 / self.period, self.overruns, self.latency, self.jitter))
@@ -0,0 +1,100 @@
+import threading
+from typing import Callable, List
+
+import cozmo
+
+from common.commands import CommandShaper
+from common.drive import StickDrive
+from common.pickup import AutoPickup
+from common.poses import PoseStreamer
+from common.scheduler import FixedRateScheduler
+from common.tracing import READ, TICK, LatencyTracer
+
+
+class Seat:
+    """
+    One robot driven by one controller. Every seat runs its control loop on its own thread with its
+    own command shaper, auto pickup and scheduler, so a robot that is slow to accept commands only
+    delays its own seat.
+    """
+
+    def __init__(self, robot: cozmo.robot.Robot, joystick, rate_hz: float, tracer: LatencyTracer = None,
+                 poses: PoseStreamer = None):
+        """
+        :param robot: robot driven from this seat
+        :param joystick: controller whose get_state() returns a common.gamepad.GamepadState
+        :param rate_hz: control loop rate
+        :param tracer: stage latencies of this seat's ticks, a disabled tracer is created if not given
+        :param poses: streams the robot's pose from the control loop, nothing is streamed if not given
+        """
+        self.robot = robot
+        self.joystick = joystick
+        self.shaper = CommandShaper(robot)
+        self.pickup = AutoPickup(self.shaper)
+        self.scheduler = FixedRateScheduler(rate_hz)
+        self.tracer = tracer if tracer is not None else LatencyTracer()
+        self.poses = poses
+        self.error: Exception = None
+
+    def run(self, control: Callable, stick_drive: StickDrive, should_stop: Callable[[], bool]):
+        """
+        Run the control loop until should_stop returns True or the seat fails.
+
+        :param control: check_controller_state style function called with (robot, state, pickup, stick_drive, tracer)
+        :param stick_drive: stick to wheel mapping, shared read only between seats
+        :param should_stop: checked before every tick
+        """
+        tracer = self.tracer
+        poses = self.poses
+
+        def tick():
+            start = tracer.now()
+            state = self.joystick.get_state()
+            tracer.record(READ, start)
+            control(self.shaper, state, self.pickup, stick_drive, tracer)
+            if poses is not None:
+                poses.update()
+            tracer.record(TICK, start)
+
+        try:
+            self.scheduler.run(tick, should_stop)
+        except Exception as error:
+            # a failing seat stops on its own and leaves the others playing, say so now rather than after the game
+            self.error = error
+            print('A seat stopped driving its robot: %r' % error)
+        finally:
+            self.pickup.cancel()
+
+    def halt(self):
+        """ Stop the robot's wheels and lift, e.g. at the end of a round """
+        self.shaper.invalidate()
+        self.shaper.drive_wheels(0, 0)
+        self.shaper.move_lift(0)
+
+    def report(self) -> str:
+        """
+        :return: loop latency, jitter and command statistics for this seat
+        """
+        report = '%s\n  %s' % (self.scheduler.report(), self.shaper.report())
+        if self.tracer.recorded:
+            report += '\n  ' + self.tracer.report().replace('\n', '\n  ')
+        if self.error is not None:
+            report += '\n  stopped by %r' % self.error
+        return report
+
+
+def run_seats(seats: List[Seat], control: Callable, stick_drive: StickDrive, should_stop: Callable[[], bool]):
+    """
+    Run every seat on its own thread and wait for all of them to stop.
+
+    :param seats: seats to run
+    :param control: check_controller_state style function called with (robot, state, pickup, stick_drive, tracer)
+    :param stick_drive: stick to wheel mapping, built once and kept for every game of a session
+    :param should_stop: checked by every seat before each tick
+    """
+    threads = [threading.Thread(target=seat.run, args=(control, stick_drive, should_stop), daemon=True)
+               for seat in seats]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
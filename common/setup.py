@@ -1,16 +1,18 @@
-import time
 from typing import List, Dict
 
 import cozmo
 from cozmo.objects import LightCube, LightCube1Id, LightCube2Id, LightCube3Id
 
+from common.barrier import StartBarrier
 
-def setup(robot: cozmo.robot.Robot, cube_color: cozmo.lights.Light) -> (List[LightCube]):
+
+def setup(robot: cozmo.robot.Robot, cube_color: cozmo.lights.Light, barrier: StartBarrier) -> (List[LightCube]):
     """
     Setup up the cozmo program to run for each computer to use.
 
     :param robot robot to get cubes for
     :param cube_color color of this team's cubes
+    :param barrier start of game barrier this computer waits on once its cubes are lit
     """
 
     # store all of the cube objects in a list
@@ -23,10 +25,7 @@ def setup(robot: cozmo.robot.Robot, cube_color: cozmo.lights.Light) -> (List[Lig
 
     # start the game once the master computer sends out the start message over the network
     print("Set Cozmo's in position to play.")
-
-    # give a 10 second period for the users to set their robots in their bases and hide their cubes
-    time.sleep(10)
-
+    barrier.wait()
     print("Start playing!")
 
     return robot_cubes
@@ -0,0 +1,138 @@
+"""Capture checks of cube poses against the bases on the playing field
+
+Positions are in mm in the field frame: the origin is a corner of the square field and the bases
+are spread evenly around its center, the team 1 base on the left. In a real game of two or three
+teams every cube pose update is checked against each base in turn, which is a handful of distance
+checks. From GRID_MIN_TEAMS teams on, the bases are looked up in a uniform grid instead, so a pose is
+only compared with the few bases overlapping its cell.
+"""
+import math
+from typing import Hashable, List, Optional, Set, Tuple
+
+FIELD_SIZE = 2000.0  # mm along each side of the square field
+BASE_RADIUS = 300.0  # mm around the judge that count as a team's base
+CELL_SIZE = 250.0  # mm along each side of a grid cell
+
+# teams from which looking a cube's base up in the grid beats checking every base
+GRID_MIN_TEAMS = 20
+
+
+def base_pose(team: int, teams: int, size: float = FIELD_SIZE) -> Tuple[float, float, float]:
+    """
+    :param team: team id starting at 1
+    :param teams: number of teams playing
+    :param size: length of each side of the field in mm
+    :return: x, y and the heading in radians of a robot at the base facing the center of the field
+    """
+    angle = 2 * math.pi * (team - 1) / teams + math.pi
+    center = size / 2
+    radius = size * 0.425
+    return (center + radius * math.cos(angle), center + radius * math.sin(angle),
+            (angle + 2 * math.pi) % (2 * math.pi) - math.pi)
+
+
+class SpatialGrid:
+    """ Square field split into equal cells, circular regions are registered in every cell they overlap """
+
+    def __init__(self, size: float = FIELD_SIZE, cell_size: float = CELL_SIZE):
+        """
+        :param size: length of each side of the field in mm, points outside are clamped onto its edge
+        :param cell_size: length of each side of a cell in mm
+        """
+        self.size = size
+        self.cell_size = cell_size
+        self.columns = max(1, int(math.ceil(size / cell_size)))
+        self._regions: List[List[Tuple[Hashable, float, float, float]]] = [[] for _ in range(self.columns ** 2)]
+
+    def _column(self, value: float) -> int:
+        return min(self.columns - 1, max(0, int(value / self.cell_size)))
+
+    def cell(self, x: float, y: float) -> int:
+        """
+        :return: index of the cell the point is in
+        """
+        return self._column(y) * self.columns + self._column(x)
+
+    def add_region(self, key: Hashable, x: float, y: float, radius: float):
+        """
+        Register a circle, such as a base, with every cell it overlaps.
+
+        :param key: returned by region_at for points inside the circle
+        :param x: center in mm
+        :param y: center in mm
+        :param radius: radius in mm
+        """
+        size = self.cell_size
+        for row in range(self._column(y - radius), self._column(y + radius) + 1):
+            for column in range(self._column(x - radius), self._column(x + radius) + 1):
+                # closest point of the cell to the center of the circle
+                dx = x - min(max(x, column * size), (column + 1) * size)
+                dy = y - min(max(y, row * size), (row + 1) * size)
+                if dx * dx + dy * dy <= radius * radius:
+                    self._regions[row * self.columns + column].append((key, x, y, radius * radius))
+
+    def region_at(self, x: float, y: float) -> Optional[Hashable]:
+        """
+        :return: key of the region the point is inside, None if it is in none
+        """
+        for key, region_x, region_y, radius_squared in self._regions[self.cell(x, y)]:
+            dx = x - region_x
+            dy = y - region_y
+            if dx * dx + dy * dy <= radius_squared:
+                return key
+        return None
+
+
+class CaptureIndex:
+    """
+    Decides from the streamed cube poses when a cube is captured. Cubes are paired with the judge of
+    the team that captures them and hidden by the other teams, so a cube is captured the first time
+    it is inside the base of its own team.
+    """
+
+    def __init__(self, teams: int, size: float = FIELD_SIZE, base_radius: float = BASE_RADIUS,
+                 cell_size: float = CELL_SIZE):
+        """
+        :param teams: number of teams playing
+        :param size: length of each side of the field in mm
+        :param base_radius: mm around each base's center that count as the base
+        :param cell_size: length of each side of a grid cell in mm
+        """
+        self.grid = SpatialGrid(size, cell_size)
+        self.bases: List[Tuple[int, float, float]] = []
+        for team in range(1, teams + 1):
+            x, y, heading = base_pose(team, teams, size)
+            self.grid.add_region(team, x, y, base_radius)
+            self.bases.append((team, x, y))
+        self.base_radius_squared = base_radius * base_radius
+        self.use_grid = teams >= GRID_MIN_TEAMS
+        self.captured: Set[Tuple[int, int]] = set()
+        self.updates: int = 0
+
+    def update_cube(self, team: int, cube_id: int, x: float, y: float) -> bool:
+        """
+        :param team: team the cube is paired with
+        :param cube_id: id of the cube within the team
+        :param x: position in mm
+        :param y: position in mm
+        :return: whether this update captured the cube
+        """
+        self.updates += 1
+        if self.base_at(x, y) != team or (team, cube_id) in self.captured:
+            return False
+        self.captured.add((team, cube_id))
+        return True
+
+    def base_at(self, x: float, y: float) -> Optional[int]:
+        """
+        :return: team whose base the point is in, None if it is in none
+        """
+        if self.use_grid:
+            return self.grid.region_at(x, y)
+        radius_squared = self.base_radius_squared
+        for team, base_x, base_y in self.bases:
+            dx = x - base_x
+            dy = y - base_y
+            if dx * dx + dy * dy <= radius_squared:
+                return team
+        return None
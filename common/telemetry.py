@@ -0,0 +1,281 @@
+"""Pose telemetry for live scoreboards over UDP
+
+Every player publishes its robot's field pose, lift height and carried cube at TELEMETRY_RATE_HZ as
+one fixed-size datagram per update, from a thread of its own next to the control loops. Datagrams carry a per-robot
+sequence number, so a receiver keeps only the newest state of every robot and drops stale and
+reordered datagrams with a single comparison. They also carry the match room of common.hub, so a
+receiver only shows the robots of one match when several are played at once. Telemetry is best
+effort: nothing is retried, a datagram that cannot be sent right away is skipped and the next
+update replaces it.
+
+The receiver keeps the latest state of every robot in preallocated arrays indexed by slot, so
+receiving never allocates and a scoreboard can read every robot without locking.
+"""
+from __future__ import annotations
+
+import math
+import selectors
+import socket
+import struct
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from common.protocol import DEFAULT_ROOM
+from common.scheduler import FixedRateScheduler
+
+# only needed for annotations, so a scoreboard loads without the SDK
+if TYPE_CHECKING:
+    import cozmo
+
+TELEMETRY_PORT = 5001
+TELEMETRY_RATE_HZ = 25.0
+
+# magic, sequence, room, team, robot, x, y, heading in tenths of a degree, lift in percent, carried cube id or 0
+PACKET = struct.Struct('!BIHBBhhhBB')
+MAGIC = 0xC0
+
+# sequence numbers wrap, a datagram is newer when it is less than half the range ahead
+SEQUENCE_MASK = 0xFFFFFFFF
+SEQUENCE_HALF = 0x80000000
+
+
+class RobotTelemetry(NamedTuple):
+    team: int
+    robot: int  # number of the robot within its team
+    x: int  # mm in the field frame of common.spatial
+    y: int
+    heading: int  # tenths of a degree counterclockwise from the x axis
+    lift: int  # percent of the lift's travel
+    carrying: int  # cube id of the carried cube, 0 when nothing is carried
+    sequence: int
+    received_at: float  # receiver's monotonic clock
+
+
+def tenths_of_degree(heading: float) -> int:
+    """
+    :param heading: radians
+    :return: tenths of a degree between -1800 and 1799
+    """
+    tenths = int(round(math.degrees(heading) * 10)) % 3600
+    return tenths - 3600 if tenths >= 1800 else tenths
+
+
+def parse_address(address: str, default_port: int = TELEMETRY_PORT) -> Tuple[str, int]:
+    """
+    :param address: host or host:port
+    :return: host and port
+    """
+    host, _, port = address.partition(':')
+    return host, int(port) if port else default_port
+
+
+class TelemetrySender(threading.Thread):
+    """
+    Publishes one robot's state from its own thread at the telemetry rate. The control loop never
+    waits on it: the pose is read from the robot object the SDK keeps up to date, and sending is a
+    single non-blocking sendto of a buffer that is packed in place.
+    """
+
+    def __init__(self, robot: cozmo.robot.Robot, team: int, number: int,
+                 to_field: Callable[[float, float, float], Tuple[float, float, float]], address: Tuple[str, int],
+                 rate_hz: float = TELEMETRY_RATE_HZ, room: int = DEFAULT_ROOM):
+        """
+        :param robot: robot whose state is published
+        :param team: team the robot plays for
+        :param number: number of the robot within its team
+        :param to_field: turns an SDK pose into a field pose, usually PoseStreamer.to_field
+        :param address: host and port of the receiver
+        :param rate_hz: datagrams sent per second
+        :param room: match id the robot plays in on the hub
+        """
+        super().__init__(daemon=True)
+        self.robot = robot
+        self.room = room
+        self.team = team
+        self.number = number
+        self.to_field = to_field
+        self.address = address
+        self.scheduler = FixedRateScheduler(rate_hz)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.buffer = bytearray(PACKET.size)
+        self.sequence: int = 0
+        self.sent: int = 0
+        self.dropped: int = 0
+        # object id of the carried cube -> its cube id, looked up once per cube
+        self._cube_ids: Dict[int, int] = {}
+        self._running = True
+
+    def run(self):
+        try:
+            self.scheduler.run(self.send, lambda: not self._running)
+        finally:
+            self.socket.close()
+
+    def send(self):
+        """ Send the robot's current state as the next datagram """
+        robot = self.robot
+        pose = robot.pose
+        x, y, heading = self.to_field(pose.position.x, pose.position.y, pose.rotation.angle_z.radians)
+        self.sequence = (self.sequence + 1) & SEQUENCE_MASK
+        PACKET.pack_into(self.buffer, 0, MAGIC, self.sequence, self.room, self.team, self.number, int(x), int(y),
+                         tenths_of_degree(heading), int(robot.lift_ratio * 100), self._carried_cube_id())
+        try:
+            self.socket.sendto(self.buffer, self.address)
+            self.sent += 1
+        except OSError:
+            # a full send buffer or an unreachable receiver only costs this datagram
+            self.dropped += 1
+
+    def _carried_cube_id(self) -> int:
+        object_id = self.robot.carrying_object_id
+        if object_id == -1:
+            return 0
+        cube_id = self._cube_ids.get(object_id)
+        if cube_id is None:
+            cube_id = next((cube.cube_id for cube in self.robot.world.light_cubes.values()
+                            if cube.object_id == object_id), 0)
+            self._cube_ids[object_id] = cube_id
+        return cube_id
+
+    def stop(self):
+        """ Stop publishing, the thread exits after at most one period """
+        self._running = False
+
+
+class TelemetryReceiver(threading.Thread):
+    """
+    Receives telemetry datagrams and keeps the newest state of every robot. Robots get a slot the
+    first time they are heard from; the arrays are indexed by slot and written only by the
+    receiving thread, readers take a snapshot with state() or states().
+    """
+
+    def __init__(self, address: Tuple[str, int] = ('', TELEMETRY_PORT), capacity: int = 64,
+                 clock: Callable[[], float] = time.monotonic, room: int = DEFAULT_ROOM):
+        """
+        :param address: host and port to listen on, None to only decode datagrams passed to feed()
+        :param capacity: most robots tracked, datagrams from further robots are dropped
+        :param clock: monotonic clock the receive times are taken from
+        :param room: match id of the robots to track, datagrams from other matches are dropped
+        """
+        super().__init__(daemon=True)
+        self.room = room
+        self.clock = clock
+        self.capacity = capacity
+        self.socket: Optional[socket.socket] = None
+        if address is not None:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind(address)
+            self.socket.setblocking(False)
+        self.buffer = bytearray(PACKET.size + 1)
+        self.view = memoryview(self.buffer)
+        self.slots: Dict[Tuple[int, int], int] = {}
+        self.keys: List[Tuple[int, int]] = []
+        self.sequence = array('L', bytes(array('L').itemsize * capacity))
+        self.x = array('h', bytes(2 * capacity))
+        self.y = array('h', bytes(2 * capacity))
+        self.heading = array('h', bytes(2 * capacity))
+        self.lift = array('B', bytes(capacity))
+        self.carrying = array('B', bytes(capacity))
+        self.received_at = array('d', bytes(8 * capacity))
+        self.received: int = 0
+        self.stale: int = 0
+        self.rejected: int = 0
+        self.other_room: int = 0
+        self._running = True
+
+    @property
+    def port(self) -> int:
+        return self.socket.getsockname()[1]
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.socket, selectors.EVENT_READ)
+        try:
+            while self._running:
+                # the timeout only bounds how long stop() takes to be noticed
+                if selector.select(timeout=0.25):
+                    self.poll()
+        finally:
+            selector.close()
+
+    def poll(self) -> int:
+        """
+        Decode every datagram waiting on the socket without blocking.
+
+        :return: datagrams that updated a robot's state
+        """
+        updated = 0
+        while True:
+            try:
+                size = self.socket.recv_into(self.buffer)
+            except OSError:
+                # nothing left waiting, or the socket was closed
+                return updated
+            updated += self._decode(size)
+
+    def feed(self, datagram: bytes) -> bool:
+        """
+        Decode a datagram that was received elsewhere.
+
+        :return: whether it updated a robot's state
+        """
+        size = len(datagram)
+        self.view[:min(size, len(self.buffer))] = datagram[:len(self.buffer)]
+        return bool(self._decode(size))
+
+    def _decode(self, size: int) -> int:
+        if size != PACKET.size or self.buffer[0] != MAGIC:
+            self.rejected += 1
+            return 0
+        magic, sequence, room, team, robot, x, y, heading, lift, carrying = PACKET.unpack_from(self.buffer)
+        if room != self.room:
+            self.other_room += 1
+            return 0
+        slot = self.slots.get((team, robot))
+        if slot is None:
+            if len(self.keys) == self.capacity:
+                self.rejected += 1
+                return 0
+            slot = self.slots[(team, robot)] = len(self.keys)
+            self.keys.append((team, robot))
+        elif not 0 < (sequence - self.sequence[slot]) & SEQUENCE_MASK < SEQUENCE_HALF:
+            # duplicated, late or reordered, a newer state is already known
+            self.stale += 1
+            return 0
+        self.sequence[slot] = sequence
+        self.x[slot] = x
+        self.y[slot] = y
+        self.heading[slot] = heading
+        self.lift[slot] = lift
+        self.carrying[slot] = carrying
+        self.received_at[slot] = self.clock()
+        self.received += 1
+        return 1
+
+    def state(self, team: int, robot: int) -> Optional[RobotTelemetry]:
+        """
+        :return: the newest state of a robot, None if it has not been heard from
+        """
+        slot = self.slots.get((team, robot))
+        if slot is None:
+            return None
+        return RobotTelemetry(team, robot, self.x[slot], self.y[slot], self.heading[slot], self.lift[slot],
+                              self.carrying[slot], self.sequence[slot], self.received_at[slot])
+
+    def states(self) -> List[RobotTelemetry]:
+        """
+        :return: the newest state of every robot heard from, by team and robot number
+        """
+        return [self.state(team, robot) for team, robot in sorted(self.keys)]
+
+    def stop(self):
+        """ Stop receiving, the thread exits within a quarter of a second """
+        self._running = False
+
+    def close(self):
+        self.stop()
+        if self.socket is not None:
+            self.socket.close()
@@ -0,0 +1,140 @@
+"""Latency tracing for the stages of a control tick
+
+Each stage keeps the durations of its most recent samples in a preallocated ring buffer of
+perf_counter_ns deltas, so tracing never allocates on the hot path. Instrumented code brackets a
+stage with now() and record():
+
+    start = tracer.now()
+    state = joystick.get_state()
+    tracer.record(READ, start)
+
+While the tracer is disabled now() returns 0 without reading the clock and record() returns at
+once, so the instrumentation can stay in the hot path and be turned on at runtime by setting
+enabled, or on POSIX by sending SIGUSR1 to a process that called toggle_on_signal.
+"""
+import signal
+import threading
+import time
+from array import array
+from typing import Callable, List, Sequence
+
+# stages of the player's control tick
+READ = 0  # controller get_state
+MAP = 1  # stick to wheel speed mapping
+NETWORK = 2  # receiving, decoding and dispatching messages on the listener thread
+COMMAND = 3  # drive_wheels through the command shaper to the SDK
+TICK = 4  # the whole tick, from reading the controller to the last command
+STAGES = ('controller read', 'stick mapping', 'network receive', 'drive_wheels', 'whole tick')
+
+
+class LatencyTracer:
+    """
+    Ring buffers of stage durations. Every stage must be recorded from a single thread, but
+    different stages may be recorded from different threads.
+    """
+
+    def __init__(self, stages: Sequence[str] = STAGES, capacity: int = 4096,
+                 clock: Callable[[], int] = time.perf_counter_ns, enabled: bool = False):
+        """
+        :param stages: stage names, recorded by their index
+        :param capacity: samples kept per stage, rounded up to a power of two
+        :param clock: nanosecond clock
+        :param enabled: start tracing straight away
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.stages = stages
+        self.clock = clock
+        self.enabled = enabled
+        self._mask = size - 1
+        self._rings: List[array] = [array('q', bytes(8 * size)) for _ in stages]
+        self._counts: List[int] = [0] * len(stages)
+
+    def now(self) -> int:
+        """
+        :return: the clock in nanoseconds, or 0 when tracing is disabled
+        """
+        return self.clock() if self.enabled else 0
+
+    def record(self, stage: int, start: int) -> int:
+        """
+        Record the time since start for a stage.
+
+        :param stage: index of the stage
+        :param start: value returned by now() when the stage began, nothing is recorded if it is 0
+        :return: the clock in nanoseconds, or 0 when nothing was recorded
+        """
+        if not start:
+            return 0
+        now = self.clock()
+        count = self._counts[stage]
+        self._rings[stage][count & self._mask] = now - start
+        self._counts[stage] = count + 1
+        return now
+
+    def toggle(self) -> bool:
+        """
+        :return: whether tracing is now enabled
+        """
+        self.enabled = not self.enabled
+        return self.enabled
+
+    @property
+    def recorded(self) -> bool:
+        """ whether any stage has samples """
+        return any(self._counts)
+
+    def reset(self):
+        """ Forget every recorded sample """
+        for stage in range(len(self.stages)):
+            self._counts[stage] = 0
+
+    def samples(self, stage: int) -> List[int]:
+        """
+        :param stage: index of the stage
+        :return: the retained durations of the stage in nanoseconds, in ring buffer order
+        """
+        return self._rings[stage][:min(self._counts[stage], self._mask + 1)].tolist()
+
+    def report(self) -> str:
+        """
+        :return: p50, p99 and max of every stage that has samples
+        """
+        lines = []
+        for stage, name in enumerate(self.stages):
+            samples = sorted(self.samples(stage))
+            if not samples:
+                continue
+            lines.append('%-16s p50 %8.1f us  p99 %8.1f us  max %8.1f us  (%d samples)' % (
+                name, samples[len(samples) // 2] / 1e3, samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e3,
+                samples[-1] / 1e3, self._counts[stage]))
+        return '\n'.join(lines) if lines else 'no latency samples'
+
+
+# default for code paths that are not traced, never enabled
+NO_TRACE = LatencyTracer(capacity=1)
+
+
+def toggle_on_signal(tracers: Sequence[LatencyTracer]) -> bool:
+    """
+    Toggle tracing whenever the process receives SIGUSR1 (kill -USR1 <pid>), printing the latencies
+    recorded so far each time tracing is turned off.
+
+    :param tracers: tracers toggled together
+    :return: whether the handler was installed, which needs POSIX and the main thread
+    """
+    if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def on_signal(signum, frame):
+        enabled = not tracers[0].enabled
+        for tracer in tracers:
+            tracer.enabled = enabled
+        print('Latency tracing %s' % ('on' if enabled else 'off'))
+        if not enabled:
+            for tracer in tracers:
+                print(tracer.report())
+
+    signal.signal(signal.SIGUSR1, on_signal)
+    return True
@@ -20,11 +20,15 @@ def cozmo_program(robot: cozmo.robot.Robot):
 
     # continous loop that checks for Xbox controller input until we are done with the program
     # Note: Xbox home button will be used to terminate
-    while not joy.Guide():
-        y = joy.leftY()  # get y-axis input from left stick before if statements
-        x = joy.rightX()  # get x-axis input from left stick before if statements
-        left_trigger = joy.leftTrigger()  # get scalar for the left trigger
-        right_trigger = joy.rightTrigger()  # get scalar for the right trigger and negate it
+    while True:
+        state = joy.snapshot()  # decode every input once per loop
+        if state.Guide:
+            break
+
+        y = joy.axisScale(state.leftY, 4000)  # get y-axis input from left stick before if statements
+        x = joy.axisScale(state.rightX, 4000)  # get x-axis input from left stick before if statements
+        left_trigger = state.leftTrigger / 255.0  # get scalar for the left trigger
+        right_trigger = state.rightTrigger / 255.0  # get scalar for the right trigger and negate it
 
         movement_speed = 150
         rotate_speed = 175
@@ -43,46 +47,46 @@ def cozmo_program(robot: cozmo.robot.Robot):
             # move the lift height down by some scalar
             robot.set_lift_height(1 - right_trigger).wait_for_completed()
 
-        elif joy.leftBumper():
+        elif state.leftBumper:
             # double the speed if the left bumper is pressed
             movement_speed = movement_speed * 2
 
-        elif joy.rightBumper():
+        elif state.rightBumper:
             # double the rotational speed if the right bumper is pressed
             rotate_speed = rotate_speed * 2
 
-        elif joy.A():
+        elif state.A:
             # woof
             robot.play_anim(name="anim_petdetection_dog_01").wait_for_completed()
 
-        elif joy.B():
+        elif state.B:
             # bark
             robot.play_anim(name="anim_petdetection_dog_02").wait_for_completed()
 
-        elif joy.X():
+        elif state.X:
             # dog 3
             robot.play_anim(name="anim_petdetection_dog_03").wait_for_completed()
 
-        elif joy.Y():
+        elif state.Y:
             # good boy
             robot.play_anim(name="anim_petdetection_dog_04").wait_for_completed()
 
-        elif joy.dpadUp():
+        elif state.dpadUp:
             robot.set_backpack_lights_off()
 
-        elif joy.dpadDown():
+        elif state.dpadDown:
             robot.set_all_backpack_lights(Colors.BLUE)
 
-        elif joy.dpadLeft():
+        elif state.dpadLeft:
             robot.set_all_backpack_lights(Colors.RED)
 
-        elif joy.dpadRight():
+        elif state.dpadRight:
             robot.set_all_backpack_lights(Colors.GREEN)
 
-        elif joy.Back():
+        elif state.Back:
             robot.say_text("Beep beep beep!")
 
-        elif joy.Start():
+        elif state.Start:
             robot.say_text("You're a legend!")
 
     joy.close()
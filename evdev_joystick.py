@@ -0,0 +1,232 @@
+"""
+Xbox 360 / Xbox One controller support on Linux through the kernel's evdev interface.
+
+Reads binary input_event structs straight from /dev/input/event* in bulk, without xboxdrv, and
+produces the same GamepadState snapshots as xinput.XInputJoystick so the control code does not
+care which platform it runs on.
+
+Example usage:
+
+    joysticks = EvdevJoystick.enumerate_devices()
+    state = joysticks[0].get_state()
+    print(state.l_thumb_x, state.buttons & GAMEPAD_A)
+"""
+
+import errno
+import fcntl
+import glob
+import os
+import struct
+from typing import Dict, List, Tuple
+
+from common.gamepad import (GamepadState, GAMEPAD_A, GAMEPAD_B, GAMEPAD_BACK, GAMEPAD_DPAD_DOWN, GAMEPAD_DPAD_LEFT,
+                            GAMEPAD_DPAD_RIGHT, GAMEPAD_DPAD_UP, GAMEPAD_LEFT_SHOULDER, GAMEPAD_LEFT_THUMB,
+                            GAMEPAD_RIGHT_SHOULDER, GAMEPAD_RIGHT_THUMB, GAMEPAD_START, GAMEPAD_X, GAMEPAD_Y)
+
+# struct input_event from linux/input.h: struct timeval, __u16 type, __u16 code, __s32 value
+INPUT_EVENT = struct.Struct('llHHi')
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0
+
+ABS_X = 0x00
+ABS_Y = 0x01
+ABS_Z = 0x02
+ABS_RX = 0x03
+ABS_RY = 0x04
+ABS_RZ = 0x05
+ABS_HAT0X = 0x10
+ABS_HAT0Y = 0x11
+
+# struct input_absinfo: value, minimum, maximum, fuzz, flat, resolution, read with EVIOCGABS(code)
+ABS_INFO = struct.Struct('6i')
+EVIOCGABS = 0x80000000 | ABS_INFO.size << 16 | ord('E') << 8 | 0x40
+
+# ranges of the Xbox 360 pad, used when the device cannot be asked for its own
+DEFAULT_RANGES = {
+    ABS_X: (-32768, 32767), ABS_Y: (-32768, 32767), ABS_RX: (-32768, 32767), ABS_RY: (-32768, 32767),
+    ABS_Z: (0, 255), ABS_RZ: (0, 255),
+}
+
+# index in GamepadState's axes of ABS_X to ABS_RZ
+AXIS_INDEX = (2, 3, 0, 4, 5, 1)
+
+# evdev key codes -> XInput button bits
+BUTTONS = {
+    0x130: GAMEPAD_A,  # BTN_A
+    0x131: GAMEPAD_B,  # BTN_B
+    0x133: GAMEPAD_X,  # BTN_X
+    0x134: GAMEPAD_Y,  # BTN_Y
+    0x136: GAMEPAD_LEFT_SHOULDER,  # BTN_TL
+    0x137: GAMEPAD_RIGHT_SHOULDER,  # BTN_TR
+    0x13a: GAMEPAD_BACK,  # BTN_SELECT
+    0x13b: GAMEPAD_START,  # BTN_START
+    0x13d: GAMEPAD_LEFT_THUMB,  # BTN_THUMBL
+    0x13e: GAMEPAD_RIGHT_THUMB,  # BTN_THUMBR
+    # wireless pads report the directional pad as buttons instead of a hat
+    0x2c0: GAMEPAD_DPAD_LEFT,  # BTN_TRIGGER_HAPPY1
+    0x2c1: GAMEPAD_DPAD_RIGHT,  # BTN_TRIGGER_HAPPY2
+    0x2c2: GAMEPAD_DPAD_UP,  # BTN_TRIGGER_HAPPY3
+    0x2c3: GAMEPAD_DPAD_DOWN,  # BTN_TRIGGER_HAPPY4
+}
+
+# names the xpad driver gives supported controllers
+CONTROLLER_NAMES = ('x-box', 'xbox')
+
+# events read per system call
+READ_EVENTS = 64
+
+
+def read_ranges(fd: int) -> Dict[int, Tuple[int, int]]:
+    """
+    :param fd: open event device
+    :return: axis code -> minimum and maximum the device reports, the defaults for axes it cannot be asked about
+    """
+    ranges = dict(DEFAULT_RANGES)
+    buffer = bytearray(ABS_INFO.size)
+    for code in DEFAULT_RANGES:
+        try:
+            fcntl.ioctl(fd, EVIOCGABS + code, buffer)
+        except OSError:
+            # a pipe or file of canned events
+            continue
+        minimum, maximum = ABS_INFO.unpack(buffer)[1:3]
+        if maximum > minimum:
+            ranges[code] = (minimum, maximum)
+    return ranges
+
+
+def scales(ranges: Dict[int, Tuple[int, int]]) -> List[Tuple[float, float, int, int]]:
+    """
+    Precompute how to map raw ABS_X to ABS_RZ values onto XInput's ranges: sticks to int16 growing
+    upwards, evdev sticks grow downwards, and triggers to 0..255, whatever range the pad reports.
+
+    :param ranges: axis code -> minimum and maximum reported by the device
+    :return: center, gain, lowest and highest output of every axis code from ABS_X to ABS_RZ
+    """
+    result = []
+    for code in range(ABS_RZ + 1):
+        minimum, maximum = ranges[code]
+        if code in (ABS_Z, ABS_RZ):
+            result.append((minimum, 255 / (maximum - minimum), 0, 255))
+        else:
+            half = (maximum - minimum) / 2
+            gain = 32767 / half if code in (ABS_X, ABS_RX) else -32767 / half
+            result.append((minimum + half, gain, -32768, 32767))
+    return result
+
+
+class EvdevJoystick:
+    """
+    EvdevJoystick
+    Example:
+    controller_one = EvdevJoystick('/dev/input/event5')
+    """
+
+    def __init__(self, path: str, device_number: int = 0, fd: int = None, ranges: Dict[int, Tuple[int, int]] = None):
+        """
+        :param path: event device to read
+        :param device_number: index of the controller, for parity with XInputJoystick
+        :param fd: already open file descriptor to read events from instead of opening path
+        :param ranges: axis code -> minimum and maximum of the raw values, asked from the device if not given
+        """
+        self.path = path
+        self.device_number = device_number
+        self.fd = fd if fd is not None else os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        # Xbox One pads report triggers as 0..1023 and some third party pads sticks as 0..65535
+        self._scales = scales(ranges if ranges is not None else read_ranges(self.fd))
+        self._buffer = bytearray(INPUT_EVENT.size * READ_EVENTS)
+        self._view = memoryview(self._buffer)
+        self._pending = 0  # bytes of a partial event left over from the last read
+
+        # state accumulated from events, published as a snapshot on every SYN_REPORT
+        self._buttons = 0
+        self._axes = [0] * 6  # left_trigger, right_trigger, l_thumb_x, l_thumb_y, r_thumb_x, r_thumb_y
+        self._packet_number = 0
+        self._last_state = GamepadState()
+        self._connected = True
+
+    def get_state(self):
+        """
+        Apply every event waiting on the device and return the latest state,
+        or None once the controller has been unplugged.
+        """
+        if not self._connected:
+            return None
+        view = self._view
+        size = INPUT_EVENT.size
+        while True:
+            try:
+                received = os.readv(self.fd, [view[self._pending:]])
+            except BlockingIOError:
+                break
+            except OSError as error:
+                if error.errno != errno.ENODEV:
+                    raise
+                received = 0
+            if not received:
+                # end of a canned stream or the device went away
+                if self.path is not None:
+                    self._connected = False
+                    return None
+                break
+            available = self._pending + received
+            complete = available - available % size
+            for event in INPUT_EVENT.iter_unpack(view[:complete]):
+                self._apply(event[2], event[3], event[4])
+            self._pending = available - complete
+            if self._pending:
+                view[:self._pending] = view[complete:available]
+            if available < len(self._buffer):
+                break
+        return self._last_state
+
+    def _apply(self, event_type: int, code: int, value: int):
+        if event_type == EV_ABS:
+            if code <= ABS_RZ:
+                center, gain, lowest, highest = self._scales[code]
+                scaled = int((value - center) * gain)
+                self._axes[AXIS_INDEX[code]] = lowest if scaled < lowest else highest if scaled > highest else scaled
+            elif code == ABS_HAT0X:
+                self._buttons &= ~(GAMEPAD_DPAD_LEFT | GAMEPAD_DPAD_RIGHT)
+                self._buttons |= GAMEPAD_DPAD_LEFT if value < 0 else GAMEPAD_DPAD_RIGHT if value > 0 else 0
+            elif code == ABS_HAT0Y:
+                self._buttons &= ~(GAMEPAD_DPAD_UP | GAMEPAD_DPAD_DOWN)
+                self._buttons |= GAMEPAD_DPAD_UP if value < 0 else GAMEPAD_DPAD_DOWN if value > 0 else 0
+        elif event_type == EV_KEY:
+            bit = BUTTONS.get(code)
+            if bit is not None:
+                self._buttons = self._buttons | bit if value else self._buttons & ~bit
+        elif event_type == EV_SYN and code == SYN_REPORT:
+            self._packet_number += 1
+            self._last_state = GamepadState(self._packet_number, self._buttons, *self._axes)
+
+    def is_connected(self):
+        return self._connected
+
+    def set_vibration(self, left_motor, right_motor):
+        """Force feedback is not supported through this backend"""
+        pass
+
+    def close(self):
+        os.close(self.fd)
+
+    @staticmethod
+    def enumerate_devices() -> List['EvdevJoystick']:
+        """Returns the Xbox controllers that are connected and readable"""
+        devices = []
+        for path in sorted(glob.glob('/dev/input/event*'), key=lambda path: int(path[len('/dev/input/event'):])):
+            try:
+                with open('/sys/class/input/%s/device/name' % os.path.basename(path)) as name_file:
+                    name = name_file.read().strip().lower()
+            except OSError:
+                continue
+            if not any(controller in name for controller in CONTROLLER_NAMES):
+                continue
+            try:
+                devices.append(EvdevJoystick(path, len(devices)))
+            except OSError:
+                print('Cannot read %s, add yourself to the input group or run as sudo' % path)
+        return devices
@@ -1,20 +1,147 @@
 """Capture the Flag game mode for cozmo
 Authors: Matthew Dargan, Daniel Stutz
 """
-import concurrent.futures
+from __future__ import annotations
+
+import argparse
+import functools
+import queue
 import socket
-from typing import Dict
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple
+
+from common.barrier import COORDINATOR_TEAM, DEFAULT_COUNTDOWN, JUDGE, ROUND_COUNTDOWN, StartBarrier
+from common.message_forwarder import MessageListener, start_connection, send_message
+from common.protocol import (DEFAULT_ROOM, CaptureClaimMessage, CubeCapturedMessage, CubePoseMessage, ExitMessage,
+                             ScoreMessage)
+from common.spatial import CaptureIndex
+
+# the cozmo SDK is only imported once a game is judged, so the command line loads without it
+if TYPE_CHECKING:
+    import cozmo
+    from cozmo.objects import LightCube
+
+# seconds to wait for the capture message of a claimed cube before the cube may be claimed again
+CLAIM_TIMEOUT = 1.0
+
+
+class CubeObserved(NamedTuple):
+    """ Queued by the SDK's object observed handler next to network messages, never sent over the network """
+    cube: LightCube
+
+
+def watch_cubes(world: cozmo.world.World, messages: queue.Queue) -> cozmo.event.Handler:
+    """
+    Push every light cube the robot sees onto the message queue. The handler runs on the SDK's event
+    loop for each camera frame, so several cubes seen in the same frame are all queued.
+
+    :param world: world of the judge robot
+    :param messages: queue the judge reads network messages from
+    :return: the event handler, disable it to stop watching
+    """
+    from cozmo.objects import EvtObjectObserved, LightCube
+
+    def on_object_observed(evt, obj=None, **kwargs):
+        if isinstance(obj, LightCube):
+            messages.put(CubeObserved(obj))
+
+    return world.add_event_handler(EvtObjectObserved, on_object_observed)
+
 
-from common.message_forwarder import start_connection, receive_message
-from common.setup import *
+class Scorekeeper:
+    """
+    Claims the cubes shown to the judge and reacts to network messages, one queued message at a time.
+    The game state service on the hub decides which claims count and who wins, a cube is only scored
+    once the service's capture message for it arrives. A claim that gets no answer, because it was
+    lost or reached the hub before the game started, is sent again the next time the cube is seen.
+    """
+
+    def __init__(self, connection: socket.socket, team_id: int, team_color: cozmo.lights.Light,
+                 cubes: List[LightCube], captures: CaptureIndex = None, clock: Callable[[], float] = time.monotonic):
+        """
+        :param connection: network connection claims are sent over
+        :param team_id: id of the team the judge is on
+        :param team_color: color a captured cube is switched to
+        :param cubes: opponent cubes still in play
+        :param captures: index of the poses streamed by the players, cubes are also claimed when a
+                         pose puts them inside this team's base
+        :param clock: monotonic clock returning seconds, claims time out by it
+        """
+        self.connection = connection
+        self.team_id = team_id
+        self.team_color = team_color
+        self.cubes: List[LightCube] = cubes
+        self.captures = captures
+        self.clock = clock
+        # cube id -> when it was last claimed
+        self.claimed: Dict[int, float] = {}
+        self.score: int = 0
+        self.winner: int = 0
+
+    @property
+    def game_over(self) -> bool:
+        return self.winner != 0
+
+    def handle(self, message: tuple):
+        """
+        :param message: CubeObserved or any message defined in common.protocol
+        """
+        if isinstance(message, CubeObserved):
+            # claim the cube if it is valid and in-play
+            if message.cube in self.cubes:
+                self.claim(message.cube)
+        elif isinstance(message, CubeCapturedMessage) and message.team == self.team_id:
+            cube = next((cube for cube in self.cubes if cube.cube_id == message.cube_id), None)
+            self.claimed.pop(message.cube_id, None)
+            if cube is not None:
+                cube.set_lights(self.team_color)
+                self.cubes.remove(cube)
+        elif isinstance(message, ScoreMessage) and message.team == self.team_id:
+            self.score = message.score
+        elif isinstance(message, ExitMessage):
+            self.winner = message.team
+        elif isinstance(message, CubePoseMessage) and self.captures is not None:
+            if self.captures.update_cube(message.team, message.cube_id, message.x, message.y) \
+                    and message.team == self.team_id:
+                cube = next((cube for cube in self.cubes if cube.cube_id == message.cube_id), None)
+                if cube is not None:
+                    self.claim(cube)
+
+    def claim(self, cube: LightCube):
+        """
+        Ask the game state service to capture a cube, again only once the last claim has timed out.
+
+        :param cube: cube in play that was brought to this team's base
+        """
+        now = self.clock()
+        last = self.claimed.get(cube.cube_id)
+        if last is not None and now - last < CLAIM_TIMEOUT:
+            return
+        self.claimed[cube.cube_id] = now
+        # send_message stamps the claim with the synchronized time
+        send_message(self.connection, CaptureClaimMessage(self.team_id, cube.cube_id))
 
+    def run(self, messages: queue.Queue):
+        """
+        Handle queued messages until a team wins. Waits on the queue without a timeout, so both
+        captures and network messages are handled as soon as they arrive.
 
-def cozmo_program(robot: cozmo.robot.Robot):
+        :param messages: queue shared by the network listener and the cube observer
+        """
+        while not self.game_over:
+            self.handle(messages.get())
+
+
+def cozmo_program(robot: cozmo.robot.Robot, session: bool = False, room: int = DEFAULT_ROOM):
     """
     Main entry point for running the scoring logic in the capture the flag game.
 
     :param robot: judge robot in the game
+    :param session: keep judging game after game on the same connections until Ctrl-C is pressed
+    :param room: match id to join on the hub
     """
+    import cozmo
+    from common.setup import get_team_colors, setup
 
     # get number of teams playing in the game
     while True:
@@ -48,6 +175,22 @@ def cozmo_program(robot: cozmo.robot.Robot):
         else:
             break
 
+    # the judge of the coordinating team starts the game once every other computer is ready
+    expected: int = 0
+    if team_id == COORDINATOR_TEAM:
+        while True:
+            try:
+                players: int = int(input("How many player computers are playing?"))
+            except ValueError:
+                print("Invalid input type")
+                continue
+            if players < 1:
+                print("Must be at least 1")
+                continue
+            else:
+                break
+        expected = teams - 1 + players
+
     # get the corresponding team colors and opponent colors
     team_colors, opponent_colors = get_team_colors(teams)
 
@@ -56,44 +199,58 @@ def cozmo_program(robot: cozmo.robot.Robot):
     robot.set_head_angle(cozmo.util.Angle(degrees=20))
 
     # establish connection to the network and message retrieval
-    connection: socket.socket = start_connection("10.0.1.10", 5000)
-    message: List[str] = []
+    connection: socket.socket = start_connection("10.0.1.10", 5000, room)
+    listener: MessageListener = MessageListener(connection)
+    listener.start()
 
-    # setup the game
-    robot_cubes: List[LightCube] = setup(robot, opponent_colors[team_id])
+    # the answers, the robot and the connections are kept for every game of a session
+    wins: Dict[int, int] = {}
+    countdown: float = DEFAULT_COUNTDOWN
+    try:
+        while True:
+            # setup the game, lighting the cubes again
+            barrier = StartBarrier(connection, listener, team_id, JUDGE, expected, countdown)
+            robot_cubes: List[LightCube] = setup(robot, opponent_colors[team_id], barrier)
 
-    # set default score
-    robot_score: int = 0
+            # score cubes as soon as the robot sees them or a player's poses put them in the base,
+            # network messages arrive on the same queue
+            scorekeeper = Scorekeeper(connection, team_id, team_colors[team_id], robot_cubes,
+                                      captures=CaptureIndex(teams))
+            handler = watch_cubes(robot.world, listener.messages)
+            scorekeeper.run(listener.messages)
+            handler.disable()
 
-    # continuously check the cube object held up to the judge and increment the score accordingly
-    while 'Exit' not in message:
-        captured_cube = None
+            # print the win state based on scoring the maximum number of points or receiving the exit message
+            if scorekeeper.winner == team_id:
+                print('You won!')
+            else:
+                print('Robot %s won!' % scorekeeper.winner)
+            wins[scorekeeper.winner] = wins.get(scorekeeper.winner, 0) + 1
 
-        # wait for one the cubes to be shown to the judge
-        try:
-            captured_cube = robot.world.wait_for_observed_light_cube(timeout=0.5)
-        except concurrent.futures._base.TimeoutError:
-            pass
-
-        # increment score and change cube color if the cube was valid and in-play
-        if captured_cube in robot_cubes:
-            captured_cube.set_lights(team_colors[team_id])
-            robot_cubes.remove(captured_cube)
-            robot_score += 1
-
-        # break out of the loop if the maximum score has been reached, cube wait doesn't let the loop terminate
-        if robot_score == 3:
-            break
+            if not session:
+                break
+            print('Games won: %s' % ', '.join('team %d: %d' % (team, won) for team, won in sorted(wins.items())))
+            listener.new_round()
+            countdown = ROUND_COUNTDOWN
+    except KeyboardInterrupt:
+        print('Session ended')
+    finally:
+        listener.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Judge capture the flag for one team.')
+    parser.add_argument('--session', action='store_true',
+                        help='stay connected and judge game after game until Ctrl-C is pressed')
+    parser.add_argument('--room', type=int, default=DEFAULT_ROOM,
+                        help='match id, when the hub hosts several matches (default: %(default)s)')
+    args = parser.parse_args()
 
-        message = receive_message(connection)
+    import cozmo
 
-    # print the win state and terminate based on scoring the maximum number of points or receiving the exit message
-    if robot_score == 3:
-        connection.send(b'Exit %d' % team_id)
-        print('You won!')
-    else:
-        print('Robot %s won!' % message[1])
+    cozmo.run_program(functools.partial(cozmo_program, session=args.session, room=args.room), use_viewer=False,
+                      force_viewer_on_top=False)
 
 
 if __name__ == '__main__':
-    cozmo.run_program(cozmo_program, use_viewer=False, force_viewer_on_top=False)
+    main()
@@ -1,13 +1,30 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import os
 import socket
-from math import *
-from typing import List
+import sys
+from typing import TYPE_CHECKING, List, Tuple
+
+from common.barrier import PLAYER, StartBarrier
+from common.controllers import BACKENDS, default_backend, enumerate_controllers
+from common.gamepad import (GamepadState, GAMEPAD_A, GAMEPAD_B, GAMEPAD_DPAD_DOWN, GAMEPAD_DPAD_LEFT,
+                            GAMEPAD_DPAD_RIGHT, GAMEPAD_DPAD_UP, GAMEPAD_Y)
+from common.message_forwarder import MessageListener, start_connection
+from common.protocol import DEFAULT_ROOM
+from common.tracing import COMMAND, MAP, NO_TRACE, LatencyTracer, toggle_on_signal
 
-import cozmo
-from cozmo.util import distance_mm
+# the cozmo SDK and everything built on it are only imported once a game is played, so the command
+# line and the control logic load without it
+if TYPE_CHECKING:
+    import cozmo
+    from common.drive import StickDrive
+    from common.pickup import AutoPickup
+    from common.seats import Seat
 
-from common.message_forwarder import start_connection, receive_message
-from common.setup import get_team_colors
-from xinput import *
+# number of times per second the controller is read and commands are sent to the robot
+CONTROL_RATE_HZ = 60
 
 directional_pad_speeds = {
     # up, down, left, right
@@ -23,98 +40,53 @@ directional_pad_speeds = {
 }
 
 
-def normalize_stick(x, y):
-    """
-    Normalize input values for left and right sticks
-    :param x: x value generated by the controller
-    :param y: y value generated by the controller
-    :return: a tuple containing (normalized x, normalized_y, magnitude)
-    """
-    # print("x = {0}, y = {1}".format(x, y))
-    # determine how far the controller is pushed
-    magnitude = sqrt(x * x + y * y) + 0.01  # 0.01 to avoid division by zero when x = y = 0
-    # determine the direction the controller is pushed
-    normalized_x, normalized_y = x / magnitude, y / magnitude
-    # check if the controller is outside a circular dead zone
-    if magnitude > GAMEPAD_LEFT_THUMB_DEADZONE:
-        magnitude = min([magnitude, GAMEPAD_THUMB_MAX])
-        magnitude -= GAMEPAD_LEFT_THUMB_DEADZONE
-    else:
-        normalized_x, normalized_y, magnitude = 0.0, 0.0, 0.0
-
-    return normalized_x, normalized_y, magnitude
+def check_controller_state(robot: cozmo.robot.Robot, state: GamepadState, pickup: AutoPickup,
+                           stick_drive: StickDrive, tracer: LatencyTracer = NO_TRACE):
+    # left stick
+    start = tracer.now()
+    stick_left, stick_right = stick_drive.wheels(state.l_thumb_x, state.l_thumb_y)
+    tracer.record(MAP, start)
 
+    # auto pickup keeps running in the background until it finishes or the player takes over
+    if pickup.active:
+        if stick_left or stick_right or state.left_trigger or state.right_trigger or state.buttons & ~GAMEPAD_Y:
+            pickup.cancel()
+        else:
+            pickup.update()
+            return
 
-def check_controller_state(robot: cozmo.robot.Robot, state):
     # face buttons
     # lift
 
-    if state['buttons'] == GAMEPAD_B:
+    if state.buttons == GAMEPAD_B:
         robot.move_lift(0.3)
-    elif state['buttons'] == GAMEPAD_A:
+    elif state.buttons == GAMEPAD_A:
         robot.move_lift(-0.3)
     else:
         robot.move_lift(0)
     # head
-    if state['buttons'] == GAMEPAD_Y:
-        cube = robot.world.wait_for_observed_light_cube(timeout=30)
-        if cube:
-            robot.go_to_object(cube, distance_mm(200.0)).wait_for_completed()
-
-            robot.pickup_object(cube, num_retries=0).wait_for_completed()
-
-    # left stick
-    left_x, left_y, left_magnitude = normalize_stick(state['l_thumb_x'], state['l_thumb_y'])
-    # print("left :{0}, {1}, {2}".format(left_x, left_y, left_magnitude))
+    if state.buttons == GAMEPAD_Y:
+        pickup.start()
+        return
 
     # directional pad buttons
 
-    if state['left_trigger'] > 0 or state['right_trigger'] > 0:
-        robot.drive_wheels(state['left_trigger'], state['right_trigger'])
+    if state.left_trigger > 0 or state.right_trigger > 0:
+        (left_speed, right_speed) = (state.left_trigger, state.right_trigger)
     else:
-        (left_speed, right_speed) = directional_pad_speeds.get(state['buttons'] & 0xFF, (0, 0))
+        (left_speed, right_speed) = directional_pad_speeds.get(state.buttons & 0xFF, (0, 0))
         if left_speed == 0.0 and right_speed == 0.0:
-            if left_magnitude != 0.0:
-                # up
-                if left_y >= 0.75 and abs(left_x) < 0.25:
-                    robot.drive_wheels(100, 100)
-                # down
-                elif left_y <= -0.75 and abs(left_x) < 0.25:
-                    robot.drive_wheels(-100, -100)
-                # left
-                elif abs(left_y) < 0.25 and left_x <= -0.75:
-                    robot.drive_wheels(-100, 100)
-                # right
-                elif abs(left_y) < 0.25 and left_x >= 0.75:
-                    robot.drive_wheels(100, -100)
-                # up + left
-                elif left_y >= 0.50 and left_x <= -0.50:
-                    robot.drive_wheels(50, 100)
-                # up + right
-                elif left_y >= 0.50 and left_x >= 0.50:
-                    robot.drive_wheels(100, 50)
-                # down + left
-                elif left_y <= -0.50 and left_x <= -0.50:
-                    robot.drive_wheels(-50, -100)
-                # down + right
-                elif left_y <= -0.50 and left_x >= 0.50:
-                    robot.drive_wheels(-100, -50)
-                else:
-                    pass
-            else:
-                robot.drive_wheels(0, 0)
-        else:
-            robot.drive_wheels(left_speed, right_speed)
+            (left_speed, right_speed) = (stick_left, stick_right)
 
+    start = tracer.now()
+    robot.drive_wheels(left_speed, right_speed)
+    tracer.record(COMMAND, start)
 
-def cozmo_program(robot: cozmo.robot.Robot):
-    """
-    Main entry for running the player logic. This runs both the xbox controller
-    functionality and checks for the exit message over the network when a team wins.
 
-    :param robot: player robot in the game
+def ask_teams() -> int:
+    """
+    :return: number of teams playing in the game
     """
-    # get number of teams playing in the game
     while True:
         try:
             teams: int = int(input("How many teams are playing?"))
@@ -128,12 +100,17 @@ def cozmo_program(robot: cozmo.robot.Robot):
             print("Must be between 1 and 3")
             continue
         else:
-            break
+            return teams
 
-    # get the id of the team the judge is on
+
+def ask_team_id(question: str) -> int:
+    """
+    :param question: prompt shown to the player
+    :return: the id of the team a robot is on
+    """
     while True:
         try:
-            team_id: int = int(input("Which team is this player on?"))
+            team_id: int = int(input(question))
         except ValueError:
             print("Invalid input type")
             continue
@@ -144,42 +121,252 @@ def cozmo_program(robot: cozmo.robot.Robot):
             print("Must be between 1 and 3")
             continue
         else:
-            break
+            return team_id
+
+
+def play(robots: List[cozmo.robot.Robot], team_ids: List[int], teams: int, record: str = None,
+         trace: bool = False, controller: str = None, session: bool = False, telemetry: str = None,
+         room: int = DEFAULT_ROOM):
+    """
+    Drive every robot with its own controller until a team wins. In a session the robots,
+    controllers and network connection are kept for game after game until Ctrl-C is pressed.
+
+    :param robots: player robots controlled from this computer, paired with controllers in order
+    :param team_ids: the team each robot is on
+    :param teams: number of teams playing in the game
+    :param record: trace file to record each seat's controller input to, see common.input_trace
+    :param trace: start with latency tracing on, it can also be toggled with SIGUSR1
+    :param controller: controller backend, the platform's default if not given
+    :param session: keep playing games until interrupted
+    :param telemetry: host or host:port to publish the robots' state to for live scoreboards, off if not given
+    :param room: match id to join on the hub
+    """
+    import cozmo
+    from common.drive import StickDrive
+    from common.poses import PoseStreamer
+    from common.seats import Seat
+    from common.setup import get_team_colors
+    from common.spatial import base_pose
+    from common.telemetry import TelemetrySender, parse_address
 
     # get the corresponding team colors and opponent colors
     team_colors, opponent_colors = get_team_colors(teams)
 
-    # set backpack color
-    robot.set_all_backpack_lights(team_colors[team_id])
+    for robot, team_id in zip(robots, team_ids):
+        # set backpack color
+        robot.set_all_backpack_lights(team_colors[team_id])
+
+        # set head angle so Cozmo can identify cubes
+        robot.set_head_angle(cozmo.util.Angle(degrees=0))
 
-    # set head angle so Cozmo can identify cubes
-    robot.set_head_angle(cozmo.util.Angle(degrees=0))
     # establish connection to the network and message retrieval
-    connection: socket.socket = start_connection("10.0.1.10", 5000)
-    message: List[str] = []
+    connection: socket.socket = start_connection("10.0.1.10", 5000, room)
+    network_tracer = LatencyTracer(enabled=trace)
+    listener: MessageListener = MessageListener(connection, tracer=network_tracer, queue_messages=False)
+    listener.start()
 
-    joysticks = XInputJoystick.enumerate_devices()
+    joysticks = enumerate_controllers(controller)
 
-    if joysticks:
+    if len(joysticks) >= len(robots):
         print("Number of connected controllers: {0}".format(len(joysticks)))
     else:
-        print("No controller is connected. Please connect xbox controller.")
+        print("{0} robots need {0} controllers but only {1} are connected. "
+              "Please connect xbox controller.".format(len(robots), len(joysticks)))
         sys.exit(0)
 
-    # use only the first controller
-    joystick = joysticks[0]
+    joysticks = joysticks[:len(robots)]
+    if record:
+        from common.input_trace import RecordingJoystick, TraceRecorder
+        joysticks = [RecordingJoystick(joystick, TraceRecorder(trace_path(record, number, len(joysticks))))
+                     for number, joystick in enumerate(joysticks, 1)]
+
+    # pair the robots with the first controllers, each seat runs its own control loop and streams its robot's pose
+    seats: List[Seat] = []
+    for robot, joystick, team_id in zip(robots, joysticks, team_ids):
+        number = sum(seat.poses.team == team_id for seat in seats) + 1
+        poses = PoseStreamer(connection, robot, team_id, number, base_pose(team_id, teams))
+        seats.append(Seat(robot, joystick, CONTROL_RATE_HZ, LatencyTracer(enabled=trace), poses))
+    toggle_on_signal([network_tracer] + [seat.tracer for seat in seats])
+    # the lookup table takes tens of milliseconds to build, it is shared by every seat and game
+    stick_drive = StickDrive()
+
+    # telemetry is published from threads of its own so it never delays a control tick
+    senders = []
+    if telemetry:
+        senders = [TelemetrySender(seat.robot, seat.poses.team, seat.poses.number, seat.poses.to_field,
+                                   parse_address(telemetry), room=room) for seat in seats]
+    for sender in senders:
+        sender.start()
+
+    try:
+        while True:
+            play_round(robots, team_ids, connection, listener, seats, stick_drive)
+            if not session:
+                break
+            # only the game state is reset, everything else is ready for the next game
+            listener.new_round()
+    except KeyboardInterrupt:
+        print('Session ended')
+    finally:
+        listener.stop()
+        if record:
+            for joystick in joysticks:
+                joystick.recorder.close()
+        for sender in senders:
+            sender.stop()
+    for number, seat in enumerate(seats, 1):
+        print('Seat %d: %s' % (number, seat.report()))
+    if network_tracer.recorded:
+        print('Network: %s' % network_tracer.report())
+    if listener.clock.synchronized:
+        print('Clock: %s' % listener.clock.report())
 
-    while 'Exit' not in message:
-        state = joystick.get_state()
-        check_controller_state(robot, state)
-        message = receive_message(connection)
+
+def play_round(robots: List[cozmo.robot.Robot], team_ids: List[int], connection: socket.socket,
+               listener: MessageListener, seats: List[Seat], stick_drive: StickDrive):
+    """
+    Wait for the coordinating judge to start a game and play it until a team wins.
+
+    :param robots: player robots controlled from this computer
+    :param team_ids: the team each robot is on
+    :param connection: network connection of this computer
+    :param listener: running listener of the connection, reset for this game
+    :param seats: the robots paired with their controllers
+    :param stick_drive: stick to wheel mapping shared by the seats
+    """
+    import cozmo
+    from common.seats import run_seats
+
+    print("Set Cozmo's in position to play.")
+    StartBarrier(connection, listener, team_ids[0], PLAYER).wait()
+    # the robots are at their bases now, which ties their poses to the field
+    for seat in seats:
+        seat.poses.calibrate()
+    print("Start playing!")
+    run_seats(seats, check_controller_state, stick_drive, listener.game_over.is_set)
+    for seat in seats:
+        seat.halt()
+    print('Final scores: %s' % listener.scores)
 
     # play the appropriate robot emotion based on who won the game
-    if int(message[1]) == team_id:
-        robot.play_anim_trigger(cozmo.anim.Triggers.CodeLabCelebrate).wait_for_completed()
-    else:
-        robot.play_anim_trigger(cozmo.anim.Triggers.CodeLabUnhappy).wait_for_completed()
+    animations = []
+    for robot, team_id in zip(robots, team_ids):
+        if listener.winner == team_id:
+            animations.append(robot.play_anim_trigger(cozmo.anim.Triggers.CodeLabCelebrate))
+        else:
+            animations.append(robot.play_anim_trigger(cozmo.anim.Triggers.CodeLabUnhappy))
+    for animation in animations:
+        animation.wait_for_completed()
+
+
+def trace_path(record: str, seat: int, seats: int) -> str:
+    """
+    :param record: trace file given on the command line
+    :param seat: seat number starting at 1
+    :param seats: number of seats playing
+    :return: the trace file of the seat, numbered before the extension when there are several seats
+    """
+    if seats == 1:
+        return record
+    root, extension = os.path.splitext(record)
+    return '%s.seat%d%s' % (root, seat, extension)
+
+
+def cozmo_program(robot: cozmo.robot.Robot, record: str = None, trace: bool = False, controller: str = None,
+                  session: bool = False, telemetry: str = None, room: int = DEFAULT_ROOM):
+    """
+    Main entry for running the player logic. This runs both the xbox controller
+    functionality and checks for the exit message over the network when a team wins.
+
+    :param robot: player robot in the game
+    :param record: trace file to record the controller input to
+    :param trace: start with latency tracing on
+    :param controller: controller backend, the platform's default if not given
+    :param session: keep playing games until interrupted
+    :param telemetry: host or host:port to publish the robot's state to
+    :param room: match id to join on the hub
+    """
+    teams: int = ask_teams()
+    team_id: int = ask_team_id("Which team is this player on?")
+    play([robot], [team_id], teams, record, trace, controller, session, telemetry, room)
+
+
+def multi_seat_program(robots: List[cozmo.robot.Robot], record: str = None, trace: bool = False,
+                       controller: str = None, session: bool = False, telemetry: str = None,
+                       room: int = DEFAULT_ROOM):
+    """
+    Main entry for running several robots, each with its own controller, from one computer.
+
+    :param robots: player robots in the game
+    :param record: trace file to record the controller input to, numbered per seat
+    :param trace: start with latency tracing on
+    :param controller: controller backend, the platform's default if not given
+    :param session: keep playing games until interrupted
+    :param telemetry: host or host:port to publish the robots' state to
+    :param room: match id to join on the hub
+    """
+    teams: int = ask_teams()
+    team_ids: List[int] = [ask_team_id("Which team is seat %d on?" % number) for number in range(1, len(robots) + 1)]
+    play(robots, team_ids, teams, record, trace, controller, session, telemetry, room)
+
+
+def connect_robot(connector: cozmo.run.DeviceConnector) -> Tuple[cozmo.robot.Robot, cozmo.run._LoopThread]:
+    """
+    Connect to one robot on its own SDK event loop thread, the way cozmo.run_program does for a
+    single robot, so every robot's SDK traffic is handled independently.
+
+    :param connector: device the robot's phone is attached to
+    :return: the robot and the loop thread to stop once the game is over
+    """
+    import asyncio
+    import concurrent.futures
+
+    import cozmo
+
+    abort_future = concurrent.futures.Future()
+    conn_factory = functools.partial(cozmo.conn.CozmoConnection, _sync_abort_future=abort_future)
+    loop_thread = cozmo.run._LoopThread(asyncio.new_event_loop(), conn_factory=conn_factory,
+                                        connector=connector, abort_future=abort_future)
+    coz_conn = loop_thread.start()
+    return cozmo.base._SyncProxy(coz_conn).wait_for_robot(), loop_thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play capture the flag with an Xbox controller.')
+    parser.add_argument('--serial', action='append', default=[],
+                        help='serial number of a phone to drive, repeat once per robot to play several seats')
+    parser.add_argument('--ios', action='store_true', help='the phones are iOS devices instead of Android')
+    parser.add_argument('--record', metavar='TRACE', help='record controller input to this trace file')
+    parser.add_argument('--trace', action='store_true',
+                        help='trace control tick latencies from the start, kill -USR1 toggles tracing')
+    parser.add_argument('--controller', choices=sorted(BACKENDS), default=default_backend(),
+                        help='controller backend (default: %(default)s)')
+    parser.add_argument('--session', action='store_true',
+                        help='stay connected and play game after game until Ctrl-C is pressed')
+    parser.add_argument('--telemetry', metavar='HOST[:PORT]', default='10.0.1.10',
+                        help='publish robot poses over UDP to a scoreboard, empty to turn off (default: %(default)s)')
+    parser.add_argument('--room', type=int, default=DEFAULT_ROOM,
+                        help='match id, when the hub hosts several matches (default: %(default)s)')
+    args = parser.parse_args()
+
+    import cozmo
+
+    if not args.serial:
+        cozmo.run_program(functools.partial(cozmo_program, record=args.record, trace=args.trace,
+                                            controller=args.controller, session=args.session,
+                                            telemetry=args.telemetry, room=args.room))
+        return
+
+    cozmo.setup_basic_logging()
+    connector_class = cozmo.run.IOSConnector if args.ios else cozmo.run.AndroidConnector
+    connections = [connect_robot(connector_class(serial=serial)) for serial in args.serial]
+    try:
+        multi_seat_program([robot for robot, loop_thread in connections], args.record, args.trace, args.controller,
+                           args.session, args.telemetry, args.room)
+    finally:
+        for robot, loop_thread in connections:
+            loop_thread.stop()
 
 
 if __name__ == '__main__':
-    cozmo.run_program(cozmo_program)
+    main()
@@ -0,0 +1,72 @@
+"""Live scoreboard of every robot's position, lift and carried cube
+
+Listens for the telemetry the players publish over UDP and redraws a table of the newest state of
+every robot a few times per second. With --host it also joins the game network and shows the
+scores the judges send.
+
+Usage:
+    python scoreboard.py [--port 5001] [--host 10.0.1.10] [--room 0]
+"""
+import argparse
+import time
+
+from common.message_forwarder import MessageListener, start_connection
+from common.protocol import DEFAULT_ROOM
+from common.telemetry import TELEMETRY_PORT, TelemetryReceiver
+
+# seconds between redraws
+REFRESH = 0.25
+
+# seconds without a datagram before a robot is shown as lost
+LOST_AFTER = 1.0
+
+
+def render(receiver: TelemetryReceiver, scores: dict) -> str:
+    """
+    :param receiver: running telemetry receiver
+    :param scores: team -> score, empty when not connected to the game network
+    :return: the scoreboard as text
+    """
+    now = time.monotonic()
+    lines = ['%4s %5s %6s %6s %8s %5s %9s' % ('team', 'robot', 'x mm', 'y mm', 'heading', 'lift', 'carrying')]
+    for state in receiver.states():
+        lost = ' lost' if now - state.received_at > LOST_AFTER else ''
+        lines.append('%4d %5d %6d %6d %8.1f %4d%% %9s%s' % (
+            state.team, state.robot, state.x, state.y, state.heading / 10, state.lift,
+            'cube %d' % state.carrying if state.carrying else '-', lost))
+    if scores:
+        lines.append('scores: ' + ', '.join('team %d: %d' % (team, score) for team, score in sorted(scores.items())))
+    lines.append('%d updates, %d stale dropped, %d from other rooms' % (
+        receiver.received, receiver.stale, receiver.other_room))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show where every robot is during a game.')
+    parser.add_argument('--port', type=int, default=TELEMETRY_PORT, help='telemetry port (default: %(default)s)')
+    parser.add_argument('--host', help='address of the hub, to also show the scores')
+    parser.add_argument('--room', type=int, default=DEFAULT_ROOM, help='match id of the robots and scores to show')
+    args = parser.parse_args()
+
+    receiver = TelemetryReceiver(('', args.port), room=args.room)
+    receiver.start()
+    listener = None
+    if args.host:
+        listener = MessageListener(start_connection(args.host, 5000, args.room), queue_messages=False)
+        listener.start()
+
+    try:
+        while True:
+            # clear the terminal and draw from the top left corner
+            print('\033[2J\033[H' + render(receiver, listener.scores if listener else {}), flush=True)
+            time.sleep(REFRESH)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+        if listener is not None:
+            listener.stop()
+
+
+if __name__ == '__main__':
+    main()
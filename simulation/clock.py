@@ -0,0 +1,24 @@
+class SimClock:
+    """
+    Virtual monotonic clock advanced by the simulation instead of by wall time. Pass its monotonic
+    method wherever the game takes a clock, such as CommandShaper, AutoPickup and FixedRateScheduler,
+    so timeouts and keepalives follow simulated time.
+    """
+
+    def __init__(self, start: float = 0.0):
+        """
+        :param start: initial time in seconds
+        """
+        self.now = start
+
+    def monotonic(self) -> float:
+        """
+        :return: current simulated time in seconds
+        """
+        return self.now
+
+    def advance(self, seconds: float):
+        """
+        :param seconds: simulated time to move forward by
+        """
+        self.now += seconds
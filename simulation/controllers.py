@@ -0,0 +1,133 @@
+"""Controllers for simulated players
+
+Every pad has the get_state() method of the real controller backends and returns
+common.gamepad.GamepadState snapshots, so the player's check_controller_state runs unchanged against them.
+"""
+import math
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from common.gamepad import GamepadState, GAMEPAD_Y
+from simulation.world import Arena, SimCube, SimRobot
+
+THUMB_MAX = 32767
+
+# where a cube is shown to the judge: distance in front of the judge and how close to get to that spot, in mm
+SHOW_DISTANCE = 220.0
+SPOT_TOLERANCE = 50.0
+
+
+class ScriptedPad:
+    """ Holds each scripted state for its duration of simulated time, then releases every input """
+
+    def __init__(self, script: Sequence[Tuple[float, GamepadState]], clock: Callable[[], float]):
+        """
+        :param script: (seconds, state) pairs played in order
+        :param clock: simulated clock
+        """
+        self.script = script
+        self.clock = clock
+        self._start: Optional[float] = None
+
+    def get_state(self) -> GamepadState:
+        now = self.clock()
+        if self._start is None:
+            self._start = now
+        elapsed = now - self._start
+        for duration, state in self.script:
+            if elapsed < duration:
+                return state
+            elapsed -= duration
+        return GamepadState()
+
+    def is_connected(self) -> bool:
+        return True
+
+
+class RecordedPad:
+    """ Replays recorded snapshots, one per call, then releases every input """
+
+    def __init__(self, states: Sequence[GamepadState]):
+        """
+        :param states: snapshots in the order they were recorded
+        """
+        self.states = states
+        self.position = 0
+
+    def get_state(self) -> GamepadState:
+        if self.position >= len(self.states):
+            return GamepadState()
+        state = self.states[self.position]
+        self.position += 1
+        return state
+
+    def is_connected(self) -> bool:
+        return True
+
+
+class ChaserPad:
+    """
+    Plays like a simple human: steers to the nearest free cube paired with its team, holds Y to
+    pick it up, then carries it back in front of its own judge.
+    """
+
+    def __init__(self, robot: SimRobot, arena: Arena, judge: SimRobot, pickup_range: float = 450.0,
+                 aim: float = math.radians(10)):
+        """
+        :param robot: robot this pad drives
+        :param arena: field the robot plays on
+        :param judge: judge robot the cubes are brought to
+        :param pickup_range: distance in mm at which Y is pressed
+        :param aim: largest bearing error in radians when picking up or showing a cube
+        """
+        self.robot = robot
+        self.arena = arena
+        self.judge = judge
+        self.pickup_range = pickup_range
+        self.aim = aim
+        self.packet_number = 0
+        self._last = GamepadState()
+
+    def get_state(self) -> GamepadState:
+        robot = self.robot
+        buttons, x, y = 0, 0, 0
+        if robot.carrying is not None:
+            # drive to a spot in front of the judge, then turn to show it the cube
+            judge = self.judge
+            spot_x = judge.x + SHOW_DISTANCE * math.cos(judge.heading)
+            spot_y = judge.y + SHOW_DISTANCE * math.sin(judge.heading)
+            if robot.distance_to(spot_x, spot_y) > SPOT_TOLERANCE:
+                x, y = self._steer(spot_x, spot_y)
+            elif abs(robot.bearing_to(judge.x, judge.y)) > self.aim:
+                x, y = self._steer(judge.x, judge.y)
+        else:
+            cube = self._target()
+            if cube is not None:
+                if (robot.distance_to(cube.x, cube.y) <= self.pickup_range
+                        and abs(robot.bearing_to(cube.x, cube.y)) <= self.aim):
+                    # stop first so the robot is not still rolling when the pickup starts
+                    if robot.action is not None or not (robot.left_wheel_speed or robot.right_wheel_speed):
+                        buttons = GAMEPAD_Y
+                else:
+                    x, y = self._steer(cube.x, cube.y)
+
+        last = self._last
+        if buttons != last.buttons or x != last.l_thumb_x or y != last.l_thumb_y:
+            self.packet_number += 1
+            self._last = GamepadState(self.packet_number, buttons, 0, 0, x, y, 0, 0)
+        return self._last
+
+    def is_connected(self) -> bool:
+        return True
+
+    def _target(self) -> Optional[SimCube]:
+        free: List[SimCube] = [cube for cube in self.arena.team_cubes(self.robot.team).values()
+                               if cube.in_play and cube.carried_by is None]
+        if not free:
+            return None
+        return min(free, key=lambda cube: self.robot.distance_to(cube.x, cube.y))
+
+    def _steer(self, x: float, y: float) -> Tuple[int, int]:
+        """ push the stick towards the target, straight up when facing it and sideways to turn on the spot """
+        error = self.robot.bearing_to(x, y)
+        angle = math.pi / 2 + max(-math.pi / 2, min(math.pi / 2, error))
+        return int(THUMB_MAX * math.cos(angle)), int(THUMB_MAX * math.sin(angle))
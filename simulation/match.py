@@ -0,0 +1,264 @@
+"""Whole capture the flag matches in simulated time
+
+Every team gets a judge robot at its base running the judge's Scorekeeper and one or more player
+robots running the player's check_controller_state with a command shaper and auto pickup, all
+talking through a hub or an in-process simulation.transport.LocalBus. The match is stepped on one
+thread at the control rate of the player, without sleeping, so it runs much faster than real time
+while exercising the same control and network code as the real game.
+
+Usage:
+    python -m simulation.match [--host 10.0.1.10] [--port 5000] [--teams 2] [--players 1] [--seed 0] [--poses]
+"""
+import argparse
+import math
+import queue
+import socket
+import time
+from typing import Callable, List, NamedTuple, Tuple
+
+from common.commands import CommandShaper
+from common.drive import StickDrive
+from common.message_forwarder import MessageListener, receive_message, send_message, start_connection
+from common.pickup import AutoPickup
+from common.poses import PoseStreamer
+from common.protocol import StartMessage
+from common.setup import get_team_colors
+from common.spatial import CaptureIndex
+from judge import Scorekeeper, watch_cubes
+from player import CONTROL_RATE_HZ, check_controller_state
+from simulation.controllers import ChaserPad
+from simulation.world import Arena, SimRobot
+
+# closest a cube is hidden to its own team's base, in mm
+HIDE_DISTANCE = 700.0
+
+
+class MatchResult(NamedTuple):
+    seed: int
+    teams: int
+    winner: int  # 0 when the time limit was reached first
+    duration: float  # simulated seconds
+    captures: Tuple[Tuple[int, float], ...]  # (team, simulated seconds) of every capture
+    messages_sent: int
+    messages_received: int
+    ticks: int
+    wall_time: float  # seconds
+
+
+class Endpoint:
+    """
+    A participant's network connection. Messages are received by polling once per tick instead of
+    on a listener thread, so the match stays on a single thread; the listener is only used to
+    decode and dispatch them.
+    """
+
+    def __init__(self, connection: socket.socket, messages: queue.Queue = None, queue_messages: bool = True):
+        """
+        :param connection: connection to the hub
+        :param messages: queue decoded messages are pushed onto
+        :param queue_messages: push decoded messages onto the queue, players only check the listener's flags
+        """
+        self.connection = connection
+        self.listener = MessageListener(connection, messages, queue_messages=queue_messages)
+        self.sent: int = 0
+        self.received: int = 0
+
+    def sendall(self, data: bytes):
+        """ counts frames sent by send_message, which writes one message per call """
+        self.sent += 1
+        self.connection.sendall(data)
+
+    def poll(self):
+        for message in receive_message(self.connection, self.listener.decoder):
+            self.received += 1
+            self.listener.dispatch(message)
+
+    def close(self):
+        self.connection.close()
+
+
+class SimJudge:
+    def __init__(self, robot: SimRobot, endpoint: Endpoint, scorekeeper: Scorekeeper, watch: bool = True):
+        """
+        :param watch: capture the cubes the judge sees, otherwise only the streamed poses capture cubes
+        """
+        self.robot = robot
+        self.endpoint = endpoint
+        self.scorekeeper = scorekeeper
+        self.captures: List[float] = []
+        self.handler = watch_cubes(robot.world, endpoint.listener.messages) if watch else None
+
+    @property
+    def game_over(self) -> bool:
+        return self.scorekeeper.game_over
+
+    def tick(self):
+        self.endpoint.poll()
+        messages = self.endpoint.listener.messages
+        arena = self.robot.arena
+        while not messages.empty():
+            in_play = len(self.scorekeeper.cubes)
+            self.scorekeeper.handle(messages.get_nowait())
+            if len(self.scorekeeper.cubes) < in_play:
+                self.captures.append(arena.clock.now)
+        # captured cubes stay with the judge and are out of the game
+        for cube in self.robot.world.light_cubes.values():
+            if cube.in_play and cube not in self.scorekeeper.cubes:
+                arena.retire(cube)
+
+
+class SimPlayer:
+    def __init__(self, robot: SimRobot, pad, endpoint: Endpoint, poses: PoseStreamer = None):
+        clock = robot.arena.clock.monotonic
+        self.robot = robot
+        self.pad = pad
+        self.endpoint = endpoint
+        self.shaper = CommandShaper(robot, clock=clock)
+        self.pickup = AutoPickup(self.shaper, clock=clock)
+        self.poses = poses
+        self.stopped = False
+
+    @property
+    def game_over(self) -> bool:
+        return self.endpoint.listener.game_over.is_set()
+
+    def tick(self, stick_drive: StickDrive):
+        self.endpoint.poll()
+        if not self.game_over:
+            check_controller_state(self.shaper, self.pad.get_state(), self.pickup, stick_drive)
+            if self.poses is not None:
+                self.poses.update()
+        elif not self.stopped:
+            self.pickup.cancel()
+            self.robot.stop_all_motors()
+            self.stopped = True
+
+
+class Match:
+    """ One game between simulated teams """
+
+    def __init__(self, connect: Callable[[], socket.socket], teams: int = 2, players_per_team: int = 1,
+                 seed: int = 0, pad_factory: Callable = ChaserPad, rate_hz: float = CONTROL_RATE_HZ,
+                 time_limit: float = 600.0, stick_drive: StickDrive = None, poses: bool = False):
+        """
+        :param connect: opens one participant's connection to the hub or a LocalBus
+        :param teams: number of teams playing
+        :param players_per_team: player robots on every team
+        :param seed: seed for cube placement
+        :param pad_factory: builds a player's controller from (robot, arena, judge robot)
+        :param rate_hz: control loop rate of the players
+        :param time_limit: simulated seconds before the match is abandoned
+        :param stick_drive: stick mapping to share between matches, built for this match if not given
+        :param poses: players stream poses and judges capture cubes by coordinates instead of by sight
+        """
+        self.seed = seed
+        self.teams = teams
+        self.period = 1.0 / rate_hz
+        self.time_limit = time_limit
+        self.arena = Arena(seed)
+        self.stick_drive = stick_drive if stick_drive is not None else StickDrive()
+        self.judges: List[SimJudge] = []
+        self.players: List[SimPlayer] = []
+
+        team_colors, opponent_colors = get_team_colors(teams)
+        for team in range(1, teams + 1):
+            x, y, heading = self.arena.base(team, teams)
+            judge_robot = self.arena.add_robot(team, x, y, heading)
+            judge_robot.set_all_backpack_lights(team_colors[team])
+            cubes = self.arena.hide_cubes(team, (x, y), HIDE_DISTANCE)
+            for cube in cubes:
+                cube.set_lights(opponent_colors[team])
+            endpoint = Endpoint(connect())
+            captures = CaptureIndex(teams, self.arena.size) if poses else None
+            self.judges.append(SimJudge(judge_robot, endpoint,
+                                        Scorekeeper(endpoint, team, team_colors[team], list(cubes), captures=captures,
+                                                    clock=self.arena.clock.monotonic),
+                                        watch=not poses))
+
+            for number in range(players_per_team):
+                # players line up side by side just in front of their judge
+                offset = (number - (players_per_team - 1) / 2) * 120.0
+                robot = self.arena.add_robot(team, x + 150.0 * math.cos(heading) - offset * math.sin(heading),
+                                             y + 150.0 * math.sin(heading) + offset * math.cos(heading), heading)
+                robot.set_all_backpack_lights(team_colors[team])
+                endpoint = Endpoint(connect(), queue_messages=False)
+                streamer = None
+                if poses:
+                    # simulated robots report poses in the field frame, so home is where they start
+                    streamer = PoseStreamer(endpoint, robot, team, number + 1, (robot.x, robot.y, robot.heading),
+                                            clock=self.arena.clock.monotonic)
+                    streamer.calibrate()
+                self.players.append(SimPlayer(robot, pad_factory(robot, self.arena, judge_robot), endpoint,
+                                              streamer))
+
+        # the start message of the coordinating judge also starts a new game on the hub's game state
+        send_message(self.judges[0].endpoint, StartMessage(0))
+
+    @property
+    def winner(self) -> int:
+        return next((judge.scorekeeper.winner for judge in self.judges if judge.game_over), 0)
+
+    def run(self, settle_timeout: float = 5.0) -> MatchResult:
+        """
+        Play until a team wins or the time limit passes, then wait for the exit message to reach everyone.
+
+        :param settle_timeout: wall seconds to wait for the exit message
+        :return: the result of the match
+        """
+        start = time.perf_counter()
+        arena = self.arena
+        ticks = 0
+        while not self.winner and arena.clock.now < self.time_limit:
+            for judge in self.judges:
+                judge.tick()
+            for player in self.players:
+                player.tick(self.stick_drive)
+            arena.step(self.period)
+            ticks += 1
+
+        winner = self.winner
+        participants = self.judges + self.players
+        deadline = time.perf_counter() + settle_timeout
+        while winner and time.perf_counter() < deadline:
+            for judge in self.judges:
+                judge.tick()
+            for player in self.players:
+                player.tick(self.stick_drive)
+            if all(participant.game_over for participant in participants):
+                break
+            time.sleep(0.001)
+
+        captures = sorted(((judge.robot.team, at) for judge in self.judges for at in judge.captures),
+                          key=lambda capture: capture[1])
+        endpoints = [participant.endpoint for participant in participants]
+        return MatchResult(self.seed, self.teams, winner, arena.clock.now, tuple(captures),
+                           sum(endpoint.sent for endpoint in endpoints),
+                           sum(endpoint.received for endpoint in endpoints),
+                           ticks, time.perf_counter() - start)
+
+    def close(self):
+        for participant in self.judges + self.players:
+            participant.endpoint.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play a simulated capture the flag match through a hub.')
+    parser.add_argument('--host', default='10.0.1.10')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--teams', type=int, default=2)
+    parser.add_argument('--players', type=int, default=1, help='players per team')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--poses', action='store_true', help='capture cubes by streamed poses instead of by sight')
+    args = parser.parse_args()
+
+    match = Match(lambda: start_connection(args.host, args.port), args.teams, args.players, args.seed,
+                  poses=args.poses)
+    try:
+        result = match.run()
+    finally:
+        match.close()
+    print(result)
+
+
+if __name__ == '__main__':
+    main()
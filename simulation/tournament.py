@@ -0,0 +1,183 @@
+"""Tournament of simulated matches across a process pool
+
+Every match is played in a worker process over its own LocalBus, with the match index added to the
+base seed, so a tournament gives the same results however many workers play it. Results are
+collected into typed columns, one value per match or per capture, which are summarised as win
+rates, capture times and message counts and can be saved as a compressed .npz file.
+
+Usage:
+    python -m simulation.tournament [--matches 1000] [--teams 2] [--players 1] [--workers N] [--output results.npz]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+from array import array
+from typing import Dict, Iterable, NamedTuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from common.drive import StickDrive
+from simulation.match import Match, MatchResult
+from simulation.transport import LocalBus
+
+# matches handed to a worker at a time, large enough to keep the pool's own messaging negligible
+CHUNK_SIZE = 8
+
+
+class MatchConfig(NamedTuple):
+    seed: int
+    teams: int
+    players_per_team: int
+    time_limit: float
+
+
+# built once per worker process, the lookup table takes longer to build than a match takes to play
+_stick_drive: StickDrive = None
+
+
+def _init_worker():
+    global _stick_drive
+    _stick_drive = StickDrive()
+
+
+def play(config: MatchConfig) -> MatchResult:
+    """
+    Play one match over an in-process bus.
+
+    :param config: match to play
+    :return: the result of the match
+    """
+    bus = LocalBus()
+    match = Match(bus.connect, config.teams, config.players_per_team, config.seed, time_limit=config.time_limit,
+                  stick_drive=_stick_drive)
+    try:
+        return match.run()
+    finally:
+        match.close()
+
+
+class TournamentResults:
+    """ Match results stored column by column """
+
+    def __init__(self):
+        self.seed = array('q')
+        self.winner = array('b')
+        self.duration = array('d')
+        self.messages_sent = array('l')
+        self.messages_received = array('l')
+        self.ticks = array('l')
+        self.wall_time = array('d')
+        # one entry per capture, capture_match is the row of the match it happened in
+        self.capture_match = array('l')
+        self.capture_team = array('b')
+        self.capture_time = array('d')
+
+    def __len__(self):
+        return len(self.seed)
+
+    def add(self, result: MatchResult):
+        row = len(self.seed)
+        self.seed.append(result.seed)
+        self.winner.append(result.winner)
+        self.duration.append(result.duration)
+        self.messages_sent.append(result.messages_sent)
+        self.messages_received.append(result.messages_received)
+        self.ticks.append(result.ticks)
+        self.wall_time.append(result.wall_time)
+        for team, at in result.captures:
+            self.capture_match.append(row)
+            self.capture_team.append(team)
+            self.capture_time.append(at)
+
+    def columns(self) -> Dict[str, array]:
+        return dict(vars(self))
+
+    def save(self, path: str):
+        """
+        Save every column to a compressed .npz file, requires numpy.
+
+        :param path: file to write
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required to save tournament results')
+        numpy.savez_compressed(path, **{name: numpy.frombuffer(column, dtype=column.typecode)
+                                        for name, column in self.columns().items()})
+
+    def summary(self, teams: int) -> str:
+        """
+        :param teams: number of teams that played
+        :return: win rates, capture times and message counts
+        """
+        matches = len(self)
+        lines = ['%d matches, %d undecided' % (matches, sum(1 for winner in self.winner if winner == 0))]
+        for team in range(1, teams + 1):
+            wins = sum(1 for winner in self.winner if winner == team)
+            lines.append('team %d won %5.1f%%' % (team, 100.0 * wins / matches))
+
+        # time each team took for its first capture of a match
+        first: Dict[tuple, float] = {}
+        for row, team, at in zip(self.capture_match, self.capture_team, self.capture_time):
+            first.setdefault((row, team), at)
+        lines.append('time to first capture p50 %.1f s  p90 %.1f s' % _percentiles(first.values()))
+        lines.append('match length p50 %.1f s  p90 %.1f s' % _percentiles(
+            duration for duration, winner in zip(self.duration, self.winner) if winner))
+        lines.append('messages per match: %.1f sent, %.1f received' % (
+            sum(self.messages_sent) / matches, sum(self.messages_received) / matches))
+        return '\n'.join(lines)
+
+
+def _percentiles(values: Iterable[float]) -> (float, float):
+    values = sorted(values)
+    if not values:
+        return float('nan'), float('nan')
+    return statistics.median(values), values[min(len(values) - 1, int(len(values) * 0.9))]
+
+
+def run_tournament(matches: int, teams: int = 2, players_per_team: int = 1, seed: int = 0,
+                   workers: int = None, time_limit: float = 600.0) -> TournamentResults:
+    """
+    Play every match across a pool of worker processes.
+
+    :param matches: number of matches to play
+    :param teams: number of teams in every match
+    :param players_per_team: player robots on every team
+    :param seed: seed of the first match, match i uses seed + i
+    :param workers: worker processes, one per core if not given
+    :param time_limit: simulated seconds before a match is abandoned
+    :return: results ordered by seed
+    """
+    configs = [MatchConfig(seed + index, teams, players_per_team, time_limit) for index in range(matches)]
+    results = TournamentResults()
+    with multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker) as pool:
+        # imap keeps the order of the configs, so the columns come out in seed order
+        for result in pool.imap(play, configs, chunksize=CHUNK_SIZE):
+            results.add(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play a tournament of simulated matches on every core.')
+    parser.add_argument('--matches', type=int, default=1000)
+    parser.add_argument('--teams', type=int, default=2)
+    parser.add_argument('--players', type=int, default=1, help='players per team')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first match')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--output', help='save the result columns to this .npz file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_tournament(args.matches, args.teams, args.players, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    print(results.summary(args.teams))
+    print('%.1f matches/s with %d workers' % (len(results) / elapsed, args.workers or os.cpu_count()))
+    if args.output:
+        results.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
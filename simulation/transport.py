@@ -0,0 +1,79 @@
+"""In-process stand-in for the message hub
+
+Connections on a LocalBus behave like non-blocking sockets connected to common.hub: every frame sent
+on one connection is delivered to all the others, and receiving raises BlockingIOError when nothing
+is waiting. Delivery is immediate and ordered, so matches played over a bus are deterministic and
+need no ports, threads or event loop. Like the hub, the bus keeps the authoritative game state and
+answers the judges' capture claims itself.
+"""
+from typing import List
+
+from common.clock_sync import reference_us, stamp
+from common.game_state import SERVICE_TYPES, GameState
+from common.protocol import CAPTURE_CLAIM, HEADER, FrameDecoder, encode
+
+
+class LocalConnection:
+    def __init__(self, bus: 'LocalBus'):
+        self.bus = bus
+        self.inbox = bytearray()
+        self.closed = False
+
+    def sendall(self, data: bytes):
+        self.bus.broadcast(data, self)
+
+    def recv_into(self, buffer, nbytes: int = 0) -> int:
+        """ copy waiting bytes into the buffer like socket.recv_into on a non-blocking socket """
+        count = min(nbytes or len(buffer), len(self.inbox))
+        if not count:
+            if self.closed:
+                return 0
+            raise BlockingIOError()
+        buffer[:count] = self.inbox[:count]
+        del self.inbox[:count]
+        return count
+
+    def close(self):
+        self.closed = True
+        if self in self.bus.connections:
+            self.bus.connections.remove(self)
+
+
+class LocalBus:
+    """ Relays frames between the connections of one match """
+
+    def __init__(self, state: GameState = None):
+        """
+        :param state: game state the judges' claims are applied to, one with the default winning score if not given
+        """
+        self.connections: List[LocalConnection] = []
+        self.state = state if state is not None else GameState()
+        self.decoder = FrameDecoder()
+        self.messages_relayed: int = 0
+
+    def connect(self) -> LocalConnection:
+        """
+        :return: a new connection to the bus, used in place of start_connection
+        """
+        connection = LocalConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    def broadcast(self, data: bytes, sender: LocalConnection = None):
+        """
+        :param data: encoded frames
+        :param sender: connection the frames came from, it does not receive them back
+        """
+        if sender is not None and data[HEADER.size - 1] in SERVICE_TYPES:
+            # send_message writes one frame at a time, so the whole of data is the event
+            for message in self.decoder.feed(data):
+                updates = self.state.handle(message)
+                if updates:
+                    now_us = reference_us()
+                    self.broadcast(b''.join(encode(stamp(update, now_us)) for update in updates))
+            if data[HEADER.size - 1] == CAPTURE_CLAIM:
+                return
+        for connection in self.connections:
+            if connection is not sender:
+                connection.inbox += data
+        self.messages_relayed += 1
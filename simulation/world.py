@@ -0,0 +1,479 @@
+"""Headless stand-in for the parts of the Cozmo SDK the game uses
+
+An Arena holds every robot and cube on the playing field and advances them in fixed steps of
+simulated time. Each SimRobot offers the robot surface used by judge.py, player.py and common/
+(drive_wheels, move_lift, backpack lights, go_to_object, pickup_object and animations returning
+actions with wait_for_completed) and a SimWorld with get_light_cube, visible_objects,
+wait_for_observed_light_cube and object observed events. Robots drive as differential drives and
+see cubes inside a camera cone, which is enough to play whole matches without hardware.
+"""
+import concurrent.futures
+import math
+import random
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cozmo
+from cozmo.objects import EvtObjectObserved, LightCube, LightCube1Id, LightCube2Id, LightCube3Id
+
+from common.spatial import base_pose
+from simulation.clock import SimClock
+
+ARENA_SIZE = 2000.0  # mm along each side of the square field
+WHEEL_BASE = 48.0  # mm between the treads
+MAX_WHEEL_SPEED = 220.0  # mm/s
+LIFT_RATE = 0.5  # lift travel per second at a lift speed of 1
+
+CAMERA_FPS = 15
+CAMERA_RANGE = 600.0  # mm
+CAMERA_HALF_ANGLE = math.radians(30)
+
+CARRY_OFFSET = 40.0  # mm in front of the robot where a lifted cube sits
+APPROACH_SPEED = 100.0  # mm/s driven by go_to_object
+TURN_TOLERANCE = math.radians(5)
+PICKUP_TIME = 2.0  # seconds
+PICKUP_REACH = 250.0  # mm, pickups started further away fail
+ANIMATION_TIME = 2.0  # seconds
+
+# simulated seconds per step when the world runs on its own
+DEFAULT_STEP = 1 / 60
+
+CUBE_IDS = (LightCube1Id, LightCube2Id, LightCube3Id)
+
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+ABORTED = 'aborted'
+
+
+def _wrap(angle: float) -> float:
+    """ wrap an angle into [-pi, pi) """
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class SimCube(LightCube):
+    """ Light cube lying on the field or carried by a robot """
+
+    def __init__(self, cube_id: int, team: int, x: float, y: float):
+        """
+        :param cube_id: LightCube1Id, LightCube2Id or LightCube3Id
+        :param team: team whose judge the cube is paired with
+        :param x: position in mm
+        :param y: position in mm
+        """
+        self._cube_id = cube_id
+        self._object_id = cube_id
+        self.team = team
+        self.x = x
+        self.y = y
+        self.lights: cozmo.lights.Light = None
+        self.carried_by: Optional['SimRobot'] = None
+        self.in_play = True
+
+    @property
+    def pose(self) -> cozmo.util.Pose:
+        """ where the cube is, simulated robots always know where their paired cubes are """
+        return cozmo.util.pose_z_angle(self.x, self.y, 0, cozmo.util.radians(0))
+
+    def set_lights(self, light: cozmo.lights.Light):
+        self.lights = light
+
+    def set_lights_off(self):
+        self.lights = None
+
+    def __repr__(self):
+        return 'SimCube(team=%d, cube_id=%d, x=%.0f, y=%.0f)' % (self.team, self._cube_id, self.x, self.y)
+
+
+class SimAction:
+    """ Action running on a robot, completed by stepping the arena """
+
+    def __init__(self, robot: 'SimRobot'):
+        self.robot = robot
+        self.state: str = RUNNING
+
+    @property
+    def is_running(self) -> bool:
+        return self.state == RUNNING
+
+    @property
+    def is_completed(self) -> bool:
+        return self.state != RUNNING
+
+    @property
+    def has_succeeded(self) -> bool:
+        return self.state == SUCCEEDED
+
+    @property
+    def has_failed(self) -> bool:
+        return self.state in (FAILED, ABORTED)
+
+    def abort(self):
+        if self.is_running:
+            self._finish(ABORTED)
+
+    def wait_for_completed(self, timeout: float = None) -> 'SimAction':
+        """
+        Run the arena until the action completes.
+
+        :param timeout: simulated seconds to wait
+        :return: this action
+        """
+        if not self.robot.arena.run_until(lambda: self.is_completed, timeout):
+            raise concurrent.futures.TimeoutError()
+        return self
+
+    def step(self, dt: float):
+        """
+        :param dt: simulated seconds since the last step
+        """
+        pass
+
+    def _finish(self, state: str):
+        self.state = state
+        self.robot.left_wheel_speed = self.robot.right_wheel_speed = 0.0
+        if self.robot.action is self:
+            self.robot.action = None
+
+
+class TimedAction(SimAction):
+    """ Action that succeeds after a fixed time, used for animations and head moves """
+
+    def __init__(self, robot: 'SimRobot', duration: float):
+        super().__init__(robot)
+        self.remaining = duration
+
+    def step(self, dt: float):
+        self.remaining -= dt
+        if self.remaining <= 0:
+            self._finish(SUCCEEDED)
+
+
+class GoToObjectAction(SimAction):
+    """ Turns towards the object, then drives until it is the requested distance away """
+
+    def __init__(self, robot: 'SimRobot', target: SimCube, distance: float):
+        super().__init__(robot)
+        self.target = target
+        self.distance = distance
+
+    def step(self, dt: float):
+        robot = self.robot
+        if not self.target.in_play:
+            self._finish(FAILED)
+            return
+        if robot.distance_to(self.target.x, self.target.y) <= self.distance:
+            self._finish(SUCCEEDED)
+            return
+        error = robot.bearing_to(self.target.x, self.target.y)
+        if abs(error) > TURN_TOLERANCE:
+            turn = math.copysign(APPROACH_SPEED, error)
+            robot.left_wheel_speed, robot.right_wheel_speed = -turn, turn
+        else:
+            robot.left_wheel_speed = robot.right_wheel_speed = APPROACH_SPEED
+
+
+class PickupObjectAction(TimedAction):
+    """ Lifts the cube after PICKUP_TIME if it is still free and within reach """
+
+    def __init__(self, robot: 'SimRobot', target: SimCube):
+        super().__init__(robot, PICKUP_TIME)
+        self.target = target
+
+    def step(self, dt: float):
+        self.remaining -= dt
+        if self.remaining > 0:
+            return
+        target = self.target
+        if (target.in_play and target.carried_by is None and self.robot.carrying is None
+                and self.robot.distance_to(target.x, target.y) <= PICKUP_REACH):
+            target.carried_by = self.robot
+            self.robot.carrying = target
+            self.robot.lift_height = 1.0
+            self._finish(SUCCEEDED)
+        else:
+            self._finish(FAILED)
+
+
+class _Handler:
+    def __init__(self, handlers: list, f: Callable):
+        self.handlers = handlers
+        self.f = f
+
+    def disable(self):
+        if self.f in self.handlers:
+            self.handlers.remove(self.f)
+
+
+class SimWorld:
+    """ One robot's view of the arena, like robot.world in the SDK """
+
+    def __init__(self, arena: 'Arena', robot: 'SimRobot'):
+        self.arena = arena
+        self.robot = robot
+        self._handlers: List[Callable] = []
+        self._observed: Optional[SimCube] = None
+
+    @property
+    def light_cubes(self) -> Dict[int, SimCube]:
+        """ cubes paired with this robot's team, keyed by cube id """
+        return self.arena.team_cubes(self.robot.team)
+
+    def get_light_cube(self, cube_id: int) -> SimCube:
+        return self.light_cubes[cube_id]
+
+    @property
+    def visible_objects(self) -> Iterator[SimCube]:
+        """ paired cubes in play inside the camera cone, except the one this robot is carrying """
+        robot = self.robot
+        for cube in self.light_cubes.values():
+            if cube.in_play and cube.carried_by is not robot and robot.sees(cube.x, cube.y):
+                yield cube
+
+    def add_event_handler(self, event, f: Callable) -> _Handler:
+        """
+        :param event: event class, only EvtObjectObserved is ever dispatched
+        :param f: called with (evt, obj=cube, ...) for every cube seen on a camera frame
+        :return: handler to disable
+        """
+        if issubclass(EvtObjectObserved, event):
+            self._handlers.append(f)
+        return _Handler(self._handlers, f)
+
+    def wait_for_observed_light_cube(self, timeout: float = None, include_existing: bool = True) -> SimCube:
+        """
+        Run the arena until the camera sees a paired cube.
+
+        :param timeout: simulated seconds to wait
+        :param include_existing: return a cube that is already visible without waiting for a frame
+        :return: the first cube seen
+        """
+        if include_existing:
+            cube = next(self.visible_objects, None)
+            if cube is not None:
+                return cube
+        self._observed = None
+        if not self.arena.run_until(lambda: self._observed is not None, timeout):
+            raise concurrent.futures.TimeoutError()
+        return self._observed
+
+    def _camera_frame(self):
+        for cube in self.visible_objects:
+            if self._observed is None:
+                self._observed = cube
+            for handler in list(self._handlers):
+                handler(EvtObjectObserved(obj=cube, image_box=None, pose=None, updated=None),
+                        obj=cube, image_box=None, pose=None, updated=None)
+
+
+class SimRobot:
+    """ Differential drive robot with a lift and a forward facing camera """
+
+    def __init__(self, arena: 'Arena', team: int, x: float, y: float, heading: float):
+        """
+        :param arena: field the robot drives on
+        :param team: team the robot plays for
+        :param x: position in mm
+        :param y: position in mm
+        :param heading: radians counterclockwise from the x axis
+        """
+        self.arena = arena
+        self.team = team
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.left_wheel_speed = 0.0
+        self.right_wheel_speed = 0.0
+        self.lift_height = 0.0
+        self.lift_speed = 0.0
+        self.carrying: Optional[SimCube] = None
+        self.action: Optional[SimAction] = None
+        self.backpack_lights: cozmo.lights.Light = None
+        self.world = SimWorld(arena, self)
+
+        self.commands: int = 0
+
+    @property
+    def pose(self) -> cozmo.util.Pose:
+        """ pose in the field frame, which is the SDK frame of every simulated robot """
+        return cozmo.util.pose_z_angle(self.x, self.y, 0, cozmo.util.radians(self.heading))
+
+    @property
+    def lift_ratio(self) -> float:
+        return self.lift_height
+
+    @property
+    def carrying_object_id(self) -> int:
+        return self.carrying.object_id if self.carrying is not None else -1
+
+    def drive_wheels(self, l_wheel_speed: float, r_wheel_speed: float, l_wheel_acc: float = None,
+                     r_wheel_acc: float = None, duration: float = None):
+        self.commands += 1
+        self.left_wheel_speed = max(-MAX_WHEEL_SPEED, min(MAX_WHEEL_SPEED, l_wheel_speed))
+        self.right_wheel_speed = max(-MAX_WHEEL_SPEED, min(MAX_WHEEL_SPEED, r_wheel_speed))
+
+    def stop_all_motors(self):
+        self.drive_wheels(0, 0)
+        self.move_lift(0)
+
+    def move_lift(self, speed: float):
+        self.commands += 1
+        self.lift_speed = speed
+
+    def set_all_backpack_lights(self, light: cozmo.lights.Light):
+        self.backpack_lights = light
+
+    def set_head_angle(self, angle: cozmo.util.Angle, **kwargs) -> SimAction:
+        return self._start(TimedAction(self, 0.2))
+
+    def play_anim_trigger(self, trigger, **kwargs) -> SimAction:
+        return self._start(TimedAction(self, ANIMATION_TIME))
+
+    def go_to_object(self, target_object: SimCube, distance_from_object: cozmo.util.Distance,
+                     **kwargs) -> SimAction:
+        return self._start(GoToObjectAction(self, target_object, distance_from_object.distance_mm))
+
+    def pickup_object(self, obj: SimCube, use_pre_dock_pose: bool = True, in_parallel: bool = False,
+                      num_retries: int = 0) -> SimAction:
+        return self._start(PickupObjectAction(self, obj))
+
+    def distance_to(self, x: float, y: float) -> float:
+        return math.hypot(x - self.x, y - self.y)
+
+    def bearing_to(self, x: float, y: float) -> float:
+        """
+        :return: radians to turn counterclockwise to face the point
+        """
+        return _wrap(math.atan2(y - self.y, x - self.x) - self.heading)
+
+    def sees(self, x: float, y: float) -> bool:
+        return self.distance_to(x, y) <= CAMERA_RANGE and abs(self.bearing_to(x, y)) <= CAMERA_HALF_ANGLE
+
+    def step(self, dt: float):
+        """
+        Advance the robot's action, treads and lift.
+
+        :param dt: simulated seconds since the last step
+        """
+        if self.action is not None:
+            self.action.step(dt)
+
+        forward = (self.left_wheel_speed + self.right_wheel_speed) / 2
+        turn = (self.right_wheel_speed - self.left_wheel_speed) / WHEEL_BASE
+        if turn:
+            self.heading = _wrap(self.heading + turn * dt)
+        if forward:
+            size = self.arena.size
+            self.x = max(0.0, min(size, self.x + forward * math.cos(self.heading) * dt))
+            self.y = max(0.0, min(size, self.y + forward * math.sin(self.heading) * dt))
+
+        if self.lift_speed:
+            self.lift_height = max(0.0, min(1.0, self.lift_height + self.lift_speed * LIFT_RATE * dt))
+            if self.lift_speed < 0 and self.carrying is not None:
+                # lowering the lift puts the cube down
+                self.carrying.carried_by = None
+                self.carrying = None
+
+        if self.carrying is not None:
+            self.carrying.x = self.x + CARRY_OFFSET * math.cos(self.heading)
+            self.carrying.y = self.y + CARRY_OFFSET * math.sin(self.heading)
+
+    def _start(self, action: SimAction) -> SimAction:
+        if self.action is not None:
+            self.action.abort()
+        self.action = action
+        return action
+
+
+class Arena:
+    """ Square playing field with every robot and cube, advanced in steps of simulated time """
+
+    def __init__(self, seed: int = 0, size: float = ARENA_SIZE, camera_fps: float = CAMERA_FPS,
+                 clock: SimClock = None):
+        """
+        :param seed: seed for cube placement
+        :param size: length of each side in mm
+        :param camera_fps: camera frames per simulated second, object observed events fire once per frame
+        :param clock: clock to advance, a new one starting at zero if not given
+        """
+        self.random = random.Random(seed)
+        self.size = size
+        self.clock = clock if clock is not None else SimClock()
+        self.robots: List[SimRobot] = []
+        self.cubes: Dict[int, Dict[int, SimCube]] = {}
+        self._frame_period = 1.0 / camera_fps
+        self._next_frame = self.clock.now + self._frame_period
+
+    def base(self, team: int, teams: int) -> Tuple[float, float, float]:
+        """
+        Bases are spread evenly around the center of the field, see common.spatial.base_pose.
+
+        :param team: team id starting at 1
+        :param teams: number of teams playing
+        :return: x, y and heading facing the center of the field
+        """
+        return base_pose(team, teams, self.size)
+
+    def add_robot(self, team: int, x: float, y: float, heading: float) -> SimRobot:
+        robot = SimRobot(self, team, x, y, heading)
+        self.robots.append(robot)
+        return robot
+
+    def team_cubes(self, team: int) -> Dict[int, SimCube]:
+        return self.cubes.setdefault(team, {})
+
+    def hide_cubes(self, team: int, away_from: Tuple[float, float], min_distance: float) -> List[SimCube]:
+        """
+        Place a team's three cubes at random points of the field.
+
+        :param team: team the cubes are paired with
+        :param away_from: point the cubes are hidden away from, usually the team's base
+        :param min_distance: closest a cube may be to that point in mm
+        :return: the placed cubes
+        """
+        margin = 100.0
+        cubes = self.team_cubes(team)
+        for cube_id in CUBE_IDS:
+            while True:
+                x = self.random.uniform(margin, self.size - margin)
+                y = self.random.uniform(margin, self.size - margin)
+                if math.hypot(x - away_from[0], y - away_from[1]) >= min_distance:
+                    break
+            cubes[cube_id] = SimCube(cube_id, team, x, y)
+        return list(cubes.values())
+
+    def retire(self, cube: SimCube):
+        """ Take a captured cube out of play """
+        cube.in_play = False
+        if cube.carried_by is not None:
+            cube.carried_by.carrying = None
+            cube.carried_by = None
+
+    def step(self, dt: float = DEFAULT_STEP):
+        """
+        Advance every robot, then deliver a camera frame to every world if one is due.
+
+        :param dt: simulated seconds to advance
+        """
+        for robot in self.robots:
+            robot.step(dt)
+        self.clock.advance(dt)
+        if self.clock.now >= self._next_frame:
+            self._next_frame += self._frame_period
+            for robot in self.robots:
+                robot.world._camera_frame()
+
+    def run_until(self, predicate: Callable[[], bool], timeout: float = None, dt: float = DEFAULT_STEP) -> bool:
+        """
+        Step the arena until the predicate holds.
+
+        :param predicate: condition to wait for
+        :param timeout: simulated seconds to wait, forever if None
+        :param dt: simulated seconds per step
+        :return: True if the predicate held before the timeout
+        """
+        deadline = None if timeout is None else self.clock.now + timeout
+        while not predicate():
+            if deadline is not None and self.clock.now >= deadline:
+                return False
+            self.step(dt)
+        return True
@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import List
+
+from common.barrier import JUDGE, PLAYER, RESEND_INTERVAL, StartBarrier
+from common.message_forwarder import MessageListener
+from common.protocol import FrameDecoder, ReadyMessage, StartMessage
+
+
+class Wire:
+    """ delivers every frame sent on one endpoint straight to the listeners of all the others """
+
+    def __init__(self):
+        self.endpoints: List[Endpoint] = []
+        self.lock = threading.Lock()
+
+    def connect(self) -> 'Endpoint':
+        endpoint = Endpoint(self)
+        self.endpoints.append(endpoint)
+        return endpoint
+
+
+class Endpoint:
+    def __init__(self, wire: Wire):
+        self.wire = wire
+        self.decoder = FrameDecoder()
+        self.listener = MessageListener(self)
+
+    def sendall(self, data: bytes):
+        with self.wire.lock:
+            for endpoint in self.wire.endpoints:
+                if endpoint is not self:
+                    for message in endpoint.decoder.feed(data):
+                        endpoint.listener.dispatch(message)
+
+
+def start(target) -> threading.Thread:
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def coordinate(endpoint: Endpoint, expected: int = 1):
+    StartBarrier(endpoint, endpoint.listener, 1, JUDGE, expected, countdown=0).wait()
+
+
+def join(endpoint: Endpoint):
+    StartBarrier(endpoint, endpoint.listener, 2, PLAYER).wait()
+
+
+def play_round(coordinator: Endpoint, player: Endpoint):
+    threads = [start(lambda: coordinate(coordinator)), start(lambda: join(player))]
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive(), 'the game did not start'
+
+
+def test_session_of_several_rounds():
+    wire = Wire()
+    coordinator, player = wire.connect(), wire.connect()
+    for game in range(3):
+        play_round(coordinator, player)
+        assert player.listener.started.is_set()
+        assert player.listener.round == game
+        coordinator.listener.new_round()
+        player.listener.new_round()
+
+
+def test_ready_from_the_last_round_does_not_start_the_next():
+    wire = Wire()
+    coordinator, player = wire.connect(), wire.connect()
+    play_round(coordinator, player)
+    coordinator.listener.new_round()
+    player.listener.new_round()
+
+    # a ready message of the game that just started, resent before the start message reached its sender
+    coordinator.listener.dispatch(ReadyMessage(2, PLAYER, 12345, 0))
+    waiting = start(lambda: coordinate(coordinator))
+    waiting.join(0.3)
+    assert waiting.is_alive(), 'started before the player was ready'
+
+    joining = start(lambda: join(player))
+    for thread in (waiting, joining):
+        thread.join(5)
+        assert not thread.is_alive()
+    assert player.listener.round == 1
+
+
+def test_ready_for_the_next_round_before_the_coordinator_is_done_counts():
+    wire = Wire()
+    coordinator, player = wire.connect(), wire.connect()
+    play_round(coordinator, player)
+
+    # the player is ready for the next game before the coordinator has reset
+    player.listener.new_round()
+    joining = start(lambda: join(player))
+    time.sleep(0.1)
+    coordinator.listener.new_round()
+    started = time.monotonic()
+    coordinate(coordinator)
+    assert time.monotonic() - started < RESEND_INTERVAL / 2, 'waited for the ready message to be resent'
+    joining.join(5)
+    assert not joining.is_alive()
+
+
+def test_new_round_forgets_who_was_ready():
+    listener = MessageListener(None)
+    listener.dispatch(ReadyMessage(1, PLAYER, 1, 0))
+    listener.dispatch(ReadyMessage(1, PLAYER, 2, 1))
+    assert listener.ready == {1}
+    listener.new_round()
+    assert (listener.round, listener.ready) == (1, {2})
+
+
+def test_start_of_another_round_is_ignored():
+    listener = MessageListener(None)
+    listener.dispatch(StartMessage(0, 1))
+    assert not listener.started.is_set()
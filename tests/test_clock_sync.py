@@ -0,0 +1,122 @@
+import socket
+import time
+
+import pytest
+
+from common.clock_sync import MIN_SAMPLES, ClockSync, local_us, stamp
+from common.message_forwarder import START_SLACK, MessageListener, send_message
+from common.protocol import FrameDecoder, PingMessage, PongMessage, ScoreMessage, StartMessage
+
+HOURS_AHEAD = 7200 * 1000000
+
+
+class FakeClock:
+    """ local clock of a computer, ahead of the hub's by a fixed offset """
+
+    def __init__(self, ahead_us: int):
+        self.reference = 1000000000
+        self.ahead_us = ahead_us
+
+    def __call__(self) -> int:
+        return self.reference + self.ahead_us
+
+
+def exchange(clock: ClockSync, fake: FakeClock, upstream: int, downstream: int, processing: int = 20):
+    """ one ping and pong with the given one-way delays in microseconds """
+    ping: PingMessage = clock.ping()
+    fake.reference += upstream
+    received = fake.reference
+    fake.reference += processing
+    sent = fake.reference
+    fake.reference += downstream
+    clock.on_pong(PongMessage(ping.sequence, ping.sent_us, received, sent))
+
+
+def synchronize(clock: ClockSync):
+    """ pongs from a hub reading this computer's monotonic clock, answered instantly """
+    while not clock.synchronized:
+        # spread out like real pings, so the skew is not fitted over microseconds of noise
+        time.sleep(0.002)
+        ping = clock.ping()
+        now = local_us()
+        clock.on_pong(PongMessage(ping.sequence, ping.sent_us, now, now))
+
+
+def test_offset_with_symmetric_delays():
+    fake = FakeClock(-12345678)
+    clock = ClockSync(fake)
+    assert not clock.synchronized
+    for _ in range(MIN_SAMPLES):
+        exchange(clock, fake, 300, 300)
+        fake.reference += 100000
+    assert clock.synchronized
+    assert clock.now_us() == pytest.approx(fake.reference, abs=1)
+    assert clock.to_local(fake.reference) == pytest.approx(fake(), abs=1)
+
+
+def test_queueing_delay_is_filtered_out():
+    fake = FakeClock(5000000)
+    clock = ClockSync(fake)
+    for number in range(16):
+        # every other ping waits in a queue on its way to the hub
+        exchange(clock, fake, 300 + (20000 if number % 2 else 0), 300)
+        fake.reference += 100000
+    assert clock.now_us() == pytest.approx(fake.reference, abs=1)
+
+
+def test_stamp_fills_in_only_unstamped_game_messages():
+    assert stamp(ScoreMessage(1, 2), 99) == ScoreMessage(1, 2, 99)
+    assert stamp(ScoreMessage(1, 2, 5), 99) == ScoreMessage(1, 2, 5)
+    assert stamp(PingMessage(1, 5), 99) == PingMessage(1, 5)
+
+
+def sent(message: tuple, clock: ClockSync) -> tuple:
+    sender, receiver = socket.socketpair()
+    try:
+        send_message(sender, message, clock)
+        return FrameDecoder().recv_from(receiver)[0]
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_unsynchronized_sender_does_not_stamp():
+    clock = ClockSync(FakeClock(HOURS_AHEAD))
+    assert sent(StartMessage(3000), clock).sent_us == 0
+
+
+def test_synchronized_sender_stamps_the_hub_time():
+    clock = ClockSync(lambda: local_us() + HOURS_AHEAD)
+    synchronize(clock)
+    before = local_us()
+    assert before <= sent(StartMessage(3000), clock).sent_us <= local_us()
+
+
+def receiver_listener() -> MessageListener:
+    clock = ClockSync(lambda: local_us() - 3000000)
+    synchronize(clock)
+    return MessageListener(None, clock=clock)
+
+
+def test_start_from_an_unsynchronized_coordinator_falls_back_to_the_countdown():
+    coordinator = ClockSync(lambda: local_us() + HOURS_AHEAD)
+    listener = receiver_listener()
+    now = time.monotonic()
+    listener.dispatch(sent(StartMessage(3000), coordinator))
+    assert listener.started.is_set()
+    assert listener.start_at == pytest.approx(now + 3, abs=0.05)
+
+
+def test_synchronized_start_counts_from_when_it_was_sent():
+    listener = receiver_listener()
+    now = time.monotonic()
+    listener.dispatch(StartMessage(3000, 0, local_us() - 1000000))
+    assert listener.start_at == pytest.approx(now + 2, abs=0.05)
+
+
+@pytest.mark.parametrize('sent_ago', [-HOURS_AHEAD, -(START_SLACK + 1) * 1000000, 4000000, HOURS_AHEAD])
+def test_implausible_start_times_are_ignored(sent_ago: int):
+    listener = receiver_listener()
+    now = time.monotonic()
+    listener.dispatch(StartMessage(3000, 0, local_us() - sent_ago))
+    assert listener.start_at == pytest.approx(now + 3, abs=0.05)
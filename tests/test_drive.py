@@ -0,0 +1,31 @@
+import pytest
+
+from common.drive import MAX_WHEEL_SPEED, TABLE_SHIFT, StickDrive, compute_wheels
+
+# a cell of the table is this many raw stick units wide
+CELL = 1 << TABLE_SHIFT
+
+
+@pytest.fixture(scope='module')
+def stick_drive() -> StickDrive:
+    return StickDrive()
+
+
+def test_dead_zone_is_still(stick_drive: StickDrive):
+    assert stick_drive.wheels(0, 0) == (0, 0)
+    assert stick_drive.wheels(3000, -3000) == (0, 0)
+
+
+@pytest.mark.parametrize('x, y', [(0, 32767), (32767, 0), (-32768, 0), (0, -32768), (20000, 20000), (-9000, 15000)])
+def test_lookup_is_close_to_the_exact_mapping(stick_drive: StickDrive, x: int, y: int):
+    for wheel, exact in zip(stick_drive.wheels(x, y), compute_wheels(x, y)):
+        assert wheel == pytest.approx(exact, abs=MAX_WHEEL_SPEED * 0.03)
+
+
+def test_every_cell_is_close_to_the_exact_mapping_at_its_centre(stick_drive: StickDrive):
+    # both halves of each axis, so a cell wrapped to the wrong side of the center is caught
+    centres = range(-32768 + CELL // 2, 32768, CELL * 3)
+    for x in centres:
+        for y in centres:
+            for wheel, exact in zip(stick_drive.wheels(x, y), compute_wheels(x, y)):
+                assert wheel == pytest.approx(exact, abs=MAX_WHEEL_SPEED * 0.03), (x, y)
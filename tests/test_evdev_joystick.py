@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from common.gamepad import GAMEPAD_A, GAMEPAD_DPAD_UP
+from evdev_joystick import (ABS_HAT0Y, ABS_RX, ABS_RY, ABS_RZ, ABS_X, ABS_Y, ABS_Z, DEFAULT_RANGES, EV_ABS, EV_KEY,
+                            EV_SYN, INPUT_EVENT, SYN_REPORT, EvdevJoystick)
+
+# an Xbox One pad: 10 bit triggers, and sticks of a third party pad reporting 0..65535
+XBOX_ONE_RANGES = {**DEFAULT_RANGES, ABS_Z: (0, 1023), ABS_RZ: (0, 1023), ABS_X: (0, 65535), ABS_Y: (0, 65535)}
+
+
+def event(event_type: int, code: int, value: int) -> bytes:
+    return INPUT_EVENT.pack(0, 0, event_type, code, value)
+
+
+SYN = event(EV_SYN, SYN_REPORT, 0)
+
+
+@pytest.fixture
+def pipe():
+    read_end, write_end = os.pipe()
+    os.set_blocking(read_end, False)
+    yield read_end, write_end
+    os.close(read_end)
+    os.close(write_end)
+
+
+def test_events_are_published_on_sync(pipe):
+    read_end, write_end = pipe
+    joystick = EvdevJoystick(None, fd=read_end)
+    os.write(write_end, event(EV_KEY, 0x130, 1) + event(EV_ABS, ABS_HAT0Y, -1))
+    assert joystick.get_state().packet_number == 0
+    os.write(write_end, SYN)
+    state = joystick.get_state()
+    assert state.packet_number == 1
+    assert state.buttons == GAMEPAD_A | GAMEPAD_DPAD_UP
+
+
+def test_event_split_across_reads(pipe):
+    read_end, write_end = pipe
+    joystick = EvdevJoystick(None, fd=read_end)
+    data = event(EV_ABS, ABS_RX, 1234) + SYN
+    os.write(write_end, data[:5])
+    assert joystick.get_state().packet_number == 0
+    os.write(write_end, data[5:])
+    state = joystick.get_state()
+    assert (state.packet_number, state.r_thumb_x) == (1, 1234)
+
+
+def test_xbox_360_ranges_pass_through(pipe):
+    read_end, write_end = pipe
+    joystick = EvdevJoystick(None, fd=read_end)
+    os.write(write_end, event(EV_ABS, ABS_X, 32767) + event(EV_ABS, ABS_Y, -32768) + event(EV_ABS, ABS_RY, 0) +
+             event(EV_ABS, ABS_Z, 255) + event(EV_ABS, ABS_RZ, 17) + SYN)
+    state = joystick.get_state()
+    # evdev sticks grow downwards, XInput sticks upwards
+    assert (state.l_thumb_x, state.l_thumb_y, state.r_thumb_y) == (32767, 32767, 0)
+    assert (state.left_trigger, state.right_trigger) == (255, 17)
+
+
+@pytest.mark.parametrize('raw, trigger', [(0, 0), (512, 127), (1023, 255), (2000, 255)])
+def test_triggers_are_scaled_to_a_byte(pipe, raw: int, trigger: int):
+    read_end, write_end = pipe
+    joystick = EvdevJoystick(None, fd=read_end, ranges=XBOX_ONE_RANGES)
+    os.write(write_end, event(EV_ABS, ABS_Z, raw) + SYN)
+    assert joystick.get_state().left_trigger == trigger
+
+
+@pytest.mark.parametrize('raw, x, y', [(0, -32767, 32767), (32767, 0, 0), (65535, 32767, -32767)])
+def test_sticks_are_scaled_to_int16(pipe, raw: int, x: int, y: int):
+    read_end, write_end = pipe
+    joystick = EvdevJoystick(None, fd=read_end, ranges=XBOX_ONE_RANGES)
+    os.write(write_end, event(EV_ABS, ABS_X, raw) + event(EV_ABS, ABS_Y, raw) + SYN)
+    state = joystick.get_state()
+    assert (state.l_thumb_x, state.l_thumb_y) == (x, y)
+
+
+def test_pipe_uses_the_xbox_360_ranges(pipe):
+    read_end, write_end = pipe
+    joystick = EvdevJoystick(None, fd=read_end)
+    os.write(write_end, event(EV_ABS, ABS_RZ, 1023) + SYN)
+    assert joystick.get_state().right_trigger == 255
@@ -0,0 +1,66 @@
+import asyncio
+
+from common.game_state import GameState, GameStateService
+from common.protocol import (CaptureClaimMessage, CubeCapturedMessage, ExitMessage, FrameDecoder, ScoreMessage,
+                             StartMessage, encode)
+
+
+def without_stamps(messages):
+    return [message._replace(sent_us=0) for message in messages]
+
+
+def test_first_claim_of_a_cube_counts():
+    state = GameState(winning_score=3)
+    assert state.handle(CaptureClaimMessage(1, 1)) == [CubeCapturedMessage(1, 1), ScoreMessage(1, 1)]
+    assert state.handle(CaptureClaimMessage(1, 1)) == []
+    assert state.scores == {1: 1}
+    assert (state.accepted, state.rejected) == (1, 1)
+
+
+def test_same_cube_id_of_different_teams_are_different_cubes():
+    state = GameState(winning_score=3)
+    state.handle(CaptureClaimMessage(1, 1))
+    assert state.handle(CaptureClaimMessage(2, 1)) == [CubeCapturedMessage(2, 1), ScoreMessage(2, 1)]
+
+
+def test_one_winner_and_nothing_counts_after_the_win():
+    state = GameState(winning_score=2)
+    state.handle(CaptureClaimMessage(1, 1))
+    state.handle(CaptureClaimMessage(2, 1))
+    assert state.handle(CaptureClaimMessage(2, 2)) == [CubeCapturedMessage(2, 2), ScoreMessage(2, 2), ExitMessage(2)]
+    assert state.winner == 2
+    assert state.handle(CaptureClaimMessage(1, 2)) == []
+    assert state.scores == {1: 1, 2: 2}
+
+
+def test_start_resets_the_game():
+    state = GameState(winning_score=1)
+    state.handle(CaptureClaimMessage(1, 1))
+    assert state.handle(StartMessage(0)) == []
+    assert (state.winner, state.scores) == (0, {})
+    assert state.handle(CaptureClaimMessage(1, 1)) == [CubeCapturedMessage(1, 1), ScoreMessage(1, 1), ExitMessage(1)]
+
+
+def test_service_applies_claims_in_order():
+    broadcasts = []
+
+    async def run():
+        service = GameStateService(GameState(winning_score=2), max_pending=4)
+        task = service.start(broadcasts.append)
+        for claim in (CaptureClaimMessage(1, 1), CaptureClaimMessage(2, 1), CaptureClaimMessage(1, 1),
+                      CaptureClaimMessage(2, 2), CaptureClaimMessage(1, 2)):
+            await service.submit(encode(claim))
+        while service.processed < 5:
+            await asyncio.sleep(0)
+        task.cancel()
+        return service
+
+    service = asyncio.run(run())
+    decoder = FrameDecoder()
+    received = without_stamps([message for data in broadcasts for message in decoder.feed(data)])
+    assert received == [CubeCapturedMessage(1, 1), ScoreMessage(1, 1), CubeCapturedMessage(2, 1), ScoreMessage(2, 1),
+                        CubeCapturedMessage(2, 2), ScoreMessage(2, 2), ExitMessage(2)]
+    assert service.state.rejected == 2
+    # every event's updates go out in one write, stamped with the hub's clock
+    assert len(broadcasts) == 3
+    assert all(message.sent_us for message in decoder.feed(b''.join(broadcasts)))
@@ -0,0 +1,74 @@
+import pytest
+
+from common.gamepad import GamepadState
+from common.input_trace import FLUSH_RECORDS, TraceReader, TraceRecorder, numpy
+
+STATES = [GamepadState(number, number & 0xFFFF, number % 256, 255 - number % 256, number % 32768,
+                       -(number % 32768), -32768, 32767) for number in range(FLUSH_RECORDS * 2 + 10)]
+
+
+def record(path: str, states) -> TraceRecorder:
+    timestamps = iter(range(0, 10 ** 9 * len(states), 10 ** 9))
+    recorder = TraceRecorder(path, clock=lambda: next(timestamps))
+    for state in states:
+        recorder.record(state)
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'player.trace')
+    record(path, STATES).close()
+    reader = TraceReader(path)
+    try:
+        assert len(reader) == len(STATES)
+        assert list(reader) == [(number * 10 ** 9, state) for number, state in enumerate(STATES)]
+        assert reader[3] == (3 * 10 ** 9, STATES[3])
+    finally:
+        reader.close()
+
+
+def test_array_matches_the_records(tmp_path):
+    pytest.importorskip('numpy')
+    path = str(tmp_path / 'player.trace')
+    record(path, STATES).close()
+    reader = TraceReader(path)
+    try:
+        records = reader.array()
+        assert records['timestamp'].tolist() == [number * 10 ** 9 for number in range(len(STATES))]
+        for field in GamepadState.__slots__:
+            assert numpy.array_equal(records[field], [getattr(state, field) for state in STATES]), field
+    finally:
+        del records
+        reader.close()
+
+
+def test_trace_is_readable_before_its_records_are_flushed(tmp_path):
+    path = str(tmp_path / 'player.trace')
+    recorder = record(path, STATES[:3])
+    reader = TraceReader(path)
+    try:
+        assert len(reader) == 0
+        assert list(reader) == []
+        if numpy is not None:
+            assert len(reader.array()) == 0
+    finally:
+        reader.close()
+        recorder.close()
+
+
+def test_recording_is_appended(tmp_path):
+    path = str(tmp_path / 'player.trace')
+    record(path, STATES[:5]).close()
+    record(path, STATES[5:8]).close()
+    reader = TraceReader(path)
+    try:
+        assert [state for _, state in reader] == STATES[:8]
+    finally:
+        reader.close()
+
+
+def test_file_without_a_header_is_rejected(tmp_path):
+    path = tmp_path / 'empty.trace'
+    path.write_bytes(b'')
+    with pytest.raises(ValueError):
+        TraceReader(str(path))
@@ -0,0 +1,50 @@
+import socket
+import threading
+
+from common.clock_sync import ClockSync
+from common.message_forwarder import MessageListener, send_message
+from common.protocol import ExitMessage, FrameDecoder, RobotPoseMessage, ScoreMessage
+
+
+def test_threads_sharing_a_connection_never_interleave_frames():
+    sender, receiver = socket.socketpair()
+    sender.setblocking(False)
+    # small buffers so sends are partial and the senders have to wait for the reader
+    sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    threads_count, per_thread = 4, 5000
+    received = []
+
+    def send(team: int):
+        for number in range(per_thread):
+            send_message(sender, RobotPoseMessage(team, 1, number % 1000, -number % 1000, 0), ClockSync())
+
+    def receive():
+        decoder = FrameDecoder()
+        while len(received) < threads_count * per_thread:
+            received.extend(decoder.recv_from(receiver))
+
+    reader = threading.Thread(target=receive, daemon=True)
+    reader.start()
+    senders = [threading.Thread(target=send, args=(team,)) for team in range(1, threads_count + 1)]
+    for thread in senders:
+        thread.start()
+    for thread in senders:
+        thread.join()
+    reader.join(10)
+    sender.close()
+    receiver.close()
+
+    assert len(received) == threads_count * per_thread
+    for team in range(1, threads_count + 1):
+        assert [message.x for message in received if message.team == team] == [
+            number % 1000 for number in range(per_thread)]
+
+
+def test_listener_without_a_queue_only_keeps_flags_and_scores():
+    listener = MessageListener(None, queue_messages=False)
+    for number in range(1000):
+        listener.dispatch(RobotPoseMessage(1, 1, number, 0, 0))
+    listener.dispatch(ScoreMessage(2, 1))
+    listener.dispatch(ExitMessage(2))
+    assert listener.messages.empty()
+    assert (listener.scores, listener.winner, listener.game_over.is_set()) == ({2: 1}, 2, True)
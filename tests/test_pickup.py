@@ -0,0 +1,76 @@
+from cozmo.objects import LightCube
+
+from common.commands import CommandShaper
+from common.pickup import IDLE, SEARCHING, AutoPickup
+
+
+class FakeAction:
+    def __init__(self):
+        self.is_completed = False
+        self.is_running = True
+
+    def abort(self):
+        self.is_running = False
+
+
+class FakeWorld:
+    def __init__(self):
+        self.visible_objects = []
+
+
+class FakeRobot:
+    def __init__(self):
+        self.world = FakeWorld()
+        self.wheels = []
+        self.action = None
+
+    def drive_wheels(self, l_wheel_speed: float, r_wheel_speed: float):
+        self.wheels.append((l_wheel_speed, r_wheel_speed))
+
+    def go_to_object(self, cube, distance):
+        self.action = FakeAction()
+        return self.action
+
+    def pickup_object(self, cube, num_retries=0):
+        self.action = FakeAction()
+        return self.action
+
+
+def driving_pickup():
+    robot = FakeRobot()
+    shaper = CommandShaper(robot, clock=lambda: 0.0)
+    shaper.drive_wheels(100, 100)
+    return robot, shaper, AutoPickup(shaper, clock=lambda: 0.0)
+
+
+def test_robot_stops_while_searching():
+    robot, shaper, pickup = driving_pickup()
+    pickup.start()
+    pickup.update()
+    assert pickup.state == SEARCHING
+    assert robot.wheels == [(100, 100), (0, 0)]
+
+
+def test_commands_after_a_pickup_are_sent():
+    robot, shaper, pickup = driving_pickup()
+    robot.world.visible_objects.append(LightCube.__new__(LightCube))
+    pickup.start()
+    for _ in range(2):
+        pickup.update()
+        robot.action.is_completed = True
+    pickup.update()
+    assert (pickup.state, pickup.completed) == (IDLE, 1)
+    # the pickup moved the wheels, the same command as before it must reach the robot again
+    shaper.drive_wheels(0, 0)
+    assert robot.wheels == [(100, 100), (0, 0), (0, 0)]
+
+
+def test_commands_after_a_cancelled_pickup_are_sent():
+    robot, shaper, pickup = driving_pickup()
+    robot.world.visible_objects.append(LightCube.__new__(LightCube))
+    pickup.start()
+    pickup.update()
+    pickup.cancel()
+    assert not robot.action.is_running
+    shaper.drive_wheels(0, 0)
+    assert robot.wheels == [(100, 100), (0, 0), (0, 0)]
@@ -0,0 +1,61 @@
+import socket
+
+from common.protocol import (CaptureClaimMessage, CubePoseMessage, ExitMessage, FrameDecoder, JoinMessage,
+                             PongMessage, ReadyMessage, ScoreMessage, StartMessage, encode)
+
+MESSAGES = [
+    ExitMessage(2, 123456789),
+    ScoreMessage(1, 3),
+    ReadyMessage(1, 2, 0xDEADBEEF, 7),
+    StartMessage(3000, 1, -5),
+    CubePoseMessage(3, 2, -100, 1999),
+    CaptureClaimMessage(2, 1),
+    PongMessage(1, 2, 3, 4),
+    JoinMessage(65535),
+]
+
+
+def test_round_trip():
+    assert FrameDecoder().feed(b''.join(encode(message) for message in MESSAGES)) == MESSAGES
+
+
+def test_frames_split_at_every_byte():
+    decoder = FrameDecoder()
+    received = []
+    for byte in b''.join(encode(message) for message in MESSAGES):
+        received.extend(decoder.feed(bytes([byte])))
+    assert received == MESSAGES
+
+
+def test_partial_frame_waits_for_the_rest():
+    decoder = FrameDecoder()
+    frame = encode(StartMessage(1000, 2))
+    assert decoder.feed(encode(ScoreMessage(1, 1)) + frame[:4]) == [ScoreMessage(1, 1)]
+    assert decoder.feed(frame[4:]) == [StartMessage(1000, 2)]
+
+
+def test_stream_larger_than_the_buffer():
+    decoder = FrameDecoder(buffer_size=16)
+    messages = [CubePoseMessage(1, number % 256, number, -number) for number in range(1000)]
+    data = b''.join(encode(message) for message in messages)
+    received = []
+    for start in range(0, len(data), 7):
+        received.extend(decoder.feed(data[start:start + 7]))
+    assert received == messages
+
+
+def test_recv_from_socket():
+    sender, receiver = socket.socketpair()
+    try:
+        frame = encode(ExitMessage(1))
+        decoder = FrameDecoder()
+        sender.sendall(frame[:2])
+        assert decoder.recv_from(receiver) == []
+        sender.sendall(frame[2:] + encode(ScoreMessage(1, 2)))
+        received = []
+        while len(received) < 2:
+            received.extend(decoder.recv_from(receiver))
+        assert received == [ExitMessage(1), ScoreMessage(1, 2)]
+    finally:
+        sender.close()
+        receiver.close()
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from common.drive import StickDrive
+from common.gamepad import GamepadState
+from common.seats import Seat, run_seats
+from player import check_controller_state
+
+
+class FakeRobot:
+    def __init__(self, command_time: float = 0.0):
+        self.command_time = command_time
+        self.wheels = []
+        self.lift = []
+
+    def drive_wheels(self, l_wheel_speed: float, r_wheel_speed: float):
+        time.sleep(self.command_time)
+        self.wheels.append((l_wheel_speed, r_wheel_speed))
+
+    def move_lift(self, speed: float):
+        self.lift.append(speed)
+
+
+class FakePad:
+    def __init__(self, l_thumb_x: int = 0, l_thumb_y: int = 0):
+        self.state = GamepadState(1, 0, 0, 0, l_thumb_x, l_thumb_y, 0, 0)
+        self.reads = 0
+
+    def get_state(self) -> GamepadState:
+        self.reads += 1
+        return self.state
+
+
+class FailingPad:
+    def get_state(self) -> GamepadState:
+        raise OSError('controller unplugged')
+
+
+def play(seats, stop_after: float) -> float:
+    """
+    :return: seconds from the game over to every seat having stopped
+    """
+    game_over = threading.Event()
+    timer = threading.Timer(stop_after, game_over.set)
+    timer.start()
+    run_seats(seats, check_controller_state, StickDrive(), game_over.is_set)
+    stopped = time.monotonic()
+    timer.join()
+    return stopped
+
+
+def test_game_over_stops_every_seat_and_halt_resends_commands():
+    seats = [Seat(FakeRobot(), FakePad(), 200), Seat(FakeRobot(command_time=0.05), FakePad(l_thumb_y=32767), 200)]
+    started = time.monotonic()
+    stopped = play(seats, 0.2)
+    assert stopped - started < 1.0
+    assert all(seat.joystick.reads for seat in seats)
+    # the idle seat already sent a stop, the halt must reach its robot anyway
+    assert seats[0].robot.wheels == [(0, 0)]
+    assert seats[1].robot.wheels[-1] == (100, 100)
+    for seat in seats:
+        seat.halt()
+        assert seat.robot.wheels[-1] == (0, 0)
+        assert seat.robot.lift[-1] == 0
+    assert seats[0].robot.wheels == [(0, 0), (0, 0)]
+    assert seats[0].robot.lift == [0, 0]
+
+
+def test_failing_seat_leaves_the_other_playing():
+    seats = [Seat(FakeRobot(), FailingPad(), 200), Seat(FakeRobot(), FakePad(l_thumb_y=32767), 200)]
+    play(seats, 0.2)
+    assert isinstance(seats[0].error, OSError)
+    assert seats[1].error is None
+    # the healthy seat kept reading its controller until the game was over
+    assert seats[1].joystick.reads > 10
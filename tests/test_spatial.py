@@ -0,0 +1,24 @@
+import random
+
+from common.spatial import BASE_RADIUS, FIELD_SIZE, GRID_MIN_TEAMS, CaptureIndex, base_pose
+
+
+def test_cube_is_captured_once_in_its_own_base():
+    index = CaptureIndex(3)
+    x, y, _ = base_pose(2, 3)
+    assert not index.update_cube(1, 1, x, y)
+    assert index.update_cube(2, 1, x + BASE_RADIUS / 2, y)
+    assert not index.update_cube(2, 1, x, y)
+    assert index.update_cube(2, 2, x, y - BASE_RADIUS / 2)
+    assert not index.update_cube(2, 3, FIELD_SIZE / 2, FIELD_SIZE / 2)
+
+
+def test_grid_finds_the_same_bases_as_checking_each_one():
+    teams = GRID_MIN_TEAMS + 4
+    scan, grid = CaptureIndex(teams), CaptureIndex(teams)
+    assert (scan.use_grid, grid.use_grid) == (True, True)
+    scan.use_grid = False
+    generator = random.Random(3)
+    for _ in range(5000):
+        x, y = generator.uniform(0, FIELD_SIZE), generator.uniform(0, FIELD_SIZE)
+        assert grid.base_at(x, y) == scan.base_at(x, y)
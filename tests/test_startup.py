@@ -0,0 +1,19 @@
+from typing import List
+
+import pytest
+
+from benchmarks.startup import ENTRY_POINTS, run
+
+# entry points a player or judge starts from, none of them may load the SDK, numpy or a DLL loader
+STARTUP = {'player.py --help', 'import player', 'judge.py --help', 'import judge'}
+HEAVY = ['cozmo', 'numpy', 'ctypes']
+CHECKED = [entry for entry in ENTRY_POINTS if entry[2] or entry[0] in STARTUP]
+
+
+@pytest.mark.parametrize('name, arguments, forbidden', CHECKED, ids=[entry[0] for entry in CHECKED])
+def test_entry_point_does_not_import_unused_modules(name: str, arguments: List[str], forbidden: List[str]):
+    _, modules, _ = run(arguments)
+    assert modules, 'no -X importtime output'
+    if name in STARTUP:
+        forbidden = forbidden + HEAVY
+    assert [module for module in forbidden if module in modules] == []
@@ -0,0 +1,37 @@
+from common.telemetry import MAGIC, PACKET, TelemetryReceiver
+
+
+def datagram(sequence: int, room: int, team: int = 1, robot: int = 1, x: int = 0) -> bytes:
+    return PACKET.pack(MAGIC, sequence, room, team, robot, x, 0, 0, 0, 0)
+
+
+def test_newest_state_is_kept():
+    receiver = TelemetryReceiver(None)
+    assert receiver.feed(datagram(2, 0, x=20))
+    assert not receiver.feed(datagram(1, 0, x=10))
+    assert receiver.state(1, 1).x == 20
+    assert receiver.stale == 1
+
+
+def test_sequence_wraps():
+    receiver = TelemetryReceiver(None)
+    receiver.feed(datagram(0xFFFFFFFF, 0, x=1))
+    assert receiver.feed(datagram(0, 0, x=2))
+    assert receiver.state(1, 1).x == 2
+
+
+def test_robots_of_other_rooms_are_ignored():
+    receiver = TelemetryReceiver(None, room=2)
+    assert receiver.feed(datagram(5, 2, x=50))
+    # the same team and robot number in another match, with a newer sequence number
+    assert not receiver.feed(datagram(9, 3, x=90))
+    assert receiver.feed(datagram(6, 2, x=60))
+    assert [state.x for state in receiver.states()] == [60]
+    assert (receiver.other_room, receiver.stale) == (1, 0)
+
+
+def test_malformed_datagrams_are_rejected():
+    receiver = TelemetryReceiver(None)
+    assert not receiver.feed(b'\x00' * PACKET.size)
+    assert not receiver.feed(datagram(1, 0)[:-1])
+    assert receiver.rejected == 2
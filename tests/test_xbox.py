@@ -0,0 +1,86 @@
+import sys
+import time
+
+import pytest
+
+import xbox
+
+BANNER = b'Press Ctrl-c to quit, use --silent to suppress the event output\n'
+LINE = ('X1:%6d Y1:%6d  X2:%6d Y2:%6d  du:%d dd:0 dl:0 dr:0  back:0 guide:0 start:%d  '
+        'TL:0 TR:0  A:%d B:0 X:0 Y:%d  LB:0 RB:1  LT:%3d RT:%3d\n')
+
+# writes each canned chunk given as a hex argument a moment apart, then idles like xboxdrv until killed
+FAKE_XBOXDRV = r'''
+import sys, time
+out = sys.stdout.buffer
+for chunk in sys.argv[1:]:
+    out.write(bytes.fromhex(chunk))
+    out.flush()
+    time.sleep(0.1)
+time.sleep(60)
+'''
+
+
+def line(left_x=0, left_y=0, right_x=0, right_y=0, up=0, start=0, a=0, y=0, left_trigger=0, right_trigger=0) -> bytes:
+    return (LINE % (left_x, left_y, right_x, right_y, up, start, a, y, left_trigger, right_trigger)).encode()
+
+
+def fake_joystick(threaded: bool, *chunks: bytes) -> xbox.Joystick:
+    return xbox.Joystick(refreshRate=1000, threaded=threaded,
+                         command=[sys.executable, '-c', FAKE_XBOXDRV] + [chunk.hex() for chunk in chunks])
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_line_decodes_into_a_state():
+    assert len(line()) == 140
+    state = xbox.JoystickState(line(-32768, 32767, 123, -4567, up=1, start=1, a=1, left_trigger=255,
+                                    right_trigger=7))
+    assert (state.leftX, state.leftY, state.rightX, state.rightY) == (-32768, 32767, 123, -4567)
+    assert (state.dpadUp, state.dpadDown, state.Start, state.A, state.B, state.Y) == (1, 0, 1, 1, 0, 0)
+    assert (state.leftBumper, state.rightBumper, state.leftTrigger, state.rightTrigger) == (0, 1, 255, 7)
+
+
+@pytest.mark.parametrize('threaded', [False, True], ids=['polled', 'threaded'])
+def test_newest_line_is_the_state(threaded: bool):
+    data = b''.join(line(left_x=number, a=number % 2) for number in range(200))
+    # the second chunk starts in the middle of a line
+    joy = fake_joystick(threaded, BANNER + data[:len(data) // 2 + 70], data[len(data) // 2 + 70:])
+    try:
+        wait_for(lambda: joy.snapshot().leftX == 199)
+        assert joy.connected()
+        assert joy.state.A == 1
+    finally:
+        joy.close()
+
+
+@pytest.mark.parametrize('threaded', [False, True], ids=['polled', 'threaded'])
+def test_other_output_means_the_controller_is_lost(threaded: bool):
+    joy = fake_joystick(threaded, BANNER, line(left_x=5), b'Wireless receiver lost the controller\n')
+    try:
+        wait_for(joy.connected)
+        wait_for(lambda: not joy.connected())
+        # the last readings stay in effect
+        assert joy.snapshot().leftX == 5
+    finally:
+        joy.close()
+
+
+def test_no_controller_fails():
+    with pytest.raises(IOError):
+        fake_joystick(False, b'No Xbox or Xbox360 controller found\n')
+
+
+def test_close_stops_the_reader_and_xboxdrv():
+    joy = fake_joystick(True, BANNER + line(left_x=1))
+    wait_for(lambda: joy.snapshot().leftX == 1)
+    joy.close()
+    assert not joy.reader.is_alive()
+    assert joy.proc.poll() is not None
+    with pytest.raises(IOError):
+        joy.snapshot()
@@ -25,27 +25,79 @@ Example usage:
 All controller buttons are supported.  See code for all functions.
 """
 
+import os
 import subprocess
 import select
+import struct
+import threading
 import time
 
+# (name, start, end) of every field in the 140 character line xboxdrv prints for each event
+FIELDS = [('leftX', 3, 9), ('leftY', 13, 19), ('rightX', 24, 30), ('rightY', 34, 40),
+          ('dpadUp', 45, 46), ('dpadDown', 50, 51), ('dpadLeft', 55, 56), ('dpadRight', 60, 61),
+          ('Back', 68, 69), ('Guide', 76, 77), ('Start', 84, 85),
+          ('leftThumbstick', 90, 91), ('rightThumbstick', 95, 96),
+          ('A', 100, 101), ('B', 104, 105), ('X', 108, 109), ('Y', 112, 113),
+          ('leftBumper', 118, 119), ('rightBumper', 123, 124),
+          ('leftTrigger', 129, 132), ('rightTrigger', 136, 139)]
+
+def _layout():
+    # single character fields are read as bytes, the rest as strings for int()
+    layout, offset = '', 0
+    for name, start, end in FIELDS:
+        layout += '%dx' % (start - offset) if start > offset else ''
+        layout += 'B' if end - start == 1 else '%ds' % (end - start)
+        offset = end
+    return struct.Struct(layout)
+
+LINE = _layout()
+
+XBOXDRV_COMMAND = ['xboxdrv','--no-uinput','--detach-kernel-driver']
+
+class JoystickState:
+
+    """Snapshot of every controller input decoded from a single xboxdrv line.
+    Sticks hold the raw -32768 to 32767 readings, triggers the raw 0 to 255 readings
+    and buttons 1 (pressed) or 0 (not pressed).
+    """
+    __slots__ = [name for name, start, end in FIELDS]
+
+    def __init__(self, reading=b'0' * 140):
+        (leftX, leftY, rightX, rightY, dpadUp, dpadDown, dpadLeft, dpadRight, Back, Guide, Start,
+         leftThumbstick, rightThumbstick, A, B, X, Y, leftBumper, rightBumper,
+         leftTrigger, rightTrigger) = LINE.unpack_from(reading)
+        # buttons are single ASCII digits, 48 is '0'
+        self.leftX, self.leftY, self.rightX, self.rightY = int(leftX), int(leftY), int(rightX), int(rightY)
+        self.dpadUp, self.dpadDown, self.dpadLeft, self.dpadRight = dpadUp - 48, dpadDown - 48, dpadLeft - 48, dpadRight - 48
+        self.Back, self.Guide, self.Start = Back - 48, Guide - 48, Start - 48
+        self.leftThumbstick, self.rightThumbstick = leftThumbstick - 48, rightThumbstick - 48
+        self.A, self.B, self.X, self.Y = A - 48, B - 48, X - 48, Y - 48
+        self.leftBumper, self.rightBumper = leftBumper - 48, rightBumper - 48
+        self.leftTrigger, self.rightTrigger = int(leftTrigger), int(rightTrigger)
+
 class Joystick:
 
     """Initializes the joystick/wireless receiver, launching 'xboxdrv' as a subprocess
     and checking that the wired joystick or wireless receiver is attached.
     The refreshRate determines the maximnum rate at which events are polled from xboxdrv.
     Calling any of the Joystick methods will cause a refresh to occur, if refreshTime has elapsed.
-    Routinely call a Joystick method, at least once per second, to avoid overfilling the event buffer.
+    Routinely call a Joystick method, at least once per second, to avoid overfilling the event buffer,
+    or pass threaded=True to drain xboxdrv continuously on a background thread instead.
+    The command that is launched can be replaced, e.g. by a script that replays canned xboxdrv output.
  
     Usage:
         joy = xbox.Joystick()
+        joy = xbox.Joystick(threaded=True)
     """
-    def __init__(self,refreshRate = 30):
-        self.proc = subprocess.Popen(['xboxdrv','--no-uinput','--detach-kernel-driver'], stdout=subprocess.PIPE, bufsize=0)
+    def __init__(self,refreshRate = 30,threaded = False,command = XBOXDRV_COMMAND):
+        self.proc = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=0)
         self.pipe = self.proc.stdout
+        self.threaded = threaded
+        self.readerError = None     #set by the reader thread when xboxdrv goes away
         #
         self.connectStatus = False  #will be set to True once controller is detected and stays on
-        self.reading = '0' * 140    #initialize stick readings to all zeros
+        self.reading = b'0' * 140   #initialize stick readings to all zeros
+        self.state = JoystickState(self.reading)
         #
         self.refreshTime = 0    #absolute time when next refresh (read results from xboxdrv stdout pipe) is to occur
         self.refreshDelay = 1.0 / refreshRate   #joystick refresh is to be performed 30 times per sec by default
@@ -68,19 +120,59 @@ class Joystick:
                     found = True
                     self.connectStatus = True
                     self.reading = response
+                    self.state = JoystickState(response)
         # if the controller wasn't found, then halt
         if not found:
             self.close()
             raise IOError('Unable to detect Xbox controller/receiver - Run python as sudo')
+        #
+        if threaded:
+            self.reader = threading.Thread(target=self.readForever, daemon=True)
+            self.reader.start()
+
+    """Background reader used in threaded mode. Drains xboxdrv with large reads so its pipe never
+    backs up and only decodes the newest complete line of each read. Publishing a new state is a
+    single attribute assignment, so the consumer never takes a lock.
+    """
+    def readForever(self):
+        fd = self.pipe.fileno()
+        pending = b''
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                self.readerError = IOError('Xbox controller disconnected from USB')
+                return
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            if not lines:
+                continue
+            # Valid controller response will be 140 chars including the newline.
+            last = lines[-1] + b'\n'
+            if len(last) == 140:
+                self.reading = last
+                self.state = JoystickState(last)
+                self.connectStatus = True
+            else:  #Any other response means we have lost wireless or controller battery
+                self.connectStatus = False
 
     """Used by all Joystick methods to read the most recent events from xboxdrv.
     The refreshRate determines the maximum frequency with which events are checked.
     If a valid event response is found, then the controller is flagged as 'connected'.
+    Only the last line read is decoded, once, into the state snapshot.
     """
     def refresh(self):
+        # In threaded mode the reader keeps the state current, only report a lost controller
+        if self.threaded:
+            if self.readerError:
+                raise self.readerError
+            return
         # Refresh the joystick readings based on regular defined freq
-        if self.refreshTime < time.time():
-            self.refreshTime = time.time() + self.refreshDelay  #set next refresh time
+        now = time.time()
+        if self.refreshTime < now:
+            self.refreshTime = now + self.refreshDelay  #set next refresh time
             # If there is text available to read from xboxdrv, then read it.
             readable, writeable, exception = select.select([self.pipe],[],[],0)
             if readable:
@@ -95,6 +187,7 @@ class Joystick:
                 if len(response) == 140:
                     self.connectStatus = True
                     self.reading = response
+                    self.state = JoystickState(response)
                 else:  #Any other response means we have lost wireless or controller battery
                     self.connectStatus = False
 
@@ -112,29 +205,37 @@ class Joystick:
         self.refresh()
         return self.connectStatus
 
+    """Return the decoded state of every input after a single refresh.
+    Reading the attributes of the snapshot is much cheaper than calling one accessor per input.
+
+    Usage:
+        state = joy.snapshot()
+        if state.A:
+            x = joy.axisScale(state.leftX, 4000)
+    """
+    def snapshot(self):
+        self.refresh()
+        return self.state
+
     # Left stick X axis value scaled between -1.0 (left) and 1.0 (right) with deadzone tolerance correction
     def leftX(self,deadzone=4000):
         self.refresh()
-        raw = int(self.reading[3:9])
-        return self.axisScale(raw,deadzone)
+        return self.axisScale(self.state.leftX,deadzone)
 
     # Left stick Y axis value scaled between -1.0 (down) and 1.0 (up)
     def leftY(self,deadzone=4000):
         self.refresh()
-        raw = int(self.reading[13:19])
-        return self.axisScale(raw,deadzone)
+        return self.axisScale(self.state.leftY,deadzone)
 
     # Right stick X axis value scaled between -1.0 (left) and 1.0 (right)
     def rightX(self,deadzone=4000):
         self.refresh()
-        raw = int(self.reading[24:30])
-        return self.axisScale(raw,deadzone)
+        return self.axisScale(self.state.rightX,deadzone)
 
     # Right stick Y axis value scaled between -1.0 (down) and 1.0 (up)
     def rightY(self,deadzone=4000):
         self.refresh()
-        raw = int(self.reading[34:40])
-        return self.axisScale(raw,deadzone)
+        return self.axisScale(self.state.rightY,deadzone)
 
     # Scale raw (-32768 to +32767) axis with deadzone correcion
     # Deadzone is +/- range of values to consider to be center stick (ie. 0.0)
@@ -150,87 +251,87 @@ class Joystick:
     # Dpad Up status - returns 1 (pressed) or 0 (not pressed)
     def dpadUp(self):
         self.refresh()
-        return int(self.reading[45:46])
+        return self.state.dpadUp
         
     # Dpad Down status - returns 1 (pressed) or 0 (not pressed)
     def dpadDown(self):
         self.refresh()
-        return int(self.reading[50:51])
+        return self.state.dpadDown
         
     # Dpad Left status - returns 1 (pressed) or 0 (not pressed)
     def dpadLeft(self):
         self.refresh()
-        return int(self.reading[55:56])
+        return self.state.dpadLeft
         
     # Dpad Right status - returns 1 (pressed) or 0 (not pressed)
     def dpadRight(self):
         self.refresh()
-        return int(self.reading[60:61])
+        return self.state.dpadRight
         
     # Back button status - returns 1 (pressed) or 0 (not pressed)
     def Back(self):
         self.refresh()
-        return int(self.reading[68:69])
+        return self.state.Back
 
     # Guide button status - returns 1 (pressed) or 0 (not pressed)
     def Guide(self):
         self.refresh()
-        return int(self.reading[76:77])
+        return self.state.Guide
 
     # Start button status - returns 1 (pressed) or 0 (not pressed)
     def Start(self):
         self.refresh()
-        return int(self.reading[84:85])
+        return self.state.Start
 
     # Left Thumbstick button status - returns 1 (pressed) or 0 (not pressed)
     def leftThumbstick(self):
         self.refresh()
-        return int(self.reading[90:91])
+        return self.state.leftThumbstick
 
     # Right Thumbstick button status - returns 1 (pressed) or 0 (not pressed)
     def rightThumbstick(self):
         self.refresh()
-        return int(self.reading[95:96])
+        return self.state.rightThumbstick
 
     # A button status - returns 1 (pressed) or 0 (not pressed)
     def A(self):
         self.refresh()
-        return int(self.reading[100:101])
+        return self.state.A
         
     # B button status - returns 1 (pressed) or 0 (not pressed)
     def B(self):
         self.refresh()
-        return int(self.reading[104:105])
+        return self.state.B
 
     # X button status - returns 1 (pressed) or 0 (not pressed)
     def X(self):
         self.refresh()
-        return int(self.reading[108:109])
+        return self.state.X
 
     # Y button status - returns 1 (pressed) or 0 (not pressed)
     def Y(self):
         self.refresh()
-        return int(self.reading[112:113])
+        return self.state.Y
 
     # Left Bumper button status - returns 1 (pressed) or 0 (not pressed)
     def leftBumper(self):
         self.refresh()
-        return int(self.reading[118:119])
+        return self.state.leftBumper
 
     # Right Bumper button status - returns 1 (pressed) or 0 (not pressed)
     def rightBumper(self):
         self.refresh()
-        return int(self.reading[123:124])
+        return self.state.rightBumper
 
     # Left Trigger value scaled between 0.0 to 1.0
     def leftTrigger(self):
         self.refresh()
-        return int(self.reading[129:132]) / 255.0
+        return self.state.leftTrigger / 255.0
         
     # Right trigger value scaled between 0.0 to 1.0
     def rightTrigger(self):
         self.refresh()
-        return int(self.reading[136:139]) / 255.0
+        return self.state.rightTrigger / 255.0
 
     # Returns tuple containing X and Y axis values for Left stick scaled between -1.0 to 1.0
     # Usage:
@@ -246,6 +347,10 @@ class Joystick:
         self.refresh()
         return (self.rightX(deadzone),self.rightY(deadzone))
 
-    # Cleanup by ending the xboxdrv subprocess
+    # Cleanup by ending the xboxdrv subprocess, in threaded mode the reader stops once the pipe closes
     def close(self):
         self.proc.kill()
+        self.proc.wait()
+        if self.threaded:
+            self.reader.join(1)
+        self.pipe.close()
@@ -1,9 +1,17 @@
-from math import *
+import sys
 
 import cozmo
-from cozmo.util import distance_mm
 
-from xinput import *
+from common.commands import CommandShaper
+from common.controllers import enumerate_controllers
+from common.drive import StickDrive
+from common.gamepad import (GamepadState, GAMEPAD_A, GAMEPAD_B, GAMEPAD_DPAD_DOWN, GAMEPAD_DPAD_LEFT,
+                            GAMEPAD_DPAD_RIGHT, GAMEPAD_DPAD_UP, GAMEPAD_Y)
+from common.pickup import AutoPickup
+from common.scheduler import FixedRateScheduler
+
+# number of times per second the controller is read and commands are sent to the robot
+CONTROL_RATE_HZ = 60
 
 directional_pad_speeds = {
     # up, down, left, right
@@ -19,92 +27,47 @@ directional_pad_speeds = {
 }
 
 
-def normalize_stick(x, y):
-    """
-    Normalize input values for left and right sticks
-    :param x: x value generated by the controller
-    :param y: y value generated by the controller
-    :return: a tuple containing (normalized x, normalized_y, magnitude)
-    """
-    # print("x = {0}, y = {1}".format(x, y))
-    # determine how far the controller is pushed
-    magnitude = sqrt(x * x + y * y) + 0.01  # 0.01 to avoid division by zero when x = y = 0
-    # determine the direction the controller is pushed
-    normalized_x, normalized_y = x / magnitude, y / magnitude
-    # check if the controller is outside a circular dead zone
-    if magnitude > GAMEPAD_LEFT_THUMB_DEADZONE:
-        magnitude = min([magnitude, GAMEPAD_THUMB_MAX])
-        magnitude -= GAMEPAD_LEFT_THUMB_DEADZONE
-    else:
-        normalized_x, normalized_y, magnitude = 0.0, 0.0, 0.0
-
-    return normalized_x, normalized_y, magnitude
+def check_controller_state(robot: cozmo.robot.Robot, state: GamepadState, pickup: AutoPickup,
+                           stick_drive: StickDrive):
+    # left stick
+    stick_left, stick_right = stick_drive.wheels(state.l_thumb_x, state.l_thumb_y)
 
+    # auto pickup keeps running in the background until it finishes or the player takes over
+    if pickup.active:
+        if stick_left or stick_right or state.left_trigger or state.right_trigger or state.buttons & ~GAMEPAD_Y:
+            pickup.cancel()
+        else:
+            pickup.update()
+            return
 
-def check_controller_state(robot: cozmo.robot.Robot, state):
     # face buttons
     # lift
 
-    if state['buttons'] == GAMEPAD_B:
+    if state.buttons == GAMEPAD_B:
         robot.move_lift(1.0)
-    elif state['buttons'] == GAMEPAD_A:
+    elif state.buttons == GAMEPAD_A:
         robot.move_lift(-1.0)
     else:
         robot.move_lift(0)
     # head
-    if state['buttons'] == GAMEPAD_Y:
-        cube = robot.world.wait_for_observed_light_cube(timeout=30)
-        if cube:
-            robot.go_to_object(cube, distance_mm(200.0)).wait_for_completed()
-
-            robot.pickup_object(cube, num_retries=0).wait_for_completed()
-
-    # left stick
-    left_x, left_y, left_magnitude = normalize_stick(state['l_thumb_x'], state['l_thumb_y'])
-    # print("left :{0}, {1}, {2}".format(left_x, left_y, left_magnitude))
+    if state.buttons == GAMEPAD_Y:
+        pickup.start()
+        return
 
     # directional pad buttons
 
-    if state['left_trigger'] > 0 or state['right_trigger'] > 0:
-        robot.drive_wheels(state['left_trigger'], state['right_trigger'])
+    if state.left_trigger > 0 or state.right_trigger > 0:
+        robot.drive_wheels(state.left_trigger, state.right_trigger)
     else:
-        (left_speed, right_speed) = directional_pad_speeds.get(state['buttons'] & 0xFF, (0, 0))
+        (left_speed, right_speed) = directional_pad_speeds.get(state.buttons & 0xFF, (0, 0))
         if left_speed == 0.0 and right_speed == 0.0:
-            if left_magnitude != 0.0:
-                # up
-                if left_y >= 0.75 and abs(left_x) < 0.25:
-                    robot.drive_wheels(100, 100)
-                # down
-                elif left_y <= -0.75 and abs(left_x) < 0.25:
-                    robot.drive_wheels(-100, -100)
-                # left
-                elif abs(left_y) < 0.25 and left_x <= -0.75:
-                    robot.drive_wheels(-100, 100)
-                # right
-                elif abs(left_y) < 0.25 and left_x >= 0.75:
-                    robot.drive_wheels(100, -100)
-                # up + left
-                elif left_y >= 0.50 and left_x <= -0.50:
-                    robot.drive_wheels(50, 100)
-                # up + right
-                elif left_y >= 0.50 and left_x >= 0.50:
-                    robot.drive_wheels(100, 50)
-                # down + left
-                elif left_y <= -0.50 and left_x <= -0.50:
-                    robot.drive_wheels(-50, -100)
-                # down + right
-                elif left_y <= -0.50 and left_x >= 0.50:
-                    robot.drive_wheels(-100, -50)
-                else:
-                    pass
-            else:
-                robot.drive_wheels(0, 0)
+            robot.drive_wheels(stick_left, stick_right)
         else:
             robot.drive_wheels(left_speed, right_speed)
 
 
 def cozmo_program(robot: cozmo.robot.Robot):
-    joysticks = XInputJoystick.enumerate_devices()
+    joysticks = enumerate_controllers()
 
     if joysticks:
         print("Number of connected controllers: {0}".format(len(joysticks)))
@@ -114,11 +77,17 @@ def cozmo_program(robot: cozmo.robot.Robot):
     # use only the first controller
     joystick = joysticks[0]
 
-    while True:
-        state = joystick.get_state()
-        # print(state)
-        check_controller_state(robot, state)
-        time.sleep(.01)
+    # only send wheel and lift commands to the robot when they change
+    shaper = CommandShaper(robot)
+    pickup = AutoPickup(shaper)
+    stick_drive = StickDrive()
+
+    scheduler = FixedRateScheduler(CONTROL_RATE_HZ)
+    try:
+        scheduler.run(lambda: check_controller_state(shaper, joystick.get_state(), pickup, stick_drive), lambda: False)
+    finally:
+        print(scheduler.report())
+        print(shaper.report())
 
 
 cozmo.run_program(cozmo_program)
@@ -17,6 +17,10 @@ import sys
 import time
 from operator import attrgetter
 
+from common.gamepad import (GamepadState, GAMEPAD_A, GAMEPAD_B, GAMEPAD_BACK, GAMEPAD_DPAD_DOWN, GAMEPAD_DPAD_LEFT,
+                            GAMEPAD_DPAD_RIGHT, GAMEPAD_DPAD_UP, GAMEPAD_LEFT_SHOULDER, GAMEPAD_LEFT_THUMB,
+                            GAMEPAD_RIGHT_SHOULDER, GAMEPAD_RIGHT_THUMB, GAMEPAD_START, GAMEPAD_X, GAMEPAD_Y)
+
 # structs according to
 # http://msdn.microsoft.com/en-gb/library/windows/desktop/ee417001%28v=vs.85%29.aspx
 
@@ -48,12 +52,39 @@ class XINPUT_BATTERY_INFORMATION(ctypes.Structure):
     _fields_ = [("BatteryType", ctypes.c_ubyte),
                 ("BatteryLevel", ctypes.c_ubyte)]
 
-xinput = ctypes.windll.xinput1_4
+# The backend is anything exposing the XInput functions used below; normally the DLL itself.
+# The DLL is only loaded by load_library() when the first controller is opened, so importing this
+# module is cheap and works on any platform. Elsewhere a stub backend can be installed with set_backend().
+xinput = None
 #xinput = ctypes.windll.xinput9_1_0  # this is the Win 8 version ?
 # xinput1_2, xinput1_1 (32-bit Vista SP1)
 # xinput1_3 (64-bit Vista SP1)
 
 
+def set_backend(backend):
+    """
+    Replace the XInput library, e.g. with a stub that fills in XINPUT_STATE structs for testing.
+    XInputGetState is called with the device number and a ctypes.byref() to an XINPUT_STATE.
+    """
+    global xinput
+    xinput = backend
+
+
+def load_library():
+    """
+    Load xinput1_4.dll unless a backend is already installed.
+
+    :return: the backend
+    """
+    global xinput
+    if xinput is None:
+        try:
+            xinput = ctypes.windll.xinput1_4
+        except AttributeError:
+            raise OSError('XInput is only available on Windows')
+    return xinput
+
+
 def struct_dict(struct):
     """
     take a ctypes.Structure and return its field/value pairs
@@ -78,15 +109,29 @@ class XInputJoystick:
     max_devices = 4  # maximum number of connected devices
 
     def __init__(self, device_number):
+        load_library()
         self.device_number = device_number
+        # one struct per device, filled in place by every poll
+        self._state = XINPUT_STATE()
+        self._state_ref = ctypes.byref(self._state)
+        self._last_state = None
         self._last_state = self.get_state()
 
     def get_state(self):
-        """Get the state of the controller represented by this object"""
-        state = XINPUT_STATE()
-        res = xinput.XInputGetState(self.device_number, ctypes.byref(state))
+        """
+        Get the state of the controller represented by this object. A new GamepadState is only
+        built when the packet number changes, otherwise the previous snapshot is returned as is.
+        """
+        res = xinput.XInputGetState(self.device_number, self._state_ref)
         if res == ERROR_SUCCESS:
-            self._last_state = struct_dict(state.gamepad)
+            state = self._state
+            last_state = self._last_state
+            if last_state is None or last_state.packet_number != state.packet_number:
+                gamepad = state.gamepad
+                self._last_state = GamepadState(state.packet_number, gamepad.buttons,
+                                                gamepad.left_trigger, gamepad.right_trigger,
+                                                gamepad.l_thumb_x, gamepad.l_thumb_y,
+                                                gamepad.r_thumb_x, gamepad.r_thumb_y)
             return self._last_state
         if res != ERROR_DEVICE_NOT_CONNECTED:
             self._last_state = None
@@ -147,22 +192,9 @@ class XInputJoystick:
 * joystick
 """
 
-GAMEPAD_DPAD_UP          = 0x0001
-GAMEPAD_DPAD_DOWN        = 0x0002
-GAMEPAD_DPAD_LEFT        = 0x0004
-GAMEPAD_DPAD_RIGHT       = 0x0008
-GAMEPAD_START            = 0x0010
-GAMEPAD_BACK             = 0x0020
-GAMEPAD_LEFT_THUMB       = 0x0040
-GAMEPAD_RIGHT_THUMB      = 0x0080
-GAMEPAD_LEFT_SHOULDER    = 0x0100
-GAMEPAD_RIGHT_SHOULDER   = 0x0200
+# the button bits and GamepadState live in common.gamepad so they can be used without loading XInput
 GAMEPAD_LEFT_BUMBER      = GAMEPAD_LEFT_SHOULDER
 GAMEPAD_RIGHT_BUMBER     = GAMEPAD_RIGHT_SHOULDER
-GAMEPAD_A                = 0x1000
-GAMEPAD_B                = 0x2000
-GAMEPAD_X                = 0x4000
-GAMEPAD_Y                = 0x8000
 
 """
  * Defines the flags used to determine if the user is pushing